@@ -0,0 +1,148 @@
+"""Micro-benchmark: ORM objects vs plain-row projections for the list endpoints.
+
+Seeds a temporary SQLite database and times the read path of get_products,
+get_users and get_all_orders twice: the old way (Model.query.all() + to_dict(),
+with one lazy items load per order) and the current way (Core select of plain
+rows + row_to_dict(), with order items batched by IN). Reports rows/sec over the
+best of --repeat runs and peak Python memory from tracemalloc.
+
+    python benchmarks/list_projection.py --rows 20000 --repeat 5
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DATA_DIR = tempfile.mkdtemp(prefix='shopease-projection-')
+for service in ('PRODUCT_SERVICE', 'USER_SERVICE', 'ORDER_SERVICE'):
+    os.environ[f'{service}_DATABASE_URI'] = f'sqlite:///{os.path.join(DATA_DIR, service.lower())}.sqlite'
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import order_service  # noqa: E402
+import product_service  # noqa: E402
+import user_service  # noqa: E402
+
+
+def seed(rows):
+    now = datetime.datetime.utcnow()
+    with product_service.app.app_context():
+        db = product_service.db
+        db.create_all()
+        db.session.execute(product_service.Product.__table__.insert(), [{
+            'name': f'Product {i}', 'description': 'lorem ipsum ' * random.randint(2, 30),
+            'price': round(random.uniform(5, 2000), 2), 'stock': random.randint(0, 500),
+            'category': random.choice(['Electronics', 'Books', 'Home']), 'image_url': f'https://example.com/{i}.jpg',
+            'created_at': now,
+        } for i in range(rows)])
+        db.session.commit()
+
+    with user_service.app.app_context():
+        db = user_service.db
+        db.create_all()
+        db.session.execute(user_service.User.__table__.insert(), [{
+            'username': f'user{i}', 'email': f'user{i}@example.com', 'password_hash': 'scrypt:32768:8:1$' + 'x' * 140,
+            'first_name': 'First', 'last_name': 'Last', 'created_at': now,
+        } for i in range(rows)])
+        db.session.commit()
+
+    order_count = max(1, rows // 3)
+    with order_service.app.app_context():
+        db = order_service.db
+        db.create_all()
+        db.session.execute(order_service.Order.__table__.insert(), [{
+            'id': i + 1, 'user_id': random.randint(1, 1000), 'total_amount': 99.5, 'status': 'pending',
+            'payment_status': 'pending', 'shipping_address': '1 Benchmark Road', 'created_at': now, 'updated_at': now,
+        } for i in range(order_count)])
+        db.session.execute(order_service.OrderItem.__table__.insert(), [{
+            'order_id': i // 3 + 1, 'product_id': random.randint(1, rows), 'product_name': 'Product',
+            'quantity': 1, 'price': 33.17, 'subtotal': 33.17, 'created_at': now,
+        } for i in range(order_count * 3)])
+        db.session.commit()
+    return order_count
+
+
+def products_orm():
+    return [p.to_dict() for p in product_service.Product.query.all()]
+
+
+def products_rows():
+    Product, db = product_service.Product, product_service.db
+    return [Product.row_to_dict(row) for row in db.session.execute(db.select(Product.__table__)).all()]
+
+
+def users_orm():
+    return [u.to_dict() for u in user_service.User.query.all()]
+
+
+def users_rows():
+    User, db = user_service.User, user_service.db
+    return [User.row_to_dict(row) for row in db.session.execute(db.select(*user_service.USER_PUBLIC_COLUMNS)).all()]
+
+
+def orders_orm():
+    result = []
+    for order in order_service.Order.query.order_by(order_service.Order.created_at.desc()).all():
+        order_dict = order.to_dict()
+        order_dict['items'] = [item.to_dict() for item in order.items]
+        result.append(order_dict)
+    return result
+
+
+def orders_rows():
+    Order, db = order_service.Order, order_service.db
+    rows = db.session.execute(db.select(Order.__table__).order_by(Order.created_at.desc())).all()
+    return order_service.serialize_order_rows(rows)
+
+
+def measure(module, func, repeat):
+    best = None
+    with module.app.app_context():
+        for _ in range(repeat):
+            module.db.session.remove()  # start from an empty identity map each run
+            started = time.perf_counter()
+            count = len(func())
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+
+        module.db.session.remove()
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        module.db.session.remove()
+    return count, best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ORM vs plain-row list serialization')
+    parser.add_argument('--rows', type=int, default=20000, help='products and users to seed (orders: rows/3, 3 items each)')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    seed(args.rows)
+    cases = [
+        ('get_products', product_service, products_orm, products_rows),
+        ('get_users', user_service, users_orm, users_rows),
+        ('get_all_orders', order_service, orders_orm, orders_rows),
+    ]
+
+    print(f"\n{'endpoint':16} {'path':6} {'rows':>7} {'best':>9} {'rows/s':>10} {'peak mem':>10}")
+    print('-' * 64)
+    for name, module, before, after in cases:
+        results = {}
+        for label, func in (('orm', before), ('rows', after)):
+            count, best, peak = measure(module, func, args.repeat)
+            results[label] = best
+            print(f"{name:16} {label:6} {count:7} {best * 1000:7.1f}ms {count / best:10.0f} {peak / 1_048_576:8.1f}MB")
+        print(f"{'':16} speedup x{results['orm'] / results['rows']:.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Build the frontend for serving by common/static.py.
+
+Writes frontend/dist/ with:
+    - every asset copied under a content-hashed name (script.js -> script.<hash>.js)
+    - index.html with its references rewritten to those names
+    - .gz (and .br when the `brotli` package is installed) next to every file
+      that compresses smaller
+    - manifest.json mapping each source name to its built name
+
+Hashed files never change, so they can be cached by browsers for a year; only
+index.html has to be revalidated.
+
+Usage:
+    python build_frontend.py                       # frontend/ -> frontend/dist/
+    python build_frontend.py --base /static/       # URL prefix used in index.html
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.join(ROOT, 'frontend')
+DIST_NAME = 'dist'
+ENTRY_POINTS = ('index.html',)
+HASH_LENGTH = 10
+COMPRESSIBLE_EXTENSIONS = ('.html', '.css', '.js', '.json', '.svg', '.txt', '.map')
+
+
+def fingerprint(name, body):
+    stem, ext = os.path.splitext(name)
+    return f'{stem}.{hashlib.sha256(body).hexdigest()[:HASH_LENGTH]}{ext}'
+
+
+def rewrite_references(html, manifest, base):
+    """Point src= and href= attributes at the fingerprinted names"""
+    def replace(match):
+        attribute, quote, target = match.group(1), match.group(2), match.group(3)
+        built = manifest.get(target[2:] if target.startswith('./') else target)
+        return f'{attribute}={quote}{base}{built}{quote}' if built else match.group(0)
+    return re.sub(r'\b(src|href)=(["\'])([^"\'#?:]+)\2', replace, html)
+
+
+def write_variants(path, body):
+    """Write path plus the compressed variants that are smaller; returns their encodings"""
+    with open(path, 'wb') as handle:
+        handle.write(body)
+    encodings = []
+    if not path.endswith(COMPRESSIBLE_EXTENSIONS):
+        return encodings
+    variants = [('gzip', '.gz', gzip.compress(body, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('br', '.br', brotli.compress(body, quality=11)))
+    for encoding, suffix, compressed in variants:
+        if len(compressed) < len(body):
+            with open(path + suffix, 'wb') as handle:
+                handle.write(compressed)
+            encodings.append(encoding)
+    return encodings
+
+
+def build(source_dir=SOURCE_DIR, base='/frontend/'):
+    dist_dir = os.path.join(source_dir, DIST_NAME)
+    if os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+    os.makedirs(dist_dir)
+
+    sources = {}
+    for directory, subdirectories, filenames in os.walk(source_dir):
+        subdirectories[:] = [d for d in subdirectories if d != DIST_NAME and not d.startswith('.')]
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            with open(path, 'rb') as handle:
+                sources[os.path.relpath(path, source_dir).replace(os.sep, '/')] = handle.read()
+
+    manifest = {name: name if name in ENTRY_POINTS else fingerprint(name, body)
+                for name, body in sources.items()}
+
+    files = {}
+    for name, body in sorted(sources.items()):
+        if name in ENTRY_POINTS:
+            body = rewrite_references(body.decode('utf-8'), manifest, base).encode('utf-8')
+        path = os.path.join(dist_dir, manifest[name])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        files[manifest[name]] = {
+            'source': name,
+            'size': len(body),
+            'encodings': write_variants(path, body)
+        }
+
+    with open(os.path.join(dist_dir, 'manifest.json'), 'w', encoding='utf-8') as handle:
+        json.dump({'base': base, 'assets': manifest, 'files': files}, handle, indent=2, sort_keys=True)
+    return manifest, files
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fingerprint and precompress the frontend into frontend/dist')
+    parser.add_argument('--source', default=SOURCE_DIR, help='frontend directory (default: ./frontend)')
+    parser.add_argument('--base', default='/frontend/', help='URL prefix of the assets in index.html')
+    args = parser.parse_args()
+
+    manifest, files = build(args.source, args.base)
+    for built, info in sorted(files.items()):
+        print(f"{info['source']:<20} -> {built:<30} {info['size']:>8} B  {' '.join(info['encodings'])}")
+    if brotli is None:
+        print("brotli not installed: only gzip variants were written", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Shared building blocks imported by every ShopEase service"""
@@ -0,0 +1,274 @@
+"""Admission control for hot keys: a per-key concurrency cap with a virtual waiting room.
+
+AdmissionController.limit(keys_of) wraps a view so that at most
+ADMISSION_MAX_CONCURRENT requests per key (e.g. per product in an order) run at
+once. A request that finds a key busy, or others already waiting for it, joins
+that key's FIFO queue and waits up to ADMISSION_WAIT_SECONDS (never past the
+request deadline). If its turn has not come by then it is answered 202 with a
+ticket and `retry_after`. The client sends the ticket back in `X-Queue-Ticket`
+after `retry_after` seconds; a ticket sent with different keys is dropped and the
+request queues like a new one. When a queue
+already holds ADMISSION_QUEUE_SIZE tickets, new requests are shed with 429 and
+Retry-After.
+
+Within a queue, waiting requests are admitted in ticket order. A free slot is not
+held for a ticket whose client is away between retries; that client gets the
+next slot ahead of everyone behind it when it returns. A ticket not presented
+again within its retry_after plus ADMISSION_TICKET_GRACE seconds is dropped.
+
+Caps, queues and tickets live in each worker process's memory; nothing is shared
+between gunicorn workers or service tasks. With W workers a key admits up to
+W × ADMISSION_MAX_CONCURRENT requests at once, and a ticket keeps its place only
+when the retry reaches the worker that issued it. Elsewhere it is unknown and the
+request queues anew on that worker. Responses therefore carry no queue position
+or ETA: they would describe one worker's queue, not the client's place overall.
+The controller bounds load per worker; it does not give global FIFO fairness.
+
+Environment:
+    ADMISSION_ENABLED             True|False (default True)
+    ADMISSION_MAX_CONCURRENT      requests per key running at once (default 4)
+    ADMISSION_QUEUE_SIZE          tickets per key before shedding with 429 (default 200)
+    ADMISSION_WAIT_SECONDS        time a request waits in process before getting a ticket (default 1)
+    ADMISSION_TICKET_GRACE        seconds a ticket survives past its retry_after (default 5)
+"""
+import functools
+import math
+import os
+import secrets
+import threading
+import time
+from collections import defaultdict, deque
+
+from flask import jsonify, request
+
+from common import deadline
+from common.metrics import Counter, current_service, register_renderer
+
+ENABLED = os.getenv('ADMISSION_ENABLED', 'True').lower() == 'true'
+MAX_CONCURRENT = int(os.getenv('ADMISSION_MAX_CONCURRENT', '4'))
+QUEUE_SIZE = int(os.getenv('ADMISSION_QUEUE_SIZE', '200'))
+WAIT_SECONDS = float(os.getenv('ADMISSION_WAIT_SECONDS', '1'))
+TICKET_GRACE = float(os.getenv('ADMISSION_TICKET_GRACE', '5'))
+# Assumed time per request for ETAs until one has been measured
+DEFAULT_SERVICE_SECONDS = 0.5
+MAX_RETRY_AFTER = 30
+
+ADMISSION_DECISIONS = Counter(
+    'admission_decisions_total', 'Requests admitted, queued (202) or shed (429) by admission control',
+    ('service', 'controller', 'outcome'))
+
+_controllers = []
+
+
+class Ticket:
+    def __init__(self, keys):
+        self.id = secrets.token_urlsafe(12)
+        self.keys = keys
+        self.present = False  # a request holding this ticket is waiting in this process
+        self.expires_at = None
+
+
+class Admission:
+    """Outcome of AdmissionController.enter()"""
+
+    def __init__(self, admitted, keys=(), ticket=None, position=None, eta_seconds=None):
+        self.admitted = admitted
+        self.keys = keys
+        self.ticket = ticket
+        self.position = position
+        self.eta_seconds = eta_seconds
+        self.started = time.monotonic()
+
+    @property
+    def retry_after(self):
+        return min(MAX_RETRY_AFTER, max(1, math.ceil(self.eta_seconds or 1)))
+
+
+class AdmissionController:
+    """Concurrency caps and FIFO waiting rooms for one kind of request, keyed e.g. by product id"""
+
+    def __init__(self, name, max_concurrent=MAX_CONCURRENT, queue_size=QUEUE_SIZE, wait_seconds=WAIT_SECONDS):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.queue_size = queue_size
+        self.wait_seconds = wait_seconds
+        self.condition = threading.Condition()
+        self.active = defaultdict(int)
+        self.queues = defaultdict(deque)
+        self.tickets = {}
+        self.service_seconds = {}  # key -> moving average of time from admission to release
+        _controllers.append(self)
+
+    def _drop_expired(self, now):
+        for ticket in list(self.tickets.values()):
+            if not ticket.present and ticket.expires_at is not None and ticket.expires_at < now:
+                self._remove(ticket)
+
+    def _remove(self, ticket):
+        self.tickets.pop(ticket.id, None)
+        for key in ticket.keys:
+            queue = self.queues[key]
+            if ticket in queue:
+                queue.remove(ticket)
+            if not queue:
+                del self.queues[key]
+
+    def _can_run(self, ticket, keys):
+        """Every key has a free slot and no present waiter is queued ahead"""
+        for key in keys:
+            if self.active.get(key, 0) >= self.max_concurrent:
+                return False
+            for queued in self.queues.get(key, ()):
+                if queued is ticket:
+                    break
+                if queued.present:
+                    return False
+        return True
+
+    def _position(self, ticket):
+        return max(list(self.queues[key]).index(ticket) + 1 for key in ticket.keys)
+
+    def _eta(self, ticket, position):
+        slowest = max(self.service_seconds.get(key, DEFAULT_SERVICE_SECONDS) for key in ticket.keys)
+        return round(math.ceil(position / self.max_concurrent) * slowest, 1)
+
+    def enter(self, keys, ticket_id=None):
+        """Admit, queue or shed a request for `keys`; returns an Admission"""
+        keys = tuple(sorted(set(keys)))
+        with self.condition:
+            now = time.monotonic()
+            self._drop_expired(now)
+            ticket = self.tickets.get(ticket_id) if ticket_id else None
+            if ticket is not None and ticket.keys != keys:
+                # a ticket holds a place for the keys it was issued for, not for another request
+                if not ticket.present:
+                    self._remove(ticket)
+                ticket = None
+
+            if ticket is None:
+                if not any(self.queues.get(key) for key in keys) and self._can_run(None, keys):
+                    return self._admit(None, keys)
+                if any(len(self.queues.get(key, ())) >= self.queue_size for key in keys):
+                    ADMISSION_DECISIONS.inc(current_service(), self.name, 'shed')
+                    busiest = max(keys, key=lambda key: len(self.queues.get(key, ())))
+                    eta = self.queue_size / self.max_concurrent * self.service_seconds.get(busiest, DEFAULT_SERVICE_SECONDS)
+                    return Admission(False, keys, eta_seconds=eta)
+                ticket = Ticket(keys)
+                self.tickets[ticket.id] = ticket
+                for key in keys:
+                    self.queues[key].append(ticket)
+
+            # wait for our turn, but not past the request's deadline
+            wait_until = now + max(0.0, deadline.clamp(self.wait_seconds))
+            ticket.present = True
+            try:
+                while not self._can_run(ticket, ticket.keys):
+                    left = wait_until - time.monotonic()
+                    if left <= 0:
+                        break
+                    self.condition.wait(left)
+            finally:
+                ticket.present = False
+
+            if self._can_run(ticket, ticket.keys):
+                self._remove(ticket)
+                # a waiter behind us may be able to run as well
+                self.condition.notify_all()
+                return self._admit(ticket, ticket.keys)
+
+            position = self._position(ticket)
+            admission = Admission(False, ticket.keys, ticket, position, self._eta(ticket, position))
+            ticket.expires_at = time.monotonic() + admission.retry_after + TICKET_GRACE
+            ADMISSION_DECISIONS.inc(current_service(), self.name, 'queued')
+            return admission
+
+    def _admit(self, ticket, keys):
+        for key in keys:
+            self.active[key] += 1
+        ADMISSION_DECISIONS.inc(current_service(), self.name, 'admitted')
+        return Admission(True, keys, ticket)
+
+    def leave(self, admission):
+        """Release the slots of an admitted request"""
+        elapsed = time.monotonic() - admission.started
+        with self.condition:
+            for key in admission.keys:
+                self.active[key] -= 1
+                if not self.active[key]:
+                    del self.active[key]
+                previous = self.service_seconds.get(key)
+                self.service_seconds[key] = elapsed if previous is None else 0.8 * previous + 0.2 * elapsed
+            self.condition.notify_all()
+
+    def limit(self, keys_of):
+        """Decorator: gate a view on the keys keys_of(request JSON object) returns; no keys, no limit
+
+        keys_of should return canonical, hashable and mutually comparable keys (e.g.
+        ints, so that 1 and "1" share a queue) and raise ValueError or TypeError for
+        a key it cannot convert; the request is then answered 400.
+        """
+
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                body = request.get_json(silent=True)
+                if not ENABLED or not isinstance(body, dict):
+                    return view(*args, **kwargs)  # a malformed body is reported by the view
+                try:
+                    keys = tuple(sorted({key for key in keys_of(body) if key is not None}))
+                except (TypeError, ValueError) as e:
+                    return jsonify({'error': str(e)}), 400
+                if not keys:
+                    return view(*args, **kwargs)
+
+                admission = self.enter(keys, request.headers.get('X-Queue-Ticket'))
+                if not admission.admitted:
+                    return admission_response(admission)
+                try:
+                    return view(*args, **kwargs)
+                finally:
+                    self.leave(admission)
+            return wrapper
+        return decorator
+
+    def stats(self):
+        with self.condition:
+            return {'active': sum(self.active.values()), 'queued': len(self.tickets)}
+
+
+def admission_response(admission):
+    """202 with the ticket while queued; 429 when the queue is full"""
+    if admission.ticket is None:
+        response = jsonify({
+            'error': 'Too many checkouts for these products right now; please retry',
+            'retry_after': admission.retry_after
+        })
+        response.status_code = 429
+    else:
+        # position and ETA are of this worker's queue only, so they stay internal (Retry-After)
+        response = jsonify({
+            'status': 'queued',
+            'ticket': admission.ticket.id,
+            'retry_after': admission.retry_after
+        })
+        response.status_code = 202
+        response.headers['X-Queue-Ticket'] = admission.ticket.id
+    response.headers['Retry-After'] = str(admission.retry_after)
+    return response
+
+
+def _render_admission_gauges():
+    gauges = {
+        'admission_active': ('Requests currently running under admission control', 'active'),
+        'admission_queued': ('Queue tickets currently waiting', 'queued'),
+    }
+    lines = ADMISSION_DECISIONS.render()
+    stats = {controller.name: controller.stats() for controller in _controllers}
+    for metric, (help_text, key) in gauges.items():
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} gauge']
+        for name, status in stats.items():
+            lines.append(f'{metric}{{controller="{name}"}} {status[key]}')
+    return lines
+
+
+register_renderer(_render_admission_gauges)
@@ -0,0 +1,135 @@
+"""Database URI and connection-pool settings shared by all services.
+
+The URI comes from DATABASE_URI when set (docker-compose passes it), otherwise it
+is assembled from the DB_HOST / DB_PORT / DB_USER / DB_PASSWORD / DB_NAME parts.
+<SERVICE>_DATABASE_URI takes precedence, which lets monolith.py give each service
+its own database inside one process.
+
+Pool settings are read per service first and then globally, e.g. for order_service
+ORDER_SERVICE_DB_POOL_SIZE falls back to DB_POOL_SIZE:
+    DB_POOL_SIZE       persistent connections per process (default 5)
+    DB_MAX_OVERFLOW    extra connections opened under burst load (default 10)
+    DB_POOL_TIMEOUT    seconds to wait for a free connection before failing (default 30)
+    DB_POOL_RECYCLE    seconds before a connection is replaced (default 300)
+"""
+import os
+import threading
+import time
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+DEFAULT_DB_HOST = 'shopease-db.cmni2wmcozyh.us-east-1.rds.amazonaws.com'
+
+
+def build_database_uri(service_name=None):
+    """Return <SERVICE>_DATABASE_URI or DATABASE_URI, or a MySQL URI built from the DB_* variables"""
+    keys = ([f'{service_name.upper()}_DATABASE_URI'] if service_name else []) + ['DATABASE_URI']
+    for key in keys:
+        uri = os.getenv(key)
+        if uri:
+            return uri
+
+    host = os.getenv('DB_HOST', DEFAULT_DB_HOST)
+    port = os.getenv('DB_PORT', '3306')
+    user = os.getenv('DB_USER', 'admin')
+    password = os.getenv('DB_PASSWORD', 'ChangeMe123!')
+    # keep the db name same for all services
+    name = os.getenv('DB_NAME', 'shopease')
+    return f'mysql+pymysql://{user}:{password}@{host}:{port}/{name}'
+
+
+def database_location(uri):
+    """Return (host, database name) for logs and health output, never the password"""
+    url = make_url(uri)
+    return url.host or 'local', url.database
+
+
+def _setting(service_name, name, default):
+    for key in (f'{service_name.upper()}_{name}', name):
+        value = os.getenv(key)
+        if value not in (None, ''):
+            return type(default)(value)
+    return default
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait to check out a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = {'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0, 'timeouts': 0}
+        self._wait_lock = threading.Lock()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with self._wait_lock:
+                self.wait_stats['timeouts'] += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._wait_lock:
+                self.wait_stats['count'] += 1
+                self.wait_stats['total_seconds'] += waited
+                self.wait_stats['max_seconds'] = max(self.wait_stats['max_seconds'], waited)
+
+
+def engine_options(service_name, uri, pool_size=5, max_overflow=10, pool_timeout=30, pool_recycle=300):
+    """Build SQLALCHEMY_ENGINE_OPTIONS for a service; keyword arguments are its defaults"""
+    options = {
+        'pool_pre_ping': True,
+        'pool_recycle': _setting(service_name, 'DB_POOL_RECYCLE', pool_recycle),
+    }
+    if make_url(uri).get_backend_name() == 'sqlite':
+        # SQLite uses its own pool classes; sizing options do not apply
+        return options
+
+    options.update({
+        'poolclass': TimedQueuePool,
+        'pool_size': _setting(service_name, 'DB_POOL_SIZE', pool_size),
+        'max_overflow': _setting(service_name, 'DB_MAX_OVERFLOW', max_overflow),
+        'pool_timeout': _setting(service_name, 'DB_POOL_TIMEOUT', pool_timeout),
+    })
+    return options
+
+
+def pool_status(engine):
+    """Current pool occupancy and checkout wait times for an engine"""
+    pool = engine.pool
+    status = {'pool_class': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': pool.overflow(),
+            'timeout_seconds': pool.timeout(),
+        })
+    stats = getattr(pool, 'wait_stats', None)
+    if stats is not None:
+        count = stats['count']
+        status['checkout_wait'] = {
+            'count': count,
+            'timeouts': stats['timeouts'],
+            'avg_ms': round(stats['total_seconds'] / count * 1000, 3) if count else 0.0,
+            'max_ms': round(stats['max_seconds'] * 1000, 3),
+            'total_seconds': round(stats['total_seconds'], 6),
+        }
+    return status
+
+
+def dispose_pools(app):
+    """Drop pooled connections inherited from a parent process without closing them.
+
+    Called in each pre-forked worker so that no two processes share a socket.
+    """
+    extension = app.extensions.get('sqlalchemy')
+    if extension is None:
+        return
+    with app.app_context():
+        for engine in extension.engines.values():
+            engine.dispose(close=False)
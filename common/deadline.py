@@ -0,0 +1,111 @@
+"""Request deadlines propagated across service calls.
+
+The first service to see a request (the edge) gives it a budget of
+REQUEST_DEADLINE_MS. Every outbound call through common.upstream sends what is
+left in `X-Request-Timeout-Ms` and uses it as the call's timeout when that is
+shorter than the call's own, so each hop works within the remaining budget
+instead of a fixed timeout. A client may send the header itself to ask for a
+shorter budget; longer ones are capped at REQUEST_DEADLINE_MS.
+
+Once the deadline has passed, outbound calls are not sent (DeadlineExceeded,
+a requests.Timeout, is raised instead) and check() raises the same, so the
+usual `except requests.RequestException` / `except Exception` paths stop the
+work. A request whose deadline expired and that ends with an error status is
+answered with 504. Work that must finish after a commit can run inside
+unbounded().
+
+Environment:
+    REQUEST_DEADLINE_MS   budget of a request that arrives without a deadline
+                          (default 25000, below GUNICORN_TIMEOUT)
+"""
+import contextlib
+import os
+import time
+
+import requests
+from flask import g, has_app_context, jsonify, request
+
+from common.metrics import Counter, current_service, register_renderer
+
+HEADER = 'X-Request-Timeout-Ms'
+DEFAULT_BUDGET_MS = int(os.getenv('REQUEST_DEADLINE_MS', '25000'))
+
+DEADLINES_EXCEEDED = Counter(
+    'request_deadline_exceeded_total', 'Work abandoned because the request deadline had passed',
+    ('service', 'where'))
+
+register_renderer(DEADLINES_EXCEEDED.render)
+
+
+class DeadlineExceeded(requests.Timeout):
+    """The request's deadline passed before this work could start or finish"""
+
+
+def remaining():
+    """Seconds left for the current request; None outside a request or inside unbounded()"""
+    deadline = g.get('deadline') if has_app_context() else None
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def clamp(timeout):
+    """The shorter of `timeout` (seconds, may be None) and the remaining budget"""
+    left = remaining()
+    if left is None:
+        return timeout
+    return left if timeout is None else min(timeout, left)
+
+
+def outbound_headers():
+    """Headers that pass the remaining budget to the next hop"""
+    left = remaining()
+    return {} if left is None else {HEADER: str(max(0, int(left * 1000)))}
+
+
+def mark_exceeded(where):
+    g.deadline_exceeded = True
+    DEADLINES_EXCEEDED.inc(current_service(), where)
+
+
+def check(where='check'):
+    """Raise DeadlineExceeded if the current request's deadline has passed"""
+    left = remaining()
+    if left is not None and left <= 0:
+        mark_exceeded(where)
+        raise DeadlineExceeded(f'request deadline exceeded {-left * 1000:.0f}ms ago ({where})')
+
+
+@contextlib.contextmanager
+def unbounded():
+    """Run a block without the request deadline, e.g. follow-up calls after a commit"""
+    saved = g.pop('deadline', None)
+    try:
+        yield
+    finally:
+        if saved is not None:
+            g.deadline = saved
+
+
+def install_deadline(app):
+    """Give each request of `app` a deadline and answer 504 when it was exceeded"""
+
+    @app.before_request
+    def _start_deadline():
+        budget_ms = DEFAULT_BUDGET_MS
+        try:
+            budget_ms = min(budget_ms, max(0, int(request.headers.get(HEADER, budget_ms))))
+        except ValueError:
+            pass
+        g.deadline = time.monotonic() + budget_ms / 1000
+
+    @app.after_request
+    def _deadline_status(response):
+        if g.get('deadline_exceeded') and response.status_code >= 400:
+            # the error is most likely a consequence of giving up
+            response.status_code = 504
+        return response
+
+    @app.errorhandler(DeadlineExceeded)
+    def _deadline_exceeded(e):
+        return jsonify({'error': str(e)}), 504
@@ -0,0 +1,301 @@
+"""Change events for cross-service cache invalidation.
+
+Producers (product_service, user_service) append a row to their own
+`change_events` table in the same transaction as every insert, update or delete
+of a tracked model, and serve the log at <prefix>/changes?since=<id>. The log is a
+transactional outbox: an event exists exactly when its change was committed, and
+its auto-increment id is the version consumers resume from. A feed only serves
+the entities its ChangeLog tracks, so services sharing one database (and one
+change_events table) do not see each other's events.
+
+Ids are allocated when an event is written, not when it commits, so a
+transaction can commit an id lower than one already served. The feed reports a
+`settled_id`: the newest event written more than CHANGE_EVENTS_SETTLE_SECONDS
+ago, below which every transaction has committed or rolled back. Consumers
+resume from it rather than from the highest id they received, re-reading the
+unsettled tail on each poll and skipping the ids they already delivered.
+
+Consumers run a ChangeFeedConsumer that polls that endpoint (one indexed range
+scan, usually returning nothing) and hands each event to the broker; cache owners
+subscribe to the broker by topic ('product', 'user') and evict precisely the
+entries an event names. If a consumer falls behind the retained log it receives
+one 'reset' event and should drop everything it caches for that topic.
+
+The broker is pluggable (CHANGE_EVENTS_BROKER, default 'local'). The local broker
+is an in-process pub/sub; committed events are also published to it directly, so
+consumers in the same process (monolith.py) see changes without waiting for a
+poll. Handlers must be idempotent, as an event can arrive both ways.
+
+Environment:
+    CHANGE_EVENTS_BROKER          broker name (default local)
+    CHANGE_EVENTS_POLL_INTERVAL   seconds between polls (default 1)
+    CHANGE_EVENTS_BATCH_SIZE      events per poll request (default 500)
+    CHANGE_EVENTS_RETENTION       seconds of log kept by producers (default 86400)
+    CHANGE_EVENTS_SETTLE_SECONDS  longest expected time from writing an event to its commit (default 10)
+"""
+import datetime
+import logging
+import os
+import threading
+import time
+
+import requests
+from flask import jsonify, request
+from sqlalchemy import event as sa_event
+
+from common import upstream
+
+POLL_INTERVAL = float(os.getenv('CHANGE_EVENTS_POLL_INTERVAL', '1'))
+BATCH_SIZE = int(os.getenv('CHANGE_EVENTS_BATCH_SIZE', '500'))
+RETENTION_SECONDS = int(os.getenv('CHANGE_EVENTS_RETENTION', '86400'))
+SETTLE_SECONDS = float(os.getenv('CHANGE_EVENTS_SETTLE_SECONDS', '10'))
+# Old events are pruned by the writer of every PRUNE_EVERY-th event
+PRUNE_EVERY = 1000
+
+logger = logging.getLogger('common.events')
+
+# ════════════════════════════════════════════════════════════════════════════════
+# BROKERS
+# ════════════════════════════════════════════════════════════════════════════════
+
+class Broker:
+    """Interface for delivering change events to subscribers by topic"""
+
+    def publish(self, topic, event):
+        raise NotImplementedError
+
+    def subscribe(self, topic, handler):
+        raise NotImplementedError
+
+
+class LocalBroker(Broker):
+    """In-process pub/sub; handlers run synchronously in the publishing thread"""
+
+    def __init__(self):
+        self.handlers = {}
+        self.lock = threading.Lock()
+
+    def publish(self, topic, event):
+        with self.lock:
+            handlers = list(self.handlers.get(topic, ()))
+        for handler in handlers:
+            try:
+                handler(event)
+            except Exception:
+                logger.exception("Change event handler failed", extra={'topic': topic, 'event': event})
+
+    def subscribe(self, topic, handler):
+        with self.lock:
+            self.handlers.setdefault(topic, []).append(handler)
+
+
+BROKERS = {'local': LocalBroker}
+
+
+def register_broker(name, factory):
+    """Make a broker implementation selectable with CHANGE_EVENTS_BROKER=<name>"""
+    BROKERS[name] = factory
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """The process-wide broker chosen by CHANGE_EVENTS_BROKER"""
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            name = os.getenv('CHANGE_EVENTS_BROKER', 'local')
+            if name not in BROKERS:
+                raise ValueError(f'Unknown CHANGE_EVENTS_BROKER {name!r}; known: {sorted(BROKERS)}')
+            _broker = BROKERS[name]()
+        return _broker
+
+# ════════════════════════════════════════════════════════════════════════════════
+# PRODUCER: CHANGE LOG
+# ════════════════════════════════════════════════════════════════════════════════
+
+def _event_to_dict(row):
+    return {
+        'id': row.id,
+        'entity': row.entity,
+        'entity_id': row.entity_id,
+        'action': row.action,
+        'created_at': row.created_at.isoformat() if row.created_at else None
+    }
+
+
+class ChangeLog:
+    """The change_events table of one service and the hooks that fill it"""
+
+    def __init__(self, db):
+        self.db = db
+        self.entities = set()  # served by the feed; see track()
+
+        class ChangeEvent(db.Model):
+            __tablename__ = 'change_events'
+            id = db.Column(db.Integer, primary_key=True)
+            entity = db.Column(db.String(50), nullable=False)
+            entity_id = db.Column(db.Integer)
+            action = db.Column(db.String(20), nullable=False)
+            created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, index=True)
+
+        self.model = ChangeEvent
+        self.table = ChangeEvent.__table__
+        # Session events attach to the session class, which services share (RoutingSession;
+        # all of them in monolith.py), so the hooks skip sessions of another service's db
+        sa_event.listen(db.session, 'after_commit', self._publish_committed)
+        sa_event.listen(db.session, 'after_soft_rollback', self._discard_pending)
+
+    def record(self, connection, entity, entity_id, action):
+        """Append an event inside the caller's transaction; also for Core UPDATE/DELETE paths"""
+        now = datetime.datetime.utcnow()
+        result = connection.execute(self.table.insert().values(
+            entity=entity, entity_id=entity_id, action=action, created_at=now
+        ))
+        event_id = result.inserted_primary_key[0]
+        if event_id % PRUNE_EVERY == 0:
+            cutoff = now - datetime.timedelta(seconds=RETENTION_SECONDS)
+            connection.execute(self.table.delete().where(self.table.c.created_at < cutoff))
+
+        pending = self.db.session().info.setdefault('pending_change_events', [])
+        pending.append({'id': event_id, 'entity': entity, 'entity_id': entity_id,
+                        'action': action, 'created_at': now.isoformat()})
+
+    def track(self, model, entity):
+        """Record an event for every ORM insert, update and delete of `model`"""
+        self.entities.add(entity)
+        for action, hook in (('created', 'after_insert'), ('updated', 'after_update'), ('deleted', 'after_delete')):
+            def listener(mapper, connection, target, action=action):
+                self.record(connection, entity, target.id, action)
+            sa_event.listen(model, hook, listener)
+
+    def _owns(self, session):
+        return getattr(session, '_db', None) is self.db
+
+    def _publish_committed(self, session):
+        if not self._owns(session):
+            return
+        events = session.info.pop('pending_change_events', None)
+        if events:
+            broker = get_broker()
+            for event in events:
+                broker.publish(event['entity'], event)
+
+    def _discard_pending(self, session, previous_transaction):
+        if self._owns(session):
+            session.info.pop('pending_change_events', None)
+
+    def install(self, app, prefix):
+        """Serve GET <prefix>/changes?since=<id>&limit=<n>"""
+
+        def changes():
+            try:
+                since = request.args.get('since', type=int)
+                limit = min(max(request.args.get('limit', BATCH_SIZE, type=int), 1), BATCH_SIZE)
+                # ids are shared by every entity in the table (pruning is too), so bounds are not scoped
+                bounds = self.db.session.execute(
+                    self.db.select(self.db.func.min(self.table.c.id), self.db.func.max(self.table.c.id))
+                ).one()
+                settled_before = datetime.datetime.utcnow() - datetime.timedelta(seconds=SETTLE_SECONDS)
+                settled_id = self.db.session.execute(
+                    self.db.select(self.table.c.id).where(self.table.c.created_at < settled_before)
+                    .order_by(self.table.c.created_at.desc()).limit(1)
+                ).scalar()
+
+                rows = []
+                if since is not None:
+                    rows = self.db.session.execute(
+                        self.db.select(self.table)
+                        .where(self.table.c.id > since, self.table.c.entity.in_(sorted(self.entities)))
+                        .order_by(self.table.c.id).limit(limit)
+                    ).all()
+                return jsonify({
+                    'events': [_event_to_dict(row) for row in rows],
+                    'oldest_id': bounds[0],
+                    # every id up to last_id was read: the last row of a full page, else the whole log
+                    'last_id': rows[-1].id if len(rows) == limit else max(since or 0, bounds[1] or 0),
+                    'settled_id': settled_id or 0
+                }), 200
+            except Exception as e:
+                return jsonify({'error': str(e)}), 500
+
+        app.add_url_rule(f'{prefix}/changes', f'changes{prefix}', changes, methods=['GET'])
+
+# ════════════════════════════════════════════════════════════════════════════════
+# CONSUMER: FEED POLLER
+# ════════════════════════════════════════════════════════════════════════════════
+
+class ChangeFeedConsumer:
+    """Polls one producer's change log and publishes its events to the broker"""
+
+    def __init__(self, upstream_name, url, topic=None):
+        self.upstream_name = upstream_name
+        self.url = f'{url}/changes'
+        self.topic = topic or upstream_name
+        self.cursor = None  # every event up to this id has been delivered or can no longer appear
+        self.last_id = None  # highest id read
+        self.delivered = set()  # ids above the cursor already published
+        self.lock = threading.Lock()
+        self.thread = None
+        self.pid = None
+
+    def poll(self):
+        """Fetch and publish pending events; returns True when a full page moved the cursor"""
+        params = {'limit': BATCH_SIZE}
+        if self.cursor is not None:
+            params['since'] = self.cursor
+        response = upstream.probe(self.upstream_name, self.url, params=params, timeout=5)
+        response.raise_for_status()
+        feed = response.json()
+
+        broker = get_broker()
+        oldest_id = feed.get('oldest_id')
+        if self.cursor is not None and (
+                feed['last_id'] < self.last_id or (oldest_id is not None and oldest_id > self.cursor + 1)):
+            # The log was pruned past us or recreated: we may have missed changes
+            broker.publish(self.topic, {'entity': self.topic, 'entity_id': None, 'action': 'reset'})
+            self.delivered.clear()
+
+        for event in feed['events']:
+            if event['id'] in self.delivered:
+                continue  # re-read from the unsettled tail
+            broker.publish(self.topic, event)
+            self.delivered.add(event['id'])
+
+        previous = self.cursor
+        self.last_id = feed['last_id']
+        # the unsettled tail above settled_id is read again next time
+        self.cursor = min(feed['last_id'], feed.get('settled_id', feed['last_id']))
+        if previous is not None:
+            self.cursor = max(self.cursor, previous)
+        self.delivered = {event_id for event_id in self.delivered if event_id > self.cursor}
+        return len(feed['events']) == BATCH_SIZE and self.cursor != previous
+
+    def _loop(self):
+        while True:
+            try:
+                more = self.poll()
+            except (requests.RequestException, ValueError, KeyError) as e:
+                logger.warning("Change feed poll failed", extra={'upstream': self.upstream_name, 'error': str(e)})
+                more = False
+            if not more:
+                time.sleep(POLL_INTERVAL)
+
+    def ensure_started(self):
+        """Start polling on first use in this process (threads do not survive fork)"""
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive() and self.pid == os.getpid():
+                return
+            self.thread = threading.Thread(target=self._loop, name=f'changes-{self.upstream_name}', daemon=True)
+            self.thread.start()
+            self.pid = os.getpid()
+
+
+def install_change_consumer(app, upstream_name, url, handler, topic=None):
+    """Subscribe `handler` to a producer's changes and poll its feed while `app` serves requests"""
+    consumer = ChangeFeedConsumer(upstream_name, url, topic)
+    get_broker().subscribe(consumer.topic, handler)
+    app.before_request(consumer.ensure_started)
+    return consumer
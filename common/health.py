@@ -0,0 +1,174 @@
+"""Liveness/readiness probes backed by a cached background dependency check.
+
+    /livez    the process is up and serving requests; no I/O
+    /readyz   the latest cached checks: the database (if any) must be up. Upstream
+              services are reported but do not fail readiness (set
+              HEALTH_REQUIRE_UPSTREAMS=True to change that), so one slow
+              dependency does not take every caller out of the load balancer.
+
+A daemon thread runs `SELECT 1` and GETs each upstream's <prefix>/livez every
+HEALTH_CHECK_INTERVAL seconds. Probes only read the cached result, so they use
+no pool connections. Check latencies appear in the /readyz body and as
+health_check_* gauges on /metrics.
+
+Environment:
+    HEALTH_CHECK_INTERVAL     seconds between checks (default 10)
+    HEALTH_CHECK_TIMEOUT      per-upstream timeout in seconds (default 2)
+    HEALTH_REQUIRE_UPSTREAMS  True|False (default False)
+"""
+import datetime
+import os
+import threading
+import time
+
+import requests
+from flask import jsonify
+
+from common import upstream
+from common.metrics import register_renderer
+
+CHECK_INTERVAL = float(os.getenv('HEALTH_CHECK_INTERVAL', '10'))
+CHECK_TIMEOUT = float(os.getenv('HEALTH_CHECK_TIMEOUT', '2'))
+REQUIRE_UPSTREAMS = os.getenv('HEALTH_REQUIRE_UPSTREAMS', 'False').lower() == 'true'
+
+_checkers = []
+
+
+class HealthChecker:
+    """Refreshes dependency status on an interval and serves the last result"""
+
+    def __init__(self, app, db, service_name, upstreams):
+        self.app = app
+        self.db = db
+        self.service_name = service_name
+        self.upstreams = upstreams
+        self.lock = threading.Lock()
+        self.results = None
+        self.checked_at = None
+        self.thread = None
+        self.pid = None
+
+    def _check_database(self):
+        with self.app.app_context():
+            try:
+                self.db.session.execute(self.db.text('SELECT 1'))
+                return {'status': 'up'}
+            except Exception as e:
+                return {'status': 'down', 'error': str(e)}
+            finally:
+                self.db.session.remove()
+
+    def _check_upstream(self, name, url):
+        try:
+            response = upstream.probe(name, f'{url}/livez', timeout=CHECK_TIMEOUT)
+            if response.status_code == 200:
+                return {'status': 'up'}
+            return {'status': 'down', 'error': f'HTTP {response.status_code}'}
+        except requests.RequestException as e:
+            return {'status': 'down', 'error': str(e)}
+
+    def run_checks(self):
+        checks = {'database': self._check_database} if self.db is not None else {}
+        for name, url in self.upstreams.items():
+            checks[name] = lambda name=name, url=url: self._check_upstream(name, url)
+
+        results = {}
+        for name, check in checks.items():
+            started = time.perf_counter()
+            result = check()
+            result['latency_ms'] = round((time.perf_counter() - started) * 1000, 2)
+            result['required'] = name == 'database' or REQUIRE_UPSTREAMS
+            results[name] = result
+
+        with self.lock:
+            self.results = results
+            self.checked_at = time.time()
+        return results
+
+    def _loop(self):
+        while True:
+            time.sleep(CHECK_INTERVAL)
+            try:
+                self.run_checks()
+            except Exception:
+                pass  # keep the previous result; it is reported stale if this persists
+
+    def ensure_started(self):
+        """Start the refresher on first use in this process (threads do not survive fork)"""
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive() and self.pid == os.getpid():
+                return
+            self.thread = threading.Thread(target=self._loop, name=f'health-{self.service_name}', daemon=True)
+            self.thread.start()
+            self.pid = os.getpid()
+
+    def snapshot(self):
+        """Latest results, running the checks inline if none exist yet"""
+        self.ensure_started()
+        with self.lock:
+            results, checked_at = self.results, self.checked_at
+        if results is None:
+            results, checked_at = self.run_checks(), time.time()
+
+        age = time.time() - checked_at
+        stale = age > CHECK_INTERVAL * 3 + CHECK_TIMEOUT * (len(self.upstreams) + 1)
+        ready = not stale and all(r['status'] == 'up' for r in results.values() if r['required'])
+        return {
+            'status': 'ready' if ready else 'not_ready',
+            'service': self.service_name,
+            'checked_at': datetime.datetime.utcfromtimestamp(checked_at).isoformat() + 'Z',
+            'age_seconds': round(age, 1),
+            'stale': stale,
+            'checks': results
+        }
+
+    def database_status(self):
+        """'connected' or 'disconnected: <error>' from the cached check, for /health"""
+        database = self.snapshot()['checks']['database']
+        if database['status'] == 'up':
+            return 'connected'
+        return f"disconnected: {database.get('error', 'unknown')}"
+
+
+def _render_health_gauges():
+    lines = [
+        '# HELP health_check_up Last dependency check result (1 up, 0 down)',
+        '# TYPE health_check_up gauge',
+    ]
+    latencies = [
+        '# HELP health_check_latency_seconds Duration of the last dependency check',
+        '# TYPE health_check_latency_seconds gauge',
+    ]
+    for checker in _checkers:
+        with checker.lock:
+            results = checker.results or {}
+        for name, result in results.items():
+            labels = f'service="{checker.service_name}",check="{name}"'
+            lines.append(f"health_check_up{{{labels}}} {1 if result['status'] == 'up' else 0}")
+            latencies.append(f"health_check_latency_seconds{{{labels}}} {result['latency_ms'] / 1000}")
+    return lines + latencies
+
+
+register_renderer(_render_health_gauges)
+
+
+def install_health(app, db, service_name, prefix, upstreams=None):
+    """Add /livez and /readyz (also under `prefix`, reachable through the ALB) and return the checker.
+
+    upstreams maps the upstream name to its base URL, e.g. {'product': PRODUCT_SERVICE_URL}.
+    db may be None for services without a database.
+    """
+    checker = HealthChecker(app, db, service_name, upstreams or {})
+    _checkers.append(checker)
+
+    def livez():
+        return jsonify({'status': 'alive', 'service': service_name}), 200
+
+    def readyz():
+        result = checker.snapshot()
+        return jsonify(result), 200 if result['status'] == 'ready' else 503
+
+    for base in ('', prefix):
+        app.add_url_rule(f'{base}/livez', f'livez{base}', livez, methods=['GET'])
+        app.add_url_rule(f'{base}/readyz', f'readyz{base}', readyz, methods=['GET'])
+    return checker
@@ -0,0 +1,211 @@
+"""Structured, non-blocking logging shared by all services.
+
+Request threads only put records on an in-memory queue; a single listener thread
+formats them as JSON lines and writes them to stderr. If the queue is full the
+record is dropped (and counted) rather than blocking the request.
+
+Records are labelled with the service passed to configure_logging(). When several
+services share a process (monolith.py), code running inside service_context(name)
+is labelled with that service instead; the label is read on the logging thread.
+
+Environment:
+    LOG_LEVEL          root level (default INFO)
+    LOG_LEVELS         per-logger levels, e.g. "werkzeug=WARNING,sqlalchemy.engine=INFO"
+    LOG_SAMPLE_RATES   per-logger sampling for high-volume INFO/DEBUG messages,
+                       e.g. "notification_service.email=0.1" keeps ~10%
+    LOG_QUEUE_SIZE     max records waiting for the listener (default 10000)
+"""
+import atexit
+import contextlib
+import contextvars
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+
+# Attributes every LogRecord has; anything else on a record came from `extra=`
+_RESERVED_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'sample_rate'}
+
+_state = {'listener': None, 'handler': None, 'service': None}
+_state_lock = threading.Lock()
+
+# Service handling the current request when it is not the process's own
+_request_service = contextvars.ContextVar('log_service', default=None)
+
+
+def _parse_mapping(value):
+    """Parse "a=1,b=2" into {'a': '1', 'b': '2'}"""
+    result = {}
+    for part in (value or '').split(','):
+        if '=' in part:
+            key, _, val = part.partition('=')
+            result[key.strip()] = val.strip()
+    return result
+
+
+class JsonFormatter(logging.Formatter):
+    """Render a record as one JSON object per line"""
+
+    def __init__(self, service_name):
+        super().__init__()
+        self.service_name = service_name
+
+    def format(self, record):
+        payload = {
+            'ts': datetime.datetime.utcfromtimestamp(record.created).isoformat(timespec='milliseconds') + 'Z',
+            'level': record.levelname,
+            'service': getattr(record, '_service', None) or self.service_name,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_text:
+            payload['exc'] = record.exc_text
+        elif record.exc_info:
+            payload['exc'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Drop a share of INFO/DEBUG records from noisy loggers; warnings are always kept.
+
+    A record can carry its own rate via extra={'sample_rate': 0.05}.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+
+    def _rate_for(self, name):
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition('.')[0]
+        return 1.0
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = getattr(record, 'sample_rate', None)
+        if rate is None:
+            rate = self._rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Resolve the message and traceback now, while args and exc_info are still valid,
+        # and leave the JSON rendering to the listener thread
+        record = logging.makeLogRecord(vars(record))
+        record._service = _request_service.get()
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging(service_name):
+    """Install the queue-backed JSON pipeline once per process and return the service logger"""
+    with _state_lock:
+        if _state['listener'] is None:
+            log_queue = queue.Queue(maxsize=int(os.getenv('LOG_QUEUE_SIZE', '10000')))
+
+            stream_handler = logging.StreamHandler(sys.stderr)
+            stream_handler.setFormatter(JsonFormatter(service_name))
+
+            handler = NonBlockingQueueHandler(log_queue)
+            rates = {name: float(rate) for name, rate in _parse_mapping(os.getenv('LOG_SAMPLE_RATES')).items()}
+            handler.addFilter(SamplingFilter(rates))
+
+            root = logging.getLogger()
+            for existing in list(root.handlers):
+                root.removeHandler(existing)
+            root.addHandler(handler)
+            root.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+            for name, level in _parse_mapping(os.getenv('LOG_LEVELS')).items():
+                logging.getLogger(name).setLevel(level.upper())
+
+            listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+            listener.start()
+            atexit.register(shutdown_logging)
+
+            _state.update(listener=listener, handler=handler, service=service_name)
+
+    return logging.getLogger(service_name)
+
+
+def _restart_listener_after_fork():
+    # Threads do not survive fork(): give the child its own queue and writer thread
+    listener = _state['listener']
+    if listener is None:
+        return
+    log_queue = queue.Queue(maxsize=listener.queue.maxsize)
+    _state['handler'].queue = log_queue
+    new_listener = logging.handlers.QueueListener(log_queue, *listener.handlers, respect_handler_level=True)
+    new_listener.start()
+    _state['listener'] = new_listener
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_listener_after_fork)
+
+
+@contextlib.contextmanager
+def service_context(service_name):
+    """Label records logged inside the block with service_name; None keeps the current label"""
+    if service_name is None:
+        yield
+        return
+    token = _request_service.set(service_name)
+    try:
+        yield
+    finally:
+        _request_service.reset(token)
+
+
+def request_service():
+    """The service_context() label in effect, or None"""
+    return _request_service.get()
+
+
+def add_record_filter(record_filter):
+    """Attach a filter that runs on the calling thread before records are queued"""
+    handler = _state['handler']
+    if handler is not None and record_filter not in handler.filters:
+        handler.addFilter(record_filter)
+
+
+def dropped_records():
+    """Number of records discarded because the queue was full"""
+    handler = _state['handler']
+    return handler.dropped if handler else 0
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    with _state_lock:
+        listener = _state['listener']
+        if listener is not None:
+            listener.stop()
+            _state['listener'] = None
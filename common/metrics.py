@@ -0,0 +1,233 @@
+"""In-process request, upstream and database metrics exposed at /metrics.
+
+Values are kept per worker process and rendered in the Prometheus text
+exposition format (version 0.0.4), so no client library is required.
+"""
+import bisect
+import threading
+import time
+
+from flask import current_app, g, has_app_context, has_request_context, request, Response
+from sqlalchemy import event
+
+from common.db_config import pool_status
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = [0] * (len(self.buckets) + 2)
+                self._values[labels] = state
+            if index < len(self.buckets):
+                state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, state in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, state):
+                    cumulative += count
+                    lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, [("le", _format_value(bound))])} {cumulative}')
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, [("le", "+Inf")])} {state[-1]}')
+                lines.append(f'{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(state[-2])}')
+                lines.append(f'{self.name}_count{_format_labels(self.labelnames, labels)} {state[-1]}')
+        return lines
+
+
+HTTP_REQUESTS = Counter(
+    'http_requests_total', 'HTTP requests handled, by route and status code',
+    ('service', 'method', 'route', 'status'))
+HTTP_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Time spent handling HTTP requests',
+    ('service', 'method', 'route'))
+UPSTREAM_REQUESTS = Counter(
+    'upstream_requests_total', 'Outbound calls to other services, by upstream and status code',
+    ('service', 'upstream', 'method', 'status'))
+UPSTREAM_LATENCY = Histogram(
+    'upstream_request_duration_seconds', 'Latency of outbound calls to other services',
+    ('service', 'upstream', 'method'))
+DB_QUERIES = Counter(
+    'db_queries_total', 'SQL statements executed',
+    ('service', 'engine'))
+DB_QUERY_LATENCY = Histogram(
+    'db_query_duration_seconds', 'Time spent executing SQL statements',
+    ('service', 'engine'))
+DB_QUERIES_PER_REQUEST = Histogram(
+    'db_queries_per_request', 'SQL statements executed per HTTP request',
+    ('service', 'route'), buckets=QUERY_COUNT_BUCKETS)
+DB_TIME_PER_REQUEST = Histogram(
+    'db_time_per_request_seconds', 'Total SQL time per HTTP request',
+    ('service', 'route'))
+
+_state = {'service': 'unknown', 'engines': {}}
+_extra_renderers = []
+_statement_observers = []
+
+
+def current_service():
+    """Service owning the active app context; several can share a process (monolith.py)"""
+    if has_app_context():
+        return current_app.config.get('SERVICE_NAME', _state['service'])
+    return _state['service']
+
+
+def route_label():
+    rule = request.url_rule
+    return rule.rule if rule is not None else 'unmatched'
+
+
+def observe_upstream(upstream, method, status, seconds):
+    """Record one outbound call; status is the HTTP code or 'error'"""
+    service = current_service()
+    UPSTREAM_REQUESTS.inc(service, upstream, method, str(status))
+    UPSTREAM_LATENCY.observe(seconds, service, upstream, method)
+
+
+def _instrument_engine(engine, engine_name, service):
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info['query_started_at'] = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop('query_started_at', None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        DB_QUERIES.inc(service, engine_name)
+        DB_QUERY_LATENCY.observe(elapsed, service, engine_name)
+        if has_request_context():
+            g.db_query_count = g.get('db_query_count', 0) + 1
+            g.db_query_seconds = g.get('db_query_seconds', 0.0) + elapsed
+        for observer in _statement_observers:
+            observer(statement, elapsed)
+
+
+def _render_pool_gauges():
+    gauges = {
+        'db_pool_size': ('Configured persistent connections', 'size'),
+        'db_pool_checked_out': ('Connections currently in use', 'checked_out'),
+        'db_pool_overflow': ('Overflow connections currently open', 'overflow'),
+    }
+    lines = []
+    statuses = {key: pool_status(engine) for key, engine in _state['engines'].items()}
+    for metric, (help_text, key) in gauges.items():
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} gauge']
+        for (service, name), status in statuses.items():
+            if key in status:
+                lines.append(f'{metric}{{service="{service}",engine="{name}"}} {status[key]}')
+    waits = {
+        'db_pool_checkout_wait_seconds_total': ('Total time spent waiting for a pooled connection', 'total_seconds'),
+        'db_pool_checkouts_total': ('Connection checkouts from the pool', 'count'),
+        'db_pool_checkout_timeouts_total': ('Checkouts that timed out waiting for a connection', 'timeouts'),
+    }
+    for metric, (help_text, key) in waits.items():
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} counter']
+        for (service, name), status in statuses.items():
+            if 'checkout_wait' in status:
+                lines.append(f'{metric}{{service="{service}",engine="{name}"}} {status["checkout_wait"][key]}')
+    return lines
+
+
+def register_statement_observer(observer):
+    """Call observer(statement, seconds) for every statement of the instrumented engines"""
+    _statement_observers.append(observer)
+
+
+def register_renderer(renderer):
+    """Add a callable returning extra exposition lines (e.g. gauges read at scrape time)"""
+    _extra_renderers.append(renderer)
+
+
+def render_metrics():
+    lines = []
+    for metric in (HTTP_REQUESTS, HTTP_LATENCY, UPSTREAM_REQUESTS, UPSTREAM_LATENCY,
+                   DB_QUERIES, DB_QUERY_LATENCY, DB_QUERIES_PER_REQUEST, DB_TIME_PER_REQUEST):
+        lines += metric.render()
+    lines += _render_pool_gauges()
+    for renderer in _extra_renderers:
+        lines += renderer()
+    return '\n'.join(lines) + '\n'
+
+
+def install_metrics(app, db, service_name):
+    """Time every request, count its SQL statements (db may be None) and serve /metrics"""
+    _state['service'] = service_name
+    app.config['SERVICE_NAME'] = service_name
+    with app.app_context():
+        for bind_key, engine in (db.engines.items() if db is not None else ()):
+            engine_name = bind_key or 'primary'
+            _state['engines'][(service_name, engine_name)] = engine
+            _instrument_engine(engine, engine_name, service_name)
+
+    @app.before_request
+    def _start_request_timer():
+        g.request_started_at = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.get('request_started_at')
+        if started is None:
+            return response
+        route = route_label()
+        HTTP_REQUESTS.inc(service_name, request.method, route, str(response.status_code))
+        HTTP_LATENCY.observe(time.perf_counter() - started, service_name, request.method, route)
+        DB_QUERIES_PER_REQUEST.observe(g.get('db_query_count', 0), service_name, route)
+        DB_TIME_PER_REQUEST.observe(g.get('db_query_seconds', 0.0), service_name, route)
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4; charset=utf-8')
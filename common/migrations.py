@@ -0,0 +1,275 @@
+"""Versioned schema migrations and a query-plan check for each service.
+
+Migrations live in migrations/<service_name>/NNNN_description.py and define
+`upgrade(op)`; they run in filename order and each is recorded once in the
+shared `schema_migrations` table (keyed by service, since on RDS all services
+share one database). Services run pending migrations from run_startup_checks
+before db.create_all(): migrations only alter tables that already exist, and
+tables created afterwards come with the indexes their models declare. A MySQL
+advisory lock keeps concurrently starting containers from applying the same
+migration twice.
+
+On MySQL indexes are added online (ALGORITHM=INPLACE, LOCK=NONE): reads and
+writes continue while the index is built. Every operation checks the live schema
+first, so re-running a half-applied migration is safe.
+
+migrations/<service_name>/query_plans.sql lists the queries behind the service's
+filtered routes. check_query_plans() EXPLAINs each one and reports any that would
+read a whole table:
+
+    python -m common.migrations order_service              # apply pending migrations
+    python -m common.migrations order_service --check-plans  # exit 1 on a full scan
+"""
+import argparse
+import datetime
+import importlib
+import importlib.util
+import logging
+import os
+import re
+import sys
+import time
+
+from sqlalchemy import inspect as sa_inspect, text
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MIGRATIONS_DIR = os.path.join(ROOT, 'migrations')
+LOCK_TIMEOUT = int(os.getenv('MIGRATION_LOCK_TIMEOUT', '300'))
+
+logger = logging.getLogger('common.migrations')
+
+# ════════════════════════════════════════════════════════════════════════════════
+# OPERATIONS AVAILABLE TO MIGRATIONS
+# ════════════════════════════════════════════════════════════════════════════════
+
+class Operations:
+    """Idempotent schema operations on one connection"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.dialect = connection.dialect.name
+
+    def _inspector(self):
+        return sa_inspect(self.connection)
+
+    def has_table(self, table):
+        return self._inspector().has_table(table)
+
+    def has_column(self, table, column):
+        return column in {c['name'] for c in self._inspector().get_columns(table)}
+
+    def indexes(self, table):
+        """{index name: [columns]} including unique constraints"""
+        inspector = self._inspector()
+        found = {index['name']: index['column_names'] for index in inspector.get_indexes(table)}
+        for constraint in inspector.get_unique_constraints(table):
+            found[constraint['name']] = constraint['column_names']
+        return found
+
+    def execute(self, sql, **params):
+        return self.connection.execute(text(sql), params)
+
+    def add_column(self, table, column, ddl):
+        """ALTER TABLE ... ADD COLUMN unless it exists; `ddl` is the type and constraints"""
+        if not self.has_table(table) or self.has_column(table, column):
+            return False
+        self.execute(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}')
+        return True
+
+    def add_indexes(self, table, indexes):
+        """Add missing indexes given as {name: [columns]}; skips tables that do not exist yet
+
+        A table created later by db.create_all() gets the indexes its model declares.
+        An index is also skipped when an existing one starts with the same columns.
+        On MySQL all missing indexes of the table are built in one online ALTER.
+        """
+        if not self.has_table(table):
+            return []
+        existing = self.indexes(table)
+
+        def covered(columns):
+            # e.g. MySQL already indexes a foreign key column
+            return any(list(have[:len(columns)]) == list(columns) for have in existing.values())
+
+        missing = {name: columns for name, columns in indexes.items()
+                   if name not in existing and not covered(columns)}
+        if not missing:
+            return []
+
+        if self.dialect == 'mysql':
+            clauses = ', '.join(f'ADD INDEX {name} ({", ".join(columns)})' for name, columns in missing.items())
+            self.execute(f'ALTER TABLE {table} {clauses}, ALGORITHM=INPLACE, LOCK=NONE')
+        else:
+            for name, columns in missing.items():
+                self.execute(f'CREATE INDEX {name} ON {table} ({", ".join(columns)})')
+        return list(missing)
+
+# ════════════════════════════════════════════════════════════════════════════════
+# RUNNER
+# ════════════════════════════════════════════════════════════════════════════════
+
+def _ensure_version_table(connection):
+    connection.execute(text(
+        'CREATE TABLE IF NOT EXISTS schema_migrations ('
+        'service VARCHAR(50) NOT NULL, '
+        'version VARCHAR(100) NOT NULL, '
+        'applied_at DATETIME NOT NULL, '
+        'duration_ms INTEGER NOT NULL, '
+        'PRIMARY KEY (service, version))'
+    ))
+
+
+def discover(service_name):
+    """Return [(version, path)] for the service, in the order they apply"""
+    directory = os.path.join(MIGRATIONS_DIR, service_name)
+    if not os.path.isdir(directory):
+        return []
+    return [(filename[:-3], os.path.join(directory, filename))
+            for filename in sorted(os.listdir(directory))
+            if re.match(r'^\d{4}_\w+\.py$', filename)]
+
+
+def _load(service_name, version, path):
+    spec = importlib.util.spec_from_file_location(f'migrations.{service_name}.{version}', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _acquire_lock(connection, service_name):
+    if connection.dialect.name != 'mysql':
+        return
+    acquired = connection.execute(
+        text('SELECT GET_LOCK(:name, :timeout)'), {'name': f'schema_migrations:{service_name}', 'timeout': LOCK_TIMEOUT}
+    ).scalar()
+    if acquired != 1:
+        raise RuntimeError(f'Timed out waiting for the migration lock of {service_name}')
+
+
+def _release_lock(connection, service_name):
+    if connection.dialect.name == 'mysql':
+        connection.execute(text('SELECT RELEASE_LOCK(:name)'), {'name': f'schema_migrations:{service_name}'})
+
+
+def run_migrations(db, service_name):
+    """Apply pending migrations for a service; returns the versions applied"""
+    available = discover(service_name)
+    applied_now = []
+    with db.engine.connect() as connection:
+        _acquire_lock(connection, service_name)
+        try:
+            _ensure_version_table(connection)
+            connection.commit()
+            applied = set(connection.execute(
+                text('SELECT version FROM schema_migrations WHERE service = :service'), {'service': service_name}
+            ).scalars())
+
+            for version, path in available:
+                if version in applied:
+                    continue
+                started = time.perf_counter()
+                _load(service_name, version, path).upgrade(Operations(connection))
+                duration_ms = int((time.perf_counter() - started) * 1000)
+                connection.execute(text(
+                    'INSERT INTO schema_migrations (service, version, applied_at, duration_ms) '
+                    'VALUES (:service, :version, :applied_at, :duration_ms)'
+                ), {'service': service_name, 'version': version,
+                    'applied_at': datetime.datetime.utcnow(), 'duration_ms': duration_ms})
+                connection.commit()
+                applied_now.append(version)
+                logger.info("Migration applied", extra={'service': service_name, 'version': version, 'duration_ms': duration_ms})
+        finally:
+            connection.rollback()
+            _release_lock(connection, service_name)
+    return applied_now
+
+# ════════════════════════════════════════════════════════════════════════════════
+# QUERY PLAN CHECK
+# ════════════════════════════════════════════════════════════════════════════════
+
+def load_query_plans(service_name):
+    """Parse migrations/<service>/query_plans.sql into [(route, sql)]
+
+    Each query is preceded by a `-- <route name>` comment line and ends with `;`.
+    """
+    path = os.path.join(MIGRATIONS_DIR, service_name, 'query_plans.sql')
+    if not os.path.exists(path):
+        return []
+    queries, name, lines = [], None, []
+    with open(path, encoding='utf-8') as handle:
+        for line in handle:
+            stripped = line.strip()
+            if stripped.startswith('--'):
+                name = stripped[2:].strip()
+            elif stripped:
+                lines.append(stripped)
+                if stripped.endswith(';'):
+                    queries.append((name, ' '.join(lines).rstrip(';')))
+                    lines = []
+    return queries
+
+
+def explain(connection, sql):
+    """Return (plan rows as dicts, full-scan tables, notes) for one query"""
+    full_scans, notes = [], []
+    if connection.dialect.name == 'mysql':
+        rows = [dict(row) for row in connection.execute(text(f'EXPLAIN {sql}')).mappings()]
+        for row in rows:
+            if row.get('type') == 'ALL':
+                if row.get('possible_keys'):
+                    # an index exists; the optimizer prefers a scan because the table is tiny
+                    notes.append(f"{row['table']}: scan chosen over {row['possible_keys']} (small table)")
+                else:
+                    full_scans.append(row['table'])
+            if 'filesort' in (row.get('Extra') or ''):
+                notes.append(f"{row['table']}: filesort")
+    else:
+        rows = [dict(row) for row in connection.execute(text(f'EXPLAIN QUERY PLAN {sql}')).mappings()]
+        for row in rows:
+            detail = row.get('detail', '')
+            match = re.match(r'SCAN (?:TABLE )?(\w+)', detail)
+            if match and 'USING' not in detail:
+                full_scans.append(match.group(1))
+            if 'TEMP B-TREE' in detail:
+                notes.append(detail)
+    return rows, full_scans, notes
+
+
+def check_query_plans(db, service_name):
+    """EXPLAIN every query in the service's query_plans.sql; returns [{route, full_scans, notes}]"""
+    results = []
+    with db.engine.connect() as connection:
+        for route, sql in load_query_plans(service_name):
+            _, full_scans, notes = explain(connection, sql)
+            results.append({'route': route, 'sql': sql, 'full_scans': full_scans, 'notes': notes})
+    return results
+
+# ════════════════════════════════════════════════════════════════════════════════
+# COMMAND LINE
+# ════════════════════════════════════════════════════════════════════════════════
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply schema migrations or check query plans for a service')
+    parser.add_argument('service', help='service module, e.g. order_service')
+    parser.add_argument('--check-plans', action='store_true', help='EXPLAIN the hot queries; exit 1 on a full table scan')
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    module = importlib.import_module(args.service)
+    with module.app.app_context():
+        if not args.check_plans:
+            applied = run_migrations(module.db, args.service)
+            print(f"{args.service}: applied {len(applied)} migration(s) {applied}")
+            return 0
+
+        failed = False
+        for result in check_query_plans(module.db, args.service):
+            status = 'FULL SCAN' if result['full_scans'] else 'ok'
+            failed = failed or bool(result['full_scans'])
+            detail = ', '.join(result['full_scans'] + result['notes'])
+            print(f"{status:9} {result['route']}{f'  ({detail})' if detail else ''}")
+        return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
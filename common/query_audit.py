@@ -0,0 +1,183 @@
+"""Per-request counts of SQL statements and outbound HTTP calls, with an N+1 detector.
+
+Every statement a service's engines execute (as seen by the engine hooks of
+common.metrics) and every call made through common.upstream during a request
+is counted against that request. A statement text (SQLAlchemy sends
+parameters separately, so a lazy load in a loop repeats the same text) or an
+upstream endpoint seen REPEAT_THRESHOLD times or more is reported as repeated:
+the usual signature of an N+1.
+
+After each request:
+    - a warning is logged when it ran more than QUERY_AUDIT_MAX_QUERIES
+      statements, made more than QUERY_AUDIT_MAX_HTTP_CALLS calls, or repeated
+      something, with the most repeated statements and endpoints
+    - in debug mode (or with QUERY_AUDIT_HEADERS=True) the counts are sent as
+      X-DB-Queries, X-DB-Time-Ms, X-HTTP-Calls and X-Repeated-Queries headers
+
+In tests, assert_max_queries() runs one request and fails with the statements it
+ran when it goes over budget:
+
+    assert_max_queries(order_service.app.test_client(), 3, 'GET', '/api/orders')
+
+Environment:
+    QUERY_AUDIT_MAX_QUERIES          statements per request before warning (default 25)
+    QUERY_AUDIT_MAX_HTTP_CALLS       outbound calls per request before warning (default 10)
+    QUERY_AUDIT_REPEAT_THRESHOLD     repeats of one statement or endpoint that count as N+1 (default 5)
+    QUERY_AUDIT_HEADERS              True|False (default: the value of FLASK_DEBUG)
+"""
+import contextlib
+import logging
+import os
+import re
+import threading
+from collections import Counter as Tally
+from urllib.parse import urlsplit
+
+from flask import g, has_app_context, request
+
+from common.metrics import register_statement_observer
+
+MAX_QUERIES = int(os.getenv('QUERY_AUDIT_MAX_QUERIES', '25'))
+MAX_HTTP_CALLS = int(os.getenv('QUERY_AUDIT_MAX_HTTP_CALLS', '10'))
+REPEAT_THRESHOLD = int(os.getenv('QUERY_AUDIT_REPEAT_THRESHOLD', '5'))
+HEADERS_ENABLED = os.getenv('QUERY_AUDIT_HEADERS', os.getenv('FLASK_DEBUG', 'False')).lower() == 'true'
+
+logger = logging.getLogger('common.query_audit')
+
+_local = threading.local()
+
+
+class RequestAudit:
+    """What one request executed"""
+
+    def __init__(self):
+        self.statements = Tally()
+        self.http_calls = Tally()
+        self.db_seconds = 0.0
+        # fan-out workers (tracing.carry_context) add to their request's audit
+        self.lock = threading.Lock()
+
+    def add_statement(self, statement, seconds):
+        with self.lock:
+            self.statements[' '.join(statement.split())] += 1
+            self.db_seconds += seconds
+
+    def add_http_call(self, key):
+        with self.lock:
+            self.http_calls[key] += 1
+
+    @property
+    def query_count(self):
+        return sum(self.statements.values())
+
+    @property
+    def http_call_count(self):
+        return sum(self.http_calls.values())
+
+    def repeated(self):
+        """[(statement or 'METHOD upstream path', count)] at or above REPEAT_THRESHOLD, most first"""
+        return [(key, count) for key, count in (self.statements + self.http_calls).most_common()
+                if count >= REPEAT_THRESHOLD]
+
+    def summary(self):
+        return {
+            'db_queries': self.query_count,
+            'db_time_ms': round(self.db_seconds * 1000, 1),
+            'http_calls': self.http_call_count,
+            'repeated': [{'statement': key[:300], 'count': count} for key, count in self.repeated()[:5]]
+        }
+
+
+def _current():
+    # set for requests by install_query_audit and carried into fan-out threads
+    return g.get('request_audit') if has_app_context() else None
+
+
+def record_http_call(upstream, method, url):
+    """Count one outbound call (called by common.upstream); ids in the path are folded into {id}"""
+    audit = _current()
+    if audit is not None:
+        path = re.sub(r'/\d+(?=/|$)', '/{id}', urlsplit(url).path)
+        audit.add_http_call(f'{method} {upstream} {path}')
+
+
+def _observe_statement(statement, seconds):
+    # called from the engine hooks of common.metrics
+    audit = _current()
+    if audit is not None:
+        audit.add_statement(statement, seconds)
+
+
+register_statement_observer(_observe_statement)
+
+
+@contextlib.contextmanager
+def capture_requests():
+    """Collect the RequestAudit of every request finished in this thread inside the block"""
+    captured = []
+    stack = getattr(_local, 'captures', None)
+    if stack is None:
+        stack = _local.captures = []
+    stack.append(captured)
+    try:
+        yield captured
+    finally:
+        stack.remove(captured)
+
+
+def assert_max_queries(client, max_queries, method, path, max_http_calls=None, **kwargs):
+    """Send one request with a Flask test client; AssertionError if it exceeds the budget
+
+    Returns the response. Requests nested inside it (monolith upstream calls) are
+    counted separately; only the outer request is checked.
+    """
+    with capture_requests() as captured:
+        response = client.open(path, method=method, **kwargs)
+    if not captured:
+        raise AssertionError(f'{method} {path} was not audited; is install_query_audit() called for this app?')
+    audit = captured[-1]  # nested requests finish first
+
+    problems = []
+    if audit.query_count > max_queries:
+        problems.append(f'{audit.query_count} SQL statements (max {max_queries})')
+    if max_http_calls is not None and audit.http_call_count > max_http_calls:
+        problems.append(f'{audit.http_call_count} HTTP calls (max {max_http_calls})')
+    if problems:
+        executed = '\n'.join(f'  {count:4}x {key}' for key, count in (audit.statements + audit.http_calls).most_common())
+        raise AssertionError(f'{method} {path} made {" and ".join(problems)}:\n{executed}')
+    return response
+
+
+def install_query_audit(app, service_name):
+    """Audit the statements and upstream calls of each request of `app`
+
+    Statements are seen through the engine hooks of install_metrics(), which must
+    be called for the same app.
+    """
+
+    @app.before_request
+    def _start_request_audit():
+        g.request_audit = RequestAudit()
+
+    @app.after_request
+    def _report_request_audit(response):
+        audit = g.pop('request_audit', None) or RequestAudit()
+        for captured in getattr(_local, 'captures', ()):
+            captured.append(audit)
+
+        repeated = audit.repeated()
+        if audit.query_count > MAX_QUERIES or audit.http_call_count > MAX_HTTP_CALLS or repeated:
+            rule = request.url_rule
+            logger.warning("Request exceeded query budget", extra={
+                'service': service_name,
+                'method': request.method,
+                'route': rule.rule if rule is not None else 'unmatched',
+                **audit.summary()
+            })
+
+        if HEADERS_ENABLED or app.debug:
+            response.headers['X-DB-Queries'] = str(audit.query_count)
+            response.headers['X-DB-Time-Ms'] = f'{audit.db_seconds * 1000:.1f}'
+            response.headers['X-HTTP-Calls'] = str(audit.http_call_count)
+            response.headers['X-Repeated-Queries'] = str(len(repeated))
+        return response
@@ -0,0 +1,218 @@
+"""In-memory "bought together" index: co-occurrence counts with a precomputed top-k per item.
+
+A background thread builds the index from every basket (e.g. the products of each
+order) when the process starts serving and again every
+RECOMMENDATIONS_REBUILD_INTERVAL seconds. Baskets written in between are added
+with add_basket(), which keeps each affected item's top-k list exact without
+rescanning its neighbours: counts only grow, so an item enters a list only by
+overtaking its last entry. Lookups read a precomputed list and do no I/O.
+
+Counts are sparse (only pairs that were bought together are stored). Baskets with
+more than RECOMMENDATIONS_MAX_BASKET distinct items are skipped; their pairs grow
+quadratically and say little about what goes together.
+
+The index is per worker process: a basket added through one worker reaches the
+others at their next rebuild.
+
+Environment:
+    RECOMMENDATIONS_TOP_K              items kept per item (default 10)
+    RECOMMENDATIONS_REBUILD_INTERVAL   seconds between full rebuilds (default 900)
+    RECOMMENDATIONS_MAX_BASKET         larger baskets are ignored (default 50)
+"""
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from common.metrics import register_renderer
+
+TOP_K = int(os.getenv('RECOMMENDATIONS_TOP_K', '10'))
+REBUILD_INTERVAL = float(os.getenv('RECOMMENDATIONS_REBUILD_INTERVAL', '900'))
+MAX_BASKET = int(os.getenv('RECOMMENDATIONS_MAX_BASKET', '50'))
+# Wait before retrying a build that failed
+RETRY_INTERVAL = 60
+
+logger = logging.getLogger('common.recommendations')
+
+_indexes = []
+
+
+def _rank(entry):
+    # most bought together first, lower id first among equals
+    return (-entry[1], entry[0])
+
+
+class _Counts:
+    """Co-occurrence counts and the top-k lists derived from them"""
+
+    def __init__(self, top_k):
+        self.top_k = top_k
+        self.pairs = defaultdict(dict)  # item -> {other item: baskets with both}
+        self.baskets_with = defaultdict(int)  # item -> baskets containing it
+        self.top = {}  # item -> [[other item, count], ...] best first, at most top_k
+        self.last_basket_id = None
+
+    def count(self, basket_id, items):
+        """Add one basket's pairs; returns the distinct items, or () for a skipped basket"""
+        if self.last_basket_id is None or basket_id > self.last_basket_id:
+            self.last_basket_id = basket_id
+        items = set(items)
+        if len(items) > MAX_BASKET:
+            return ()
+        for item in items:
+            self.baskets_with[item] += 1
+        for a, b in itertools.permutations(items, 2):
+            neighbours = self.pairs[a]
+            neighbours[b] = neighbours.get(b, 0) + 1
+        return items
+
+    def rank_all(self):
+        """Compute every top-k list from scratch (after a build)"""
+        self.top = {
+            item: sorted(([other, count] for other, count in neighbours.items()), key=_rank)[:self.top_k]
+            for item, neighbours in self.pairs.items()
+        }
+
+    def add(self, basket_id, items):
+        """Count one basket and keep the affected top-k lists exact"""
+        items = self.count(basket_id, items)
+        for item, other in itertools.permutations(items, 2):
+            self._promote(item, other)
+
+    def _promote(self, item, other):
+        # item's count with `other` went up by one
+        count = self.pairs[item][other]
+        top = self.top.setdefault(item, [])
+        for entry in top:
+            if entry[0] == other:
+                entry[1] = count
+                break
+        else:
+            if len(top) < self.top_k:
+                top.append([other, count])
+            elif _rank((other, count)) < _rank(top[-1]):
+                top[-1] = [other, count]
+            else:
+                return
+        top.sort(key=_rank)
+
+
+class CoOccurrenceIndex:
+    """Items most often found in the same basket as a given item"""
+
+    def __init__(self, name, load_baskets, app=None, top_k=TOP_K):
+        """load_baskets() yields (basket_id, [item, ...]) in ascending basket_id order
+
+        It runs in the builder thread, inside an app context of `app` when given.
+        """
+        self.name = name
+        self.load_baskets = load_baskets
+        self.app = app
+        self.top_k = top_k
+        self.lock = threading.Lock()
+        self.counts = _Counts(top_k)
+        self.built_at = None
+        self.build_seconds = None
+        self.pending = None  # baskets added while a build runs
+        self.thread = None
+        self.pid = None
+        _indexes.append(self)
+
+    def build(self):
+        """Recount every basket and swap the result in; baskets added meanwhile are kept"""
+        started = time.perf_counter()
+        with self.lock:
+            self.pending = []
+        try:
+            counts = _Counts(self.top_k)
+            for basket_id, items in self.load_baskets():
+                counts.count(basket_id, items)
+            counts.rank_all()
+            with self.lock:
+                last_loaded = counts.last_basket_id
+                for basket_id, items in self.pending:
+                    if last_loaded is None or basket_id > last_loaded:
+                        counts.add(basket_id, items)
+                self.counts = counts
+                self.built_at = time.time()
+                self.build_seconds = time.perf_counter() - started
+        finally:
+            with self.lock:
+                self.pending = None
+        logger.info("Recommendation index built", extra={
+            'index': self.name, 'items': len(counts.top), 'seconds': round(self.build_seconds, 3)})
+
+    def add_basket(self, basket_id, items):
+        """Count a newly written basket without waiting for the next rebuild"""
+        items = list(set(items))
+        with self.lock:
+            self.counts.add(basket_id, items)
+            if self.pending is not None:
+                self.pending.append((basket_id, items))
+
+    def related(self, item, limit=None):
+        """[{'item', 'count', 'confidence'}] best first; None until the first build has finished
+
+        confidence is the share of baskets with `item` that also had the other item.
+        """
+        with self.lock:
+            if self.built_at is None:
+                return None
+            top = self.counts.top.get(item, ())[:limit or self.top_k]
+            total = self.counts.baskets_with.get(item, 0)
+            return [{'item': other, 'count': count, 'confidence': round(count / total, 4)}
+                    for other, count in top]
+
+    def _loop(self):
+        while True:
+            try:
+                if self.app is not None:
+                    with self.app.app_context():
+                        self.build()
+                else:
+                    self.build()
+                delay = REBUILD_INTERVAL
+            except Exception as e:
+                logger.warning("Recommendation index build failed", extra={'index': self.name, 'error': str(e)})
+                delay = min(REBUILD_INTERVAL, RETRY_INTERVAL)
+            time.sleep(delay)
+
+    def ensure_started(self):
+        """Start the builder on first use in this process (threads do not survive fork)"""
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive() and self.pid == os.getpid():
+                return
+            self.thread = threading.Thread(target=self._loop, name=f'recommendations-{self.name}', daemon=True)
+            self.thread.start()
+            self.pid = os.getpid()
+
+
+def _render_index_gauges():
+    gauges = {
+        'recommendation_index_items': ('Items with at least one co-occurring item',
+                                       lambda index: len(index.counts.top)),
+        'recommendation_index_pairs': ('Stored co-occurrence counts',
+                                       lambda index: sum(len(neighbours) for neighbours in index.counts.pairs.values())),
+        'recommendation_index_age_seconds': ('Seconds since the last full build',
+                                             lambda index: round(time.time() - index.built_at, 1)),
+    }
+    lines = []
+    for metric, (help_text, read) in gauges.items():
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} gauge']
+        for index in _indexes:
+            with index.lock:
+                if index.built_at is not None:
+                    lines.append(f'{metric}{{index="{index.name}"}} {read(index)}')
+    return lines
+
+
+register_renderer(_render_index_gauges)
+
+
+def install_recommendations(app, name, load_baskets):
+    """Build a CoOccurrenceIndex in the background while `app` serves requests and return it"""
+    index = CoOccurrenceIndex(name, load_baskets, app=app)
+    app.before_request(index.ensure_started)
+    return index
@@ -0,0 +1,212 @@
+"""Optional read replica for GET routes that can tolerate slightly stale data.
+
+A service gets a second engine (bind key 'replica') when one of these is set:
+    <SERVICE>_REPLICA_DATABASE_URI   e.g. ORDER_SERVICE_REPLICA_DATABASE_URI
+    REPLICA_DATABASE_URI
+    DB_REPLICA_HOST                  built like the primary URI from DB_PORT/DB_USER/DB_PASSWORD/DB_NAME
+
+Only views decorated with @read_only are routed there, and only their SELECTs; any
+write still goes to the primary. Everything else, including the reads that follow
+a write in the same request, stays on the primary. A read-only request falls back
+to the primary when:
+    - the client sends `X-Consistency: strong` (read-your-writes)
+    - the replica is down or lags more than REPLICA_MAX_LAG_SECONDS (default 5)
+    - the view answered 404 or 5xx from the replica; it is run again on the primary,
+      since a row written moments ago may not have replicated yet
+
+Replication lag is measured by a background thread every REPLICA_CHECK_INTERVAL
+seconds (default 5) with SHOW REPLICA STATUS, so routing decisions do no I/O.
+Queries are labelled engine="replica" in the db_* metrics; routing decisions are
+counted in db_read_routing_total and the lag is exported as db_replica_lag_seconds.
+"""
+import functools
+import os
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+from common.db_config import engine_options
+from common.metrics import Counter, register_renderer
+
+REPLICA_BIND = 'replica'
+MAX_LAG_SECONDS = float(os.getenv('REPLICA_MAX_LAG_SECONDS', '5'))
+CHECK_INTERVAL = float(os.getenv('REPLICA_CHECK_INTERVAL', '5'))
+
+DB_READ_ROUTING = Counter(
+    'db_read_routing_total', 'Read-only requests by the engine that served them and why',
+    ('service', 'engine', 'reason'))
+
+_monitors = []
+
+
+def replica_uri(service_name):
+    """Return the configured replica URI for a service, or None"""
+    for key in (f'{service_name.upper()}_REPLICA_DATABASE_URI', 'REPLICA_DATABASE_URI'):
+        uri = os.getenv(key)
+        if uri:
+            return uri
+
+    host = os.getenv('DB_REPLICA_HOST')
+    if not host:
+        return None
+    port = os.getenv('DB_PORT', '3306')
+    user = os.getenv('DB_USER', 'admin')
+    password = os.getenv('DB_PASSWORD', 'ChangeMe123!')
+    name = os.getenv('DB_NAME', 'shopease')
+    return f'mysql+pymysql://{user}:{password}@{host}:{port}/{name}'
+
+
+def replica_binds(service_name, **pool_defaults):
+    """SQLALCHEMY_BINDS for a service: {} without a replica; pool settings as for the primary"""
+    uri = replica_uri(service_name)
+    if uri is None:
+        return {}
+    return {REPLICA_BIND: {'url': uri, **engine_options(service_name, uri, **pool_defaults)}}
+
+
+class RoutingSession(Session):
+    """Session that sends reads to the replica while a @read_only view is running"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and not isinstance(clause, UpdateBase)
+                and has_request_context() and g.get('db_engine') == REPLICA_BIND):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaMonitor:
+    """Measures replica availability and lag in the background"""
+
+    def __init__(self, app, db, service_name):
+        self.app = app
+        self.db = db
+        self.service_name = service_name
+        self.lock = threading.Lock()
+        self.status = None  # {'up': bool, 'lag_seconds': float | None, 'error': str}
+        self.thread = None
+        self.pid = None
+
+    def _measure_lag(self, connection):
+        if connection.dialect.name != 'mysql':
+            connection.exec_driver_sql('SELECT 1')
+            return 0.0
+        for statement, column in (('SHOW REPLICA STATUS', 'Seconds_Behind_Source'),
+                                  ('SHOW SLAVE STATUS', 'Seconds_Behind_Master')):
+            try:
+                row = connection.exec_driver_sql(statement).mappings().first()
+            except Exception:
+                continue  # older servers only know SHOW SLAVE STATUS
+            if row is None:
+                return 0.0  # not replicating: the "replica" is a primary or a proxy in front of one
+            lag = row.get(column)
+            return float(lag) if lag is not None else None  # NULL: replication is stopped
+        raise RuntimeError('cannot read replication status (REPLICATION CLIENT privilege needed)')
+
+    def check(self):
+        with self.app.app_context():
+            try:
+                with self.db.engines[REPLICA_BIND].connect() as connection:
+                    lag = self._measure_lag(connection)
+                status = {'up': lag is not None, 'lag_seconds': lag}
+                if lag is None:
+                    status['error'] = 'replication stopped'
+            except Exception as e:
+                status = {'up': False, 'lag_seconds': None, 'error': str(e)}
+        with self.lock:
+            self.status = status
+        return status
+
+    def _loop(self):
+        while True:
+            time.sleep(CHECK_INTERVAL)
+            try:
+                self.check()
+            except Exception:
+                pass  # keep the previous status until a check succeeds
+
+    def ensure_started(self):
+        """Start the checker on first use in this process (threads do not survive fork)"""
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive() and self.pid == os.getpid():
+                return
+            self.thread = threading.Thread(target=self._loop, name=f'replica-{self.service_name}', daemon=True)
+            self.thread.start()
+            self.pid = os.getpid()
+
+    def current(self):
+        self.ensure_started()
+        with self.lock:
+            status = self.status
+        return status if status is not None else self.check()
+
+    def choose(self):
+        """Return (engine, reason) for a read-only request"""
+        if request.headers.get('X-Consistency', '').lower() == 'strong':
+            return 'primary', 'strong_consistency'
+        status = self.current()
+        if not status['up']:
+            return 'primary', 'replica_unavailable'
+        if status['lag_seconds'] > MAX_LAG_SECONDS:
+            return 'primary', 'replica_lag'
+        return REPLICA_BIND, 'replica'
+
+
+def read_only(view):
+    """Serve a GET view from the replica when one is configured and fresh enough"""
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        monitor = current_app.extensions.get('replica')
+        if monitor is None:
+            return view(*args, **kwargs)
+
+        engine, reason = monitor.choose()
+        g.db_engine = engine
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+            if engine == REPLICA_BIND and (response.status_code == 404 or response.status_code >= 500):
+                # possibly not replicated yet, or the replica failed mid-request
+                monitor.db.session.close()
+                engine = 'primary'
+                reason = 'replica_not_found' if response.status_code == 404 else 'replica_error'
+                g.db_engine = engine
+                response = current_app.make_response(view(*args, **kwargs))
+        finally:
+            g.pop('db_engine', None)
+
+        DB_READ_ROUTING.inc(monitor.service_name, engine, reason)
+        response.headers['X-Read-Source'] = engine
+        return response
+
+    return wrapper
+
+
+def _render_replica_gauges():
+    lines = DB_READ_ROUTING.render() + [
+        '# HELP db_replica_lag_seconds Replication lag at the last check (-1 when unavailable)',
+        '# TYPE db_replica_lag_seconds gauge',
+    ]
+    for monitor in _monitors:
+        with monitor.lock:
+            status = monitor.status
+        if status is not None:
+            lag = status['lag_seconds'] if status['up'] else -1
+            lines.append(f'db_replica_lag_seconds{{service="{monitor.service_name}"}} {lag}')
+    return lines
+
+
+register_renderer(_render_replica_gauges)
+
+
+def install_replica(app, db, service_name):
+    """Enable @read_only routing when the app has a replica bind; returns the monitor or None"""
+    with app.app_context():
+        if REPLICA_BIND not in db.engines:
+            return None
+    monitor = ReplicaMonitor(app, db, service_name)
+    app.extensions['replica'] = monitor
+    _monitors.append(monitor)
+    return monitor
@@ -0,0 +1,137 @@
+"""Response encoding shared by all services: fast JSON and negotiated compression.
+
+JSON is produced by orjson when it is installed and by the stdlib json module
+otherwise; both write datetimes/dates as ISO 8601 and Decimals as numbers, the
+same shapes the models' to_dict() methods already use.
+
+Bodies larger than a threshold are gzip- or brotli-compressed when the client
+accepts it. brotli is used only if the `brotli` package is installed.
+
+Environment:
+    JSON_BACKEND              "orjson" or "json" (default: orjson if importable)
+    COMPRESSION_ENABLED       True|False (default True)
+    COMPRESSION_MIN_SIZE      smallest body in bytes worth compressing (default 1024)
+    COMPRESSION_GZIP_LEVEL    1-9 (default 6)
+    COMPRESSION_BROTLI_QUALITY 0-11 (default 4; higher is much slower)
+"""
+import datetime
+import decimal
+import gzip
+import json
+import os
+import uuid
+
+from flask import request
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+JSON_BACKEND = os.getenv('JSON_BACKEND', 'orjson' if orjson is not None else 'json').lower()
+COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'True').lower() == 'true'
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '4'))
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/javascript', 'image/svg+xml')
+
+
+def _default(value):
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if hasattr(value, '__html__'):
+        return str(value.__html__())
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider backed by orjson, falling back to the stdlib"""
+
+    mimetype = 'application/json'
+    use_orjson = JSON_BACKEND == 'orjson' and orjson is not None
+    # As in Flask's default provider; set app.json.sort_keys = False to keep insertion order
+    sort_keys = True
+
+    def dump_bytes(self, obj):
+        if self.use_orjson:
+            option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if self.sort_keys else 0)
+            return orjson.dumps(obj, default=_default, option=option)
+        return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':'),
+                          sort_keys=self.sort_keys).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            kwargs.setdefault('default', _default)
+            return json.dumps(obj, **kwargs)
+        return self.dump_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if self.use_orjson and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        # Skip the str round trip: the body is written as UTF-8 bytes directly
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dump_bytes(obj), mimetype=self.mimetype)
+
+
+def _choose_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def _compressible(response):
+    if response.direct_passthrough or response.is_streamed:
+        return False
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    if 'Content-Encoding' in response.headers:
+        return False
+    mimetype = response.mimetype or ''
+    return mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES
+
+
+def compress_response(response):
+    """after_request hook: compress large bodies with the best encoding the client accepts"""
+    if not _compressible(response):
+        return response
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < COMPRESSION_MIN_SIZE:
+        return response
+    encoding = _choose_encoding()
+    if encoding is None:
+        return response
+
+    if encoding == 'br':
+        compressed = brotli.compress(body, quality=BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    if response.headers.get('ETag'):
+        response.headers['ETag'] = response.headers['ETag'].rstrip('"') + f'-{encoding}"'
+    return response
+
+
+def install_responses(app):
+    """Use the fast JSON provider and compress large responses for this app"""
+    app.json = FastJSONProvider(app)
+    if COMPRESSION_ENABLED:
+        app.after_request(compress_response)
@@ -0,0 +1,172 @@
+"""In-memory frontend serving with long-lived caching and precompressed variants.
+
+`install_static(app)` serves / (index.html) and /frontend/<path>. Every file is
+read once at startup and kept in memory together with its ETag and compressed
+variants, so a request does no filesystem I/O and no compression.
+
+After `python build_frontend.py` the files come from frontend/dist/: assets have
+content-hashed names and are sent with `Cache-Control: public, max-age=31536000,
+immutable`; index.html and requests by the original names (script.js) get
+`no-cache` and are revalidated with their ETag. The .br/.gz files written by the
+build are chosen by Accept-Encoding. Without a build the plain frontend/ files are
+served with `no-cache` and gzip-compressed (brotli if installed) on load.
+
+Environment:
+    STATIC_DIR      frontend directory (default ./frontend)
+    STATIC_RELOAD   True|False: re-read the files when one changes, for frontend
+                    development (default: the value of FLASK_DEBUG)
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import threading
+from collections import namedtuple
+
+from flask import abort, current_app, request
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATIC_DIR = os.getenv('STATIC_DIR', os.path.join(ROOT, 'frontend'))
+STATIC_RELOAD = os.getenv('STATIC_RELOAD', os.getenv('FLASK_DEBUG', 'False')).lower() == 'true'
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+# Preferred first
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# variants: {encoding: compressed body}; cache_control for the name it was loaded under
+Asset = namedtuple('Asset', ['body', 'variants', 'etag', 'mimetype', 'cache_control'])
+
+
+def _read(path):
+    with open(path, 'rb') as handle:
+        return handle.read()
+
+
+def _asset(body, variants, name, cache_control):
+    mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    return Asset(body, variants, hashlib.sha256(body).hexdigest()[:20], mimetype, cache_control)
+
+
+def _load_dist(dist_dir):
+    with open(os.path.join(dist_dir, 'manifest.json'), encoding='utf-8') as handle:
+        manifest = json.load(handle)
+
+    assets = {}
+    for built, info in manifest['files'].items():
+        path = os.path.join(dist_dir, built)
+        variants = {encoding: _read(path + suffix) for encoding, suffix in ENCODINGS
+                    if encoding in info['encodings']}
+        body = _read(path)
+        hashed = built != info['source']
+        assets[built] = _asset(body, variants, built, IMMUTABLE if hashed else REVALIDATE)
+        if hashed:
+            # old pages and hand-written links still use the plain name
+            assets[info['source']] = assets[built]._replace(cache_control=REVALIDATE)
+    return assets
+
+
+def _load_plain(directory):
+    assets = {}
+    for current, subdirectories, filenames in os.walk(directory):
+        subdirectories[:] = [d for d in subdirectories if d != 'dist' and not d.startswith('.')]
+        for filename in filenames:
+            path = os.path.join(current, filename)
+            name = os.path.relpath(path, directory).replace(os.sep, '/')
+            body = _read(path)
+            variants = {'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                variants['br'] = brotli.compress(body, quality=11)
+            variants = {encoding: data for encoding, data in variants.items() if len(data) < len(body)}
+            assets[name] = _asset(body, variants, name, REVALIDATE)
+    return assets
+
+
+class StaticAssets:
+    """The files of one frontend directory, held in memory"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.assets = {}
+        self.version = None
+        self.load()
+
+    def _current_version(self):
+        latest = 0.0
+        for current, subdirectories, filenames in os.walk(self.directory):
+            for filename in filenames:
+                latest = max(latest, os.path.getmtime(os.path.join(current, filename)))
+        return latest
+
+    def load(self):
+        dist_dir = os.path.join(self.directory, 'dist')
+        if os.path.exists(os.path.join(dist_dir, 'manifest.json')):
+            assets = _load_dist(dist_dir)
+        elif os.path.isdir(self.directory):
+            assets = _load_plain(self.directory)
+        else:
+            assets = {}
+        with self.lock:
+            self.assets = assets
+            self.version = self._current_version() if STATIC_RELOAD else None
+
+    def get(self, name):
+        if STATIC_RELOAD and self._current_version() != self.version:
+            self.load()
+        with self.lock:
+            return self.assets.get(name)
+
+
+def _choose_encoding(asset):
+    accepted = request.accept_encodings
+    for encoding, _ in ENCODINGS:
+        if encoding in asset.variants and accepted[encoding]:
+            return encoding
+    return None
+
+
+def serve_asset(assets, name):
+    """Response for one asset: precompressed by Accept-Encoding, 304 when the ETag matches"""
+    asset = assets.get(name)
+    if asset is None:
+        abort(404)
+
+    encoding = _choose_encoding(asset)
+    etag = f'{asset.etag}-{encoding}' if encoding else asset.etag
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(asset.variants[encoding] if encoding else asset.body,
+                                              mimetype=asset.mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = asset.cache_control
+    if asset.variants:
+        response.vary.add('Accept-Encoding')
+    return response
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def install_static(app, directory=None):
+    """Serve / and /frontend/<path> for this app from memory; returns the StaticAssets"""
+    directory = directory or STATIC_DIR
+    with _shared_lock:
+        # one copy per directory, also when several apps share a process (monolith.py)
+        if directory not in _shared:
+            _shared[directory] = StaticAssets(directory)
+        assets = _shared[directory]
+
+    app.add_url_rule('/frontend/<path:path>', 'serve_frontend', lambda path: serve_asset(assets, path))
+    app.add_url_rule('/', 'home', lambda: serve_asset(assets, 'index.html'))
+    return assets
@@ -0,0 +1,199 @@
+"""Request IDs and per-hop timing spans propagated across service calls.
+
+Context travels in the W3C `traceparent` header; `X-Request-ID` carries the same
+trace id for humans and load balancer logs. The first service to see a request
+(the edge) starts the trace. Every inbound request and every outbound call through
+common.upstream becomes a span.
+
+Set TRACE_FILE to append finished spans as JSON lines (one file may be shared by
+several services); `python trace_report.py TRACE_FILE` rebuilds the call tree of
+the slowest traces. Without TRACE_FILE, IDs are still propagated but spans are not kept.
+"""
+import contextlib
+import functools
+import json
+import logging
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+
+from flask import current_app, g, has_app_context, request
+
+from common import logging_config
+from common.metrics import current_service
+
+TRACE_FILE = os.getenv('TRACE_FILE')
+TRACEPARENT_RE = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+_writer = {'queue': None, 'thread': None, 'pid': None}
+_writer_lock = threading.Lock()
+
+
+def new_trace_id():
+    return secrets.token_hex(16)
+
+
+def new_span_id():
+    return secrets.token_hex(8)
+
+
+class Span:
+    def __init__(self, name, kind, trace_id, parent_span_id=None, attributes=None):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = new_span_id()
+        self.parent_span_id = parent_span_id
+        self.attributes = attributes or {}
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self.duration_ms = None
+        self.service = current_service()
+
+    @property
+    def traceparent(self):
+        return f'00-{self.trace_id}-{self.span_id}-01'
+
+    def finish(self, **attributes):
+        self.attributes.update(attributes)
+        self.duration_ms = round((time.perf_counter() - self._started) * 1000, 3)
+        export_span(self)
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_span_id': self.parent_span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'service': self.service,
+            'start_time': self.start_time,
+            'duration_ms': self.duration_ms,
+            'attributes': self.attributes,
+        }
+
+
+def _write_loop(span_queue, path):
+    with open(path, 'a', encoding='utf-8', buffering=1) as handle:
+        while True:
+            item = span_queue.get()
+            handle.write(json.dumps(item, default=str) + '\n')
+
+
+def export_span(span):
+    """Queue a finished span for the writer thread; dropped if the writer is behind"""
+    if not TRACE_FILE:
+        return
+    with _writer_lock:
+        if _writer['pid'] != os.getpid():
+            span_queue = queue.Queue(maxsize=10000)
+            thread = threading.Thread(target=_write_loop, args=(span_queue, TRACE_FILE), name='trace-writer', daemon=True)
+            thread.start()
+            _writer.update(queue=span_queue, thread=thread, pid=os.getpid())
+    try:
+        _writer['queue'].put_nowait(span.to_dict())
+    except queue.Full:
+        pass
+
+
+def current_span():
+    if has_app_context():
+        return g.get('trace_span')
+    return None
+
+
+def current_request_id():
+    if has_app_context():
+        return g.get('request_id')
+    return None
+
+
+# Request state a worker thread needs: the trace (here), the query audit
+# (common.query_audit) and the deadline (common.deadline)
+CARRIED_CONTEXT = ('trace_span', 'request_id', 'request_audit', 'deadline')
+
+
+def carry_context(func):
+    """Wrap func so calls made from a worker thread stay in the current request's trace and budget"""
+    app = current_app._get_current_object()
+    carried = {key: g.get(key) for key in CARRIED_CONTEXT if g.get(key) is not None}
+    log_service = logging_config.request_service()
+
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        with app.app_context(), logging_config.service_context(log_service):
+            for key, value in carried.items():
+                setattr(g, key, value)
+            return func(*args, **kwargs)
+    return run
+
+
+@contextlib.contextmanager
+def client_span(upstream, method, url):
+    """Span around an outbound call; yields (span, headers to send)"""
+    parent = current_span()
+    span = Span(
+        f'{method} {upstream}',
+        'client',
+        parent.trace_id if parent else new_trace_id(),
+        parent.span_id if parent else None,
+        {'peer.service': upstream, 'http.method': method, 'http.url': url},
+    )
+    headers = {
+        'traceparent': span.traceparent,
+        'X-Request-ID': current_request_id() or span.trace_id,
+    }
+    try:
+        yield span, headers
+    finally:
+        span.finish()
+
+
+class TraceContextFilter(logging.Filter):
+    """Stamp log records emitted during a request with its request and trace IDs"""
+
+    def filter(self, record):
+        span = current_span()
+        if span is not None:
+            record.request_id = g.get('request_id')
+            record.trace_id = span.trace_id
+        return True
+
+
+def install_tracing(app, service_name):
+    """Join or start a trace for every request and echo X-Request-ID on the response"""
+    app.config.setdefault('SERVICE_NAME', service_name)
+    logging_config.add_record_filter(TraceContextFilter())
+
+    @app.before_request
+    def _start_server_span():
+        match = TRACEPARENT_RE.match(request.headers.get('traceparent', '').strip().lower())
+        trace_id, parent_span_id = (match.group(1), match.group(2)) if match else (new_trace_id(), None)
+        g.request_id = request.headers.get('X-Request-ID') or trace_id
+        g.trace_span = Span(
+            f'{request.method} {request.url_rule.rule if request.url_rule else request.path}',
+            'server',
+            trace_id,
+            parent_span_id,
+            {'http.method': request.method, 'http.target': request.full_path.rstrip('?'), 'request_id': g.request_id},
+        )
+
+    @app.after_request
+    def _tag_response(response):
+        span = g.get('trace_span')
+        if span is not None:
+            response.headers['X-Request-ID'] = g.request_id
+            response.headers['X-Trace-ID'] = span.trace_id
+            span.attributes['http.status_code'] = response.status_code
+        return response
+
+    @app.teardown_request
+    def _finish_server_span(exc):
+        span = g.pop('trace_span', None)
+        if span is not None:
+            if exc is not None:
+                span.attributes['error'] = repr(exc)
+            span.finish()
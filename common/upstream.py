@@ -0,0 +1,100 @@
+"""Outbound HTTP calls between services.
+
+Every inter-service call goes through request() so that it is timed, labelled
+with the upstream it targets (product, user, order, notification), counted
+against the current request by common.query_audit, bounded by the request's
+remaining deadline (common.deadline) and carries the caller's trace context.
+
+Upstreams registered with register_local() (see monolith.py) are served by calling
+the target Flask app directly through its WSGI interface instead of a socket; the
+caller still receives a requests.Response, so service code does not change.
+"""
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from common import deadline, logging_config, query_audit, tracing
+from common.metrics import observe_upstream
+
+
+_local_apps = {}
+
+
+def register_local(upstream, app):
+    """Route calls for `upstream` into `app` in this process"""
+    _local_apps[upstream] = app
+
+
+def _call_local(app, method, url, params=None, json=None, data=None, headers=None, **_ignored):
+    # timeout and other transport options have no meaning without a socket
+    parts = urlsplit(url)
+    with logging_config.service_context(app.config.get('SERVICE_NAME')):
+        result = app.test_client().open(
+            parts.path,
+            method=method,
+            query_string=params if params is not None else parts.query,
+            json=json,
+            data=data,
+            headers=headers,
+        )
+    response = requests.Response()
+    response.status_code = result.status_code
+    response.headers = CaseInsensitiveDict(result.headers)
+    response._content = result.get_data()
+    response.encoding = result.mimetype_params.get('charset', 'utf-8')
+    response.url = url
+    response.reason = result.status.partition(' ')[2]
+    return response
+
+
+def request(upstream, method, url, **kwargs):
+    """Send an HTTP request to another service; raises requests.RequestException like requests does"""
+    started = time.perf_counter()
+    status = 'error'
+    with tracing.client_span(upstream, method, url) as (span, trace_headers):
+        kwargs['headers'] = {**trace_headers, **deadline.outbound_headers(), **(kwargs.get('headers') or {})}
+        try:
+            deadline.check('upstream')
+            kwargs['timeout'] = deadline.clamp(kwargs.get('timeout'))
+            local_app = _local_apps.get(upstream)
+            if local_app is not None:
+                response = _call_local(local_app, method, url, **kwargs)
+            else:
+                response = requests.request(method, url, **kwargs)
+            status = response.status_code
+            return response
+        except requests.Timeout as e:
+            status = 'deadline' if isinstance(e, deadline.DeadlineExceeded) else 'timeout'
+            left = deadline.remaining()
+            if status == 'timeout' and left is not None and left <= 0:
+                # the timeout was the request's remaining budget
+                status = 'deadline'
+                deadline.mark_exceeded('upstream')
+                raise deadline.DeadlineExceeded(f'{method} {upstream} abandoned at the request deadline') from e
+            raise
+        finally:
+            span.attributes['http.status_code'] = status
+            observe_upstream(upstream, method, status, time.perf_counter() - started)
+            query_audit.record_http_call(upstream, method, url)
+
+
+def probe(upstream, url, timeout, params=None):
+    """GET for health checks and background polling: not traced or counted in the upstream metrics"""
+    local_app = _local_apps.get(upstream)
+    if local_app is not None:
+        return _call_local(local_app, 'GET', url, params=params)
+    return requests.get(url, params=params, timeout=timeout)
+
+
+def get(upstream, url, **kwargs):
+    return request(upstream, 'GET', url, **kwargs)
+
+
+def post(upstream, url, **kwargs):
+    return request(upstream, 'POST', url, **kwargs)
+
+
+def put(upstream, url, **kwargs):
+    return request(upstream, 'PUT', url, **kwargs)
@@ -13,9 +13,23 @@ const API_SERVICES = {
     user: `${ALB_BASE_URL}/api/users`,
     order: `${ALB_BASE_URL}/api/orders`,
     payment: `${ALB_BASE_URL}/api/payments`,
-    notification: `${ALB_BASE_URL}/api/notifications`
+    notification: `${ALB_BASE_URL}/api/notifications`,
+    storefront: `${ALB_BASE_URL}/api/storefront`
 };
 
+// One storefront request returns everything a page needs; null means fall back to the per-service calls
+async function loadStorefrontPage(page, params = {}) {
+    try {
+        const query = new URLSearchParams(params).toString();
+        const response = await fetch(`${API_SERVICES.storefront}/${page}${query ? `?${query}` : ''}`);
+        if (!response.ok) return null;
+        return await response.json();
+    } catch (error) {
+        console.error(`Error loading storefront page ${page}:`, error);
+        return null;
+    }
+}
+
 // Initialize the application
 window.onload = function() {
     checkLoginStatus();
@@ -168,10 +182,13 @@ async function fetchProducts() {
     if (errorElement) errorElement.style.display = 'none';
     
     try {
-        const response = await fetch(`${API_SERVICES.product}`);
-        if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
-        
-        const products = await response.json();
+        const page = await loadStorefrontPage('home');
+        let products = page && page.data.products;
+        if (!products) {
+            const response = await fetch(`${API_SERVICES.product}`);
+            if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+            products = await response.json();
+        }
         allProducts = products;
         displayProducts(products);
         if (loadingElement) loadingElement.style.display = 'none';
@@ -317,6 +334,31 @@ function displayCartItems() {
     cartTotal.textContent = total.toFixed(2);
 }
 
+// Place an order, waiting in the checkout queue while popular products are busy:
+// 202 means queued (retry with the ticket to keep our place), 429 means the queue is full
+async function submitOrder(orderData) {
+    let ticket = null;
+    for (let attempt = 0; attempt < 20; attempt++) {
+        const headers = { 'Content-Type': 'application/json' };
+        if (ticket) {
+            headers['X-Queue-Ticket'] = ticket;
+        }
+        const response = await fetch(`${API_SERVICES.order}`, {
+            method: 'POST',
+            headers,
+            body: JSON.stringify(orderData)
+        });
+        if (response.status !== 202) {
+            return response;
+        }
+        const queued = await response.json();
+        ticket = queued.ticket;
+        showNotification(`High demand: your checkout is queued, retrying in ${queued.retry_after}s`);
+        await new Promise(resolve => setTimeout(resolve, queued.retry_after * 1000));
+    }
+    throw new Error('The checkout queue is taking too long, please try again');
+}
+
 // Enhanced checkout function that uses Order Service
 async function checkout() {
     if (!currentUser) {
@@ -347,11 +389,7 @@ async function checkout() {
             shipping_address: shippingAddress
         };
         
-        const orderResponse = await fetch(`${API_SERVICES.order}`, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify(orderData)
-        });
+        const orderResponse = await submitOrder(orderData);
         
         if (!orderResponse.ok) {
             const error = await orderResponse.json();
@@ -503,86 +541,95 @@ function showAdminTab(tabName) {
 }
 
 async function loadAdminData() {
-    // Load default admin tab data
-    loadAllOrders();
+    // All admin tabs in one storefront request; any missing part is loaded directly
+    const page = await loadStorefrontPage('admin');
+    const data = page ? page.data : {};
+
+    if (data.orders) renderAdminOrders(data.orders.orders || data.orders);
+    else loadAllOrders();
+    if (data.users) renderAdminUsers(data.users);
+    if (data.payment_stats) renderPaymentStats(data.payment_stats);
 }
 
 async function loadAllOrders() {
     try {
         const response = await fetch(`${API_SERVICES.order}`);
         const data = await response.json();
-        const orders = data.orders || data;
-        
-        const ordersList = document.getElementById('admin-orders-list');
-        if (orders.length === 0) {
-            ordersList.innerHTML = '<p>No orders found.</p>';
-            return;
-        }
-        
-        ordersList.innerHTML = orders.map(order => `
-            <div class="admin-order-item">
-                <h4>Order #${order.id}</h4>
-                <p>User ID: ${order.user_id} | Total: ₹${order.total_amount} | Status: ${order.status}</p>
-                <p>Date: ${new Date(order.created_at).toLocaleDateString()}</p>
-            </div>
-        `).join('');
-        
+        renderAdminOrders(data.orders || data);
     } catch (error) {
         console.error('Error loading orders:', error);
     }
 }
 
+function renderAdminOrders(orders) {
+    const ordersList = document.getElementById('admin-orders-list');
+    if (orders.length === 0) {
+        ordersList.innerHTML = '<p>No orders found.</p>';
+        return;
+    }
+    
+    ordersList.innerHTML = orders.map(order => `
+        <div class="admin-order-item">
+            <h4>Order #${order.id}</h4>
+            <p>User ID: ${order.user_id} | Total: ₹${order.total_amount} | Status: ${order.status}</p>
+            <p>Date: ${new Date(order.created_at).toLocaleDateString()}</p>
+        </div>
+    `).join('');
+}
+
 async function loadAllUsers() {
     try {
         const response = await fetch(`${API_SERVICES.user}`);
-        const users = await response.json();
-        
-        const usersList = document.getElementById('admin-users-list');
-        usersList.innerHTML = users.map(user => `
-            <div class="admin-user-item">
-                <h4>${user.first_name} ${user.last_name}</h4>
-                <p>Username: ${user.username} | Email: ${user.email}</p>
-                <p>Joined: ${new Date(user.created_at).toLocaleDateString()}</p>
-            </div>
-        `).join('');
-        
+        renderAdminUsers(await response.json());
     } catch (error) {
         console.error('Error loading users:', error);
     }
 }
 
+function renderAdminUsers(users) {
+    const usersList = document.getElementById('admin-users-list');
+    usersList.innerHTML = users.map(user => `
+        <div class="admin-user-item">
+            <h4>${user.first_name} ${user.last_name}</h4>
+            <p>Username: ${user.username} | Email: ${user.email}</p>
+            <p>Joined: ${new Date(user.created_at).toLocaleDateString()}</p>
+        </div>
+    `).join('');
+}
+
 async function loadPaymentStats() {
     try {
         const response = await fetch(`${API_SERVICES.payment}/stats`);
-        const stats = await response.json();
-        
-        const statsContainer = document.getElementById('admin-payments-stats');
-        statsContainer.innerHTML = `
-            <div class="stats-grid">
-                <div class="stat-item">
-                    <h4>Total Payments</h4>
-                    <p>${stats.total_payments}</p>
-                </div>
-                <div class="stat-item">
-                    <h4>Successful Payments</h4>
-                    <p>${stats.completed_payments}</p>
-                </div>
-                <div class="stat-item">
-                    <h4>Success Rate</h4>
-                    <p>${stats.success_rate}%</p>
-                </div>
-                <div class="stat-item">
-                    <h4>Total Revenue</h4>
-                    <p>₹${stats.total_revenue}</p>
-                </div>
-            </div>
-        `;
-        
+        renderPaymentStats(await response.json());
     } catch (error) {
         console.error('Error loading payment stats:', error);
     }
 }
 
+function renderPaymentStats(stats) {
+    const statsContainer = document.getElementById('admin-payments-stats');
+    statsContainer.innerHTML = `
+        <div class="stats-grid">
+            <div class="stat-item">
+                <h4>Total Payments</h4>
+                <p>${stats.total_payments}</p>
+            </div>
+            <div class="stat-item">
+                <h4>Successful Payments</h4>
+                <p>${stats.completed_payments}</p>
+            </div>
+            <div class="stat-item">
+                <h4>Success Rate</h4>
+                <p>${stats.success_rate}%</p>
+            </div>
+            <div class="stat-item">
+                <h4>Total Revenue</h4>
+                <p>₹${stats.total_revenue}</p>
+            </div>
+        </div>
+    `;
+}
+
 // Enhanced product addition for admin
 async function addProduct(event) {
     event.preventDefault();
@@ -0,0 +1,70 @@
+"""Production server settings shared by every service image.
+
+Usage: gunicorn -c gunicorn.conf.py order_service:app   (or monolith:app)
+
+Environment:
+    PORT                        listen port (each Dockerfile sets its own)
+    WEB_CONCURRENCY             worker processes (default 2 x CPU cores + 1)
+    GUNICORN_THREADS            threads per worker (default 4; requests mostly wait on DB/HTTP)
+    GUNICORN_TIMEOUT            seconds a worker may stay silent before it is killed and replaced (default 30)
+    GUNICORN_GRACEFUL_TIMEOUT   seconds in-flight requests get to finish on shutdown or reload (default 30)
+    GUNICORN_KEEPALIVE          seconds to hold idle keep-alive connections from the ALB (default 5)
+    GUNICORN_MAX_REQUESTS       recycle a worker after this many requests, 0 disables (default 5000)
+    GUNICORN_ACCESS_LOG         "-" to write access logs to stdout (default off)
+
+Signals: TERM drains workers for up to GUNICORN_GRACEFUL_TIMEOUT seconds and exits;
+HUP re-reads this file and replaces workers gracefully. Because the app is preloaded,
+ship new code by restarting the container (or USR2 followed by WINCH/TERM on the old master).
+"""
+import importlib
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+worker_class = 'gthread'
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '5000'))
+max_requests_jitter = max_requests // 10
+
+# Import the app once in the master so workers fork with the code already loaded
+preload_app = True
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+
+
+def _service_module(server):
+    app = server.app.wsgi()
+    return app, importlib.import_module(app.import_name)
+
+
+def when_ready(server):
+    # Same database checks / schema setup as `python <service>.py`, run once in the master
+    app, module = _service_module(server)
+    startup = getattr(module, 'run_startup_checks', None)
+    if startup is not None:
+        startup()
+
+
+def post_fork(server, worker):
+    # Connections opened by the master must not be shared with the workers
+    from common.db_config import dispose_pools
+    app, _ = _service_module(server)
+    for service_app in getattr(app, 'apps', [app]):  # monolith.py serves several apps
+        dispose_pools(service_app)
+
+
+def worker_exit(server, worker):
+    # Flush what a worker holds in memory before it is recycled (max_requests) or stopped
+    app, _ = _service_module(server)
+    for service_app in getattr(app, 'apps', [app]):
+        on_exit = getattr(importlib.import_module(service_app.import_name), 'flush_digests_on_exit', None)
+        if on_exit is not None:
+            on_exit()
@@ -0,0 +1,27 @@
+"""Inbox columns and unread counters for databases created before the inbox existed
+
+Fresh databases get all of this from db.create_all(); here an existing
+notifications table gains read_at and the (user_id, created_at) index, and the
+counters table is created and seeded once from the current unread rows.
+"""
+
+
+def upgrade(op):
+    if not op.has_table('notifications'):
+        return
+
+    op.add_column('notifications', 'read_at', 'DATETIME NULL')
+    # InnoDB appends the primary key, so this also serves the (created_at, id) inbox keyset
+    op.add_indexes('notifications', {'ix_notifications_user_created': ['user_id', 'created_at']})
+
+    if not op.has_table('notification_unread_counts'):
+        op.execute(
+            'CREATE TABLE notification_unread_counts ('
+            'user_id INTEGER NOT NULL PRIMARY KEY, '
+            'unread_count INTEGER NOT NULL DEFAULT 0)'
+        )
+        # Afterwards the counters are only adjusted on write
+        op.execute(
+            'INSERT INTO notification_unread_counts (user_id, unread_count) '
+            'SELECT user_id, COUNT(*) FROM notifications WHERE read_at IS NULL GROUP BY user_id'
+        )
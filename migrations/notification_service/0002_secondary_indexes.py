@@ -0,0 +1,12 @@
+"""Indexes for the admin notification filters
+
+    notifications (status, created_at)    GET /api/notifications?status=, newest first
+    notifications (category, created_at)  GET /api/notifications?category=, newest first
+"""
+
+
+def upgrade(op):
+    op.add_indexes('notifications', {
+        'ix_notifications_status_created': ['status', 'created_at'],
+        'ix_notifications_category_created': ['category', 'created_at'],
+    })
@@ -0,0 +1,19 @@
+-- Queries behind notification_service's filtered routes, checked by
+-- `python -m common.migrations notification_service --check-plans`
+
+-- get_user_notifications
+SELECT * FROM notifications WHERE user_id = 1 ORDER BY created_at DESC;
+
+-- get_user_inbox (next page, unread only)
+SELECT * FROM notifications WHERE user_id = 1 AND read_at IS NULL
+    AND (created_at < '2024-01-01 00:00:00' OR (created_at = '2024-01-01 00:00:00' AND id < 100))
+    ORDER BY created_at DESC, id DESC LIMIT 21;
+
+-- get_user_unread_count
+SELECT unread_count FROM notification_unread_counts WHERE user_id = 1;
+
+-- get_all_notifications?status=
+SELECT * FROM notifications WHERE status = 'sent' ORDER BY created_at DESC;
+
+-- get_all_notifications?category=
+SELECT * FROM notifications WHERE category = 'order_confirmation' ORDER BY created_at DESC;
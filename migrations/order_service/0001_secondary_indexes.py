@@ -0,0 +1,14 @@
+"""Indexes for order history, the admin status filter and item loading
+
+    orders (user_id, created_at)   GET /api/orders/user/<id>, newest first
+    orders (status, created_at)    GET /api/orders?status=, newest first
+    order_items (order_id)         item lookups per order and the batched IN load
+"""
+
+
+def upgrade(op):
+    op.add_indexes('orders', {
+        'ix_orders_user_created': ['user_id', 'created_at'],
+        'ix_orders_status_created': ['status', 'created_at'],
+    })
+    op.add_indexes('order_items', {'ix_order_items_order': ['order_id']})
@@ -0,0 +1,14 @@
+-- Queries behind order_service's filtered routes, checked by
+-- `python -m common.migrations order_service --check-plans`
+
+-- get_user_orders
+SELECT * FROM orders WHERE user_id = 1 ORDER BY created_at DESC;
+
+-- get_all_orders?status=
+SELECT * FROM orders WHERE status = 'pending' ORDER BY created_at DESC;
+
+-- order items (serialize_order_rows, get_order)
+SELECT * FROM order_items WHERE order_id IN (1, 2, 3) ORDER BY id;
+
+-- bulk_update_order_status with a filter
+SELECT id FROM orders WHERE status = 'confirmed' AND created_at < '2030-01-01' ORDER BY created_at, id LIMIT 10001;
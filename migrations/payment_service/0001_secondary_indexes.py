@@ -0,0 +1,14 @@
+"""Indexes for payment lookups by order and user and the admin status filter
+
+    payments (order_id)                    GET /api/payments/order/<id>
+    payments (user_id, created_at)         GET /api/payments/user/<id>, newest first
+    payments (payment_status, created_at)  GET /api/payments?status= and the stats counts
+"""
+
+
+def upgrade(op):
+    op.add_indexes('payments', {
+        'ix_payments_order': ['order_id'],
+        'ix_payments_user_created': ['user_id', 'created_at'],
+        'ix_payments_status_created': ['payment_status', 'created_at'],
+    })
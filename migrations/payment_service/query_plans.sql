@@ -0,0 +1,14 @@
+-- Queries behind payment_service's filtered routes, checked by
+-- `python -m common.migrations payment_service --check-plans`
+
+-- get_payment_by_order
+SELECT * FROM payments WHERE order_id = 1;
+
+-- get_user_payments
+SELECT * FROM payments WHERE user_id = 1 ORDER BY created_at DESC;
+
+-- get_all_payments?status=
+SELECT * FROM payments WHERE payment_status = 'completed' ORDER BY created_at DESC;
+
+-- get_payment_stats (completed total)
+SELECT SUM(amount) FROM payments WHERE payment_status = 'completed';
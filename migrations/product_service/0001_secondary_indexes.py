@@ -0,0 +1,5 @@
+"""Index products.category for category browsing"""
+
+
+def upgrade(op):
+    op.add_indexes('products', {'ix_products_category': ['category']})
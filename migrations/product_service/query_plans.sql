@@ -0,0 +1,14 @@
+-- Queries behind product_service's filtered routes, checked by
+-- `python -m common.migrations product_service --check-plans`
+
+-- get_product
+SELECT * FROM products WHERE id = 1;
+
+-- products by category
+SELECT * FROM products WHERE category = 'Electronics';
+
+-- changes
+SELECT * FROM change_events WHERE id > 100 AND entity IN ('product') ORDER BY id LIMIT 500;
+
+-- changes (settled_id)
+SELECT id FROM change_events WHERE created_at < '2025-01-01 00:00:00' ORDER BY created_at DESC LIMIT 1;
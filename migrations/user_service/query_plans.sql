@@ -0,0 +1,17 @@
+-- Queries behind user_service's filtered routes, checked by
+-- `python -m common.migrations user_service --check-plans`
+
+-- get_user
+SELECT * FROM users WHERE id = 1;
+
+-- login / register (username check)
+SELECT * FROM users WHERE username = 'alice' LIMIT 1;
+
+-- register (email check)
+SELECT * FROM users WHERE email = 'alice@example.com' LIMIT 1;
+
+-- changes
+SELECT * FROM change_events WHERE id > 100 AND entity IN ('user') ORDER BY id LIMIT 500;
+
+-- changes (settled_id)
+SELECT id FROM change_events WHERE created_at < '2025-01-01 00:00:00' ORDER BY created_at DESC LIMIT 1;
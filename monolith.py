@@ -0,0 +1,119 @@
+"""Run all services in one process.
+
+Requests are dispatched to a service by URL prefix, as the ALB routes them, and
+calls between services made through common.upstream are handed straight to the
+target app instead of going over HTTP. The services keep their own models, routes
+and database settings (<SERVICE>_DATABASE_URI, falling back to DATABASE_URI), so
+the same code still deploys as separate containers for larger setups.
+
+    python monolith.py                              # development server on PORT (default 8000)
+    gunicorn -c gunicorn.conf.py monolith:app
+"""
+import os
+
+from flask import Flask, jsonify
+
+from common import upstream
+from common.logging_config import configure_logging, service_context
+
+logger = configure_logging('monolith')
+
+import notification_service
+import order_service
+import payment_service
+import product_service
+import storefront_service
+import user_service
+
+# upstream name (as used in common.upstream calls) -> service module
+SERVICES = {
+    'product': product_service,
+    'user': user_service,
+    'order': order_service,
+    'payment': payment_service,
+    'notification': notification_service,
+    'storefront': storefront_service,
+}
+
+# ════════════════════════════════════════════════════════════════════════════════
+# AGGREGATE HEALTH
+# ════════════════════════════════════════════════════════════════════════════════
+
+health_app = Flask(__name__)
+
+
+@health_app.route('/health', methods=['GET'])
+def health_check():
+    services = {}
+    for name, module in SERVICES.items():
+        result = module.app.test_client().get('/health')
+        services[name] = result.get_json(silent=True) or {'status': f'HTTP {result.status_code}'}
+        services[name]['http_status'] = result.status_code
+
+    healthy = all(service['http_status'] == 200 for service in services.values())
+    return jsonify({
+        'status': 'healthy' if healthy else 'degraded',
+        'service': 'monolith',
+        'services': services
+    }), 200 if healthy else 503
+
+# ════════════════════════════════════════════════════════════════════════════════
+# URL PREFIX DISPATCH
+# ════════════════════════════════════════════════════════════════════════════════
+
+class PrefixDispatcher:
+    """WSGI app that picks a service by path prefix and passes the path through unchanged"""
+
+    import_name = __name__
+
+    def __init__(self, routes, default_app):
+        self.routes = routes
+        self.default_app = default_app
+        self.apps = [module.app for module in SERVICES.values()]
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        for prefix, target in self.routes:
+            if path == prefix or path.startswith(prefix + '/'):
+                return self.dispatch(target, environ, start_response)
+        return self.dispatch(self.default_app, environ, start_response)
+
+    def dispatch(self, target, environ, start_response):
+        # the logging pipeline is configured once per process; label records with the mounted service
+        with service_context(target.config.get('SERVICE_NAME')):
+            return target(environ, start_response)
+
+
+app = PrefixDispatcher([
+    ('/health', health_app),
+    ('/api/products', product_service.app),
+    ('/init-data', product_service.app),
+    ('/api/users', user_service.app),
+    ('/api/orders', order_service.app),
+    ('/api/payments', payment_service.app),
+    ('/api/notifications', notification_service.app),
+    ('/api/storefront', storefront_service.app),
+], default_app=user_service.app)  # /, /frontend/* and /metrics (which covers every service)
+
+for upstream_name, module in SERVICES.items():
+    upstream.register_local(upstream_name, module.app)
+
+# ════════════════════════════════════════════════════════════════════════════════
+# APPLICATION STARTUP
+# ════════════════════════════════════════════════════════════════════════════════
+
+def run_startup_checks():
+    """Run every service's own startup checks"""
+    logger.info("Monolith starting", extra={'services': list(SERVICES), 'port': int(os.getenv('PORT', 8000))})
+    for module in SERVICES.values():
+        module.run_startup_checks()
+
+
+if __name__ == '__main__':
+    from werkzeug.serving import run_simple
+
+    run_startup_checks()
+
+    port = int(os.getenv('PORT', 8000))
+    debug = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
+    run_simple('0.0.0.0', port, app, use_debugger=debug, use_reloader=debug, threaded=True)
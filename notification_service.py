@@ -1,16 +1,36 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
+from sqlalchemy.exc import IntegrityError
+import atexit
+import base64
 import datetime
+import html
 import requests
 import smtplib
 import os
-import sys
+import threading
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import importlib
 import importlib.util
 from dotenv import load_dotenv; load_dotenv() 
+from common import upstream
+from common.db_config import build_database_uri, database_location, engine_options, pool_status
+from common.deadline import install_deadline
+from common.health import install_health
+from common.logging_config import configure_logging
+from common.metrics import install_metrics
+from common.migrations import run_migrations
+from common.query_audit import install_query_audit
+from common.replica import RoutingSession, install_replica, read_only, replica_binds
+from common.responses import install_responses
+from common.static import install_static
+from common.tracing import install_tracing
+
+logger = configure_logging('notification_service')
+email_logger = logger.getChild('email')
 
 
 # ════════════════════════════════════════════════════════════════════════════════
@@ -40,35 +60,51 @@ else:
     ENABLE_REAL_EMAIL_SENDING = os.getenv('ENABLE_REAL_EMAIL_SENDING', 'False').lower() == 'true'
     FROM_NAME = os.getenv('FROM_NAME', 'ShopEase E-Commerce')
     
-print(f"ENABLE_REAL_EMAIL_SENDING STATUS: {ENABLE_REAL_EMAIL_SENDING}")
-print(f"EMAIL_USER: {EMAIL_USER}")
+# ════════════════════════════════════════════════════════════════════════════════
+# DIGEST CONFIGURATION
+# ════════════════════════════════════════════════════════════════════════════════
+# When enabled, non-urgent email notifications are held per user for DIGEST_WINDOW_SECONDS
+# and delivered as one email. Categories listed in NOTIFICATION_IMMEDIATE_CATEGORIES (or
+# requests with "urgent": true) are still sent at once, and carry any pending items with them.
+# A window of 0 sends everything at once. Held items live in worker memory: they are flushed
+# when a worker exits cleanly (gunicorn worker_exit, atexit) but lost if it is killed.
+DIGEST_ENABLED = os.getenv('NOTIFICATION_DIGEST_ENABLED', 'False').lower() == 'true'
+DIGEST_WINDOW_SECONDS = float(os.getenv('NOTIFICATION_DIGEST_WINDOW', '300'))
+DIGEST_MAX_ITEMS = int(os.getenv('NOTIFICATION_DIGEST_MAX_ITEMS', '20'))
+IMMEDIATE_CATEGORIES = {
+    category.strip()
+    for category in os.getenv('NOTIFICATION_IMMEDIATE_CATEGORIES', 'payment_confirmation,user_registration').split(',')
+    if category.strip()
+}
+
+logger.info("Email configuration loaded", extra={'real_email_sending': ENABLE_REAL_EMAIL_SENDING, 'email_user': EMAIL_USER})
 
 app = Flask(__name__)
 CORS(app)
+install_responses(app)
 
 # ════════════════════════════════════════════════════════════════════════════════
 # DATABASE CONFIGURATION - RDS Connection
 # ════════════════════════════════════════════════════════════════════════════════
 
-DB_HOST = os.getenv('DB_HOST', 'shopease-db.cmni2wmcozyh.us-east-1.rds.amazonaws.com')
-DB_PORT = os.getenv('DB_PORT', '3306')
-DB_USER = os.getenv('DB_USER', 'admin')
-DB_PASSWORD = os.getenv('DB_PASSWORD', 'ChangeMe123!')
-# keep the db name same for all services
-DB_NAME = os.getenv('DB_NAME', 'shopease')
+# NOTIFICATION_SERVICE_DATABASE_URI or DATABASE_URI wins when set; otherwise it is built from DB_HOST/DB_PORT/DB_USER/DB_PASSWORD/DB_NAME
+DATABASE_URI = build_database_uri('notification_service')
+DB_HOST, DB_NAME = database_location(DATABASE_URI)
 
-DATABASE_URI = f'mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
-
-# Configure SQLAlchemy - DIRECTLY USE DATABASE_URI (no os.getenv wrapper!)
 app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URI
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SQLALCHEMY_ECHO'] = False
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'pool_pre_ping': True,
-    'pool_recycle': 300,
-}
+# Pool size/overflow/timeout/recycle are tunable via NOTIFICATION_SERVICE_DB_* or DB_* variables
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options('notification_service', DATABASE_URI)
+# Optional read replica for @read_only GET routes: NOTIFICATION_SERVICE_REPLICA_DATABASE_URI, REPLICA_DATABASE_URI or DB_REPLICA_HOST
+app.config['SQLALCHEMY_BINDS'] = replica_binds('notification_service')
 
-db = SQLAlchemy(app)
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
+install_metrics(app, db, 'notification_service')
+install_query_audit(app, 'notification_service')
+install_deadline(app)
+install_replica(app, db, 'notification_service')
+install_tracing(app, 'notification_service')
 
 # ════════════════════════════════════════════════════════════════════════════════
 # MICROSERVICES CONFIGURATION
@@ -76,12 +112,23 @@ db = SQLAlchemy(app)
 
 USER_SERVICE_URL = os.getenv('USER_SERVICE_URL', 'http://shopease-alb-1528125855.us-east-1.elb.amazonaws.com/api/users')
 
+# /livez and /readyz; dependency status is refreshed in the background
+health = install_health(app, db, 'notification_service', '/api/notifications', {'user': USER_SERVICE_URL})
+
 # ════════════════════════════════════════════════════════════════════════════════
 # NOTIFICATION MODEL - Maps to 'notifications' table in notificationdb
 # ════════════════════════════════════════════════════════════════════════════════
 
 class Notification(db.Model):
     __tablename__ = 'notifications'
+    __table_args__ = (
+        # InnoDB appends the primary key to secondary indexes, so this index also
+        # serves the (created_at, id) keyset ordering used by the inbox
+        db.Index('ix_notifications_user_created', 'user_id', 'created_at'),
+        # admin filters, newest first
+        db.Index('ix_notifications_status_created', 'status', 'created_at'),
+        db.Index('ix_notifications_category_created', 'category', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, nullable=False)
@@ -92,20 +139,178 @@ class Notification(db.Model):
     status = db.Column(db.String(50), default='pending')
     delivery_method = db.Column(db.String(50), default='email')
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    read_at = db.Column(db.DateTime, nullable=True)
     
     def to_dict(self):
+        return Notification.row_to_dict(self)
+    
+    @staticmethod
+    def row_to_dict(row):
+        """Serialize a Notification or a plain row selected from the notifications table"""
         return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'type': self.type,
-            'category': self.category,
-            'title': self.title,
-            'message': self.message,
-            'status': self.status,
-            'delivery_method': self.delivery_method,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'id': row.id,
+            'user_id': row.user_id,
+            'type': row.type,
+            'category': row.category,
+            'title': row.title,
+            'message': row.message,
+            'status': row.status,
+            'delivery_method': row.delivery_method,
+            'created_at': row.created_at.isoformat() if row.created_at else None,
+            'read_at': row.read_at.isoformat() if row.read_at else None
         }
 
+class NotificationUnreadCount(db.Model):
+    """Per-user unread counter, kept in step with notifications.read_at on every write"""
+    __tablename__ = 'notification_unread_counts'
+    
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    unread_count = db.Column(db.Integer, nullable=False, default=0)
+
+# ════════════════════════════════════════════════════════════════════════════════
+# NOTIFICATION STATISTICS
+# ════════════════════════════════════════════════════════════════════════════════
+
+# Seconds the grouped aggregate over the notifications table is reused between polls
+STATS_CACHE_TTL = float(os.getenv('NOTIFICATION_STATS_CACHE_TTL', '30'))
+
+class RollingCounter:
+    """Ring buffer of fixed-width time buckets counting events per key.
+
+    Buckets are reused in place once they fall out of the window, so memory stays
+    constant no matter how many notifications are recorded.
+    """
+
+    def __init__(self, bucket_seconds, num_buckets):
+        self.bucket_seconds = bucket_seconds
+        self.num_buckets = num_buckets
+        self._slots = [None] * num_buckets  # each slot: (bucket_number, {key: count})
+        self._lock = threading.Lock()
+
+    def add(self, key, now=None):
+        bucket = int((time.time() if now is None else now) // self.bucket_seconds)
+        slot = bucket % self.num_buckets
+        with self._lock:
+            entry = self._slots[slot]
+            if entry is None or entry[0] != bucket:
+                entry = (bucket, {})
+                self._slots[slot] = entry
+            entry[1][key] = entry[1].get(key, 0) + 1
+
+    def series(self, now=None):
+        """Return (bucket_start_epoch, counts) pairs for the window, oldest first"""
+        current = int((time.time() if now is None else now) // self.bucket_seconds)
+        oldest = current - self.num_buckets + 1
+        with self._lock:
+            live = {entry[0]: dict(entry[1]) for entry in self._slots if entry and entry[0] >= oldest}
+        return [(bucket * self.bucket_seconds, live.get(bucket, {})) for bucket in range(oldest, current + 1)]
+
+    def totals(self, now=None):
+        result = {}
+        for _, counts in self.series(now):
+            for key, value in counts.items():
+                result[key] = result.get(key, 0) + value
+        return result
+
+# Per-process counters of delivery outcomes: 60 one-minute buckets and 24 one-hour buckets
+RECENT_BY_MINUTE = RollingCounter(60, 60)
+RECENT_BY_HOUR = RollingCounter(3600, 24)
+
+_stats_cache = {'data': None, 'expires_at': 0.0}
+_stats_cache_lock = threading.Lock()
+
+def record_notification_outcome(status):
+    """Count a sent/failed notification in the rolling windows"""
+    now = time.time()
+    RECENT_BY_MINUTE.add(status, now)
+    RECENT_BY_HOUR.add(status, now)
+
+def aggregate_notification_counts():
+    """Count notifications by status, category and delivery method in one grouped query"""
+    rows = db.session.query(
+        Notification.status,
+        Notification.category,
+        Notification.delivery_method,
+        db.func.count(Notification.id)
+    ).group_by(
+        Notification.status,
+        Notification.category,
+        Notification.delivery_method
+    ).all()
+
+    by_status, by_category, by_delivery_method = {}, {}, {}
+    total = 0
+    for status, category, delivery_method, count in rows:
+        total += count
+        by_status[status] = by_status.get(status, 0) + count
+        by_category[category] = by_category.get(category, 0) + count
+        by_delivery_method[delivery_method] = by_delivery_method.get(delivery_method, 0) + count
+
+    return {
+        'total': total,
+        'by_status': by_status,
+        'by_category': by_category,
+        'by_delivery_method': by_delivery_method,
+        'computed_at': datetime.datetime.utcnow().isoformat()
+    }
+
+def get_cached_notification_counts(refresh=False):
+    """Return the grouped aggregate, recomputing it at most once per STATS_CACHE_TTL"""
+    with _stats_cache_lock:
+        if not refresh and _stats_cache['data'] is not None and time.monotonic() < _stats_cache['expires_at']:
+            return _stats_cache['data']
+        data = aggregate_notification_counts()
+        _stats_cache['data'] = data
+        _stats_cache['expires_at'] = time.monotonic() + STATS_CACHE_TTL
+        return data
+
+def summarize_window(counts):
+    sent = counts.get('sent', 0)
+    failed = counts.get('failed', 0)
+    attempted = sent + failed
+    return {
+        'sent': sent,
+        'failed': failed,
+        'success_rate': round((sent / attempted * 100) if attempted > 0 else 0, 2)
+    }
+
+# ════════════════════════════════════════════════════════════════════════════════
+# INBOX HELPERS
+# ════════════════════════════════════════════════════════════════════════════════
+
+INBOX_DEFAULT_LIMIT = 20
+INBOX_MAX_LIMIT = 100
+
+def adjust_unread_count(user_id, delta):
+    """Apply delta to the user's unread counter within the current transaction"""
+    counter = NotificationUnreadCount.__table__
+    new_count = counter.c.unread_count + delta
+    update = counter.update().where(counter.c.user_id == user_id).values(
+        unread_count=db.case((new_count < 0, 0), else_=new_count)
+    )
+    if db.session.execute(update).rowcount:
+        return
+    
+    # A missing row means zero unread; create it, tolerating a concurrent insert
+    try:
+        with db.session.begin_nested():
+            db.session.execute(counter.insert().values(user_id=user_id, unread_count=max(delta, 0)))
+    except IntegrityError:
+        db.session.execute(update)
+
+def get_unread_count(user_id):
+    count = db.session.query(NotificationUnreadCount.unread_count).filter_by(user_id=user_id).scalar()
+    return count or 0
+
+def encode_inbox_cursor(notification):
+    raw = f"{notification.created_at.isoformat()}|{notification.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_inbox_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    created_at, notification_id = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+    return datetime.datetime.fromisoformat(created_at), int(notification_id)
+
 # ════════════════════════════════════════════════════════════════════════════════
 # HELPER FUNCTIONS
 # ════════════════════════════════════════════════════════════════════════════════
@@ -113,12 +318,12 @@ class Notification(db.Model):
 def get_user_details(user_id):
     """Fetch user details from user service"""
     try:
-        response = requests.get(f'{USER_SERVICE_URL}/{user_id}', timeout=5)
+        response = upstream.get('user', f'{USER_SERVICE_URL}/{user_id}', timeout=5)
         if response.status_code == 200:
             return response.json()
         return None
     except requests.RequestException as e:
-        print(f"⚠️ Failed to get user details for user_id {user_id}: {str(e)}", file=sys.stderr)
+        logger.warning("Failed to get user details", extra={'user_id': user_id, 'error': str(e)})
         return None
 
 def send_email_notification(recipient_email, subject, message):
@@ -138,32 +343,26 @@ def send_email_notification(recipient_email, subject, message):
             server.sendmail(EMAIL_USER, recipient_email, text)
             server.quit()
             
-            print(f"✉️  REAL EMAIL SENT to {recipient_email}", file=sys.stderr)
+            email_logger.info("Email sent", extra={'recipient': recipient_email, 'subject': subject})
             return True, "Email sent successfully to " + recipient_email
         else:
             # Demo mode
-            print("\n" + "="*60, file=sys.stderr)
-            print("📧 EMAIL NOTIFICATION (DEMO MODE)", file=sys.stderr)
-            print("="*60, file=sys.stderr)
-            print(f"From: {FROM_NAME} <{EMAIL_USER}>", file=sys.stderr)
-            print(f"To: {recipient_email}", file=sys.stderr)
-            print(f"Subject: {subject}", file=sys.stderr)
-            print("-"*60, file=sys.stderr)
-            print("MESSAGE CONTENT:", file=sys.stderr)
-            print(message[:500], file=sys.stderr)  # First 500 chars
-            print("="*60, file=sys.stderr)
-            print("✅ Email simulation completed successfully!", file=sys.stderr)
-            print("="*60 + "\n", file=sys.stderr)
+            email_logger.info("Email simulated (demo mode)", extra={
+                'sender': f"{FROM_NAME} <{EMAIL_USER}>",
+                'recipient': recipient_email,
+                'subject': subject,
+                'preview': message[:500]
+            })
             
             return True, f"Email simulated successfully for {recipient_email}"
         
     except Exception as e:
-        print(f"❌ Email sending failed: {str(e)}", file=sys.stderr)
+        email_logger.error("Email sending failed", extra={'recipient': recipient_email, 'error': str(e)})
         return False, str(e)
 
 def send_sms_notification(phone_number, message):
     """Send SMS notification (simulated)"""
-    print(f"📱 SMS to {phone_number}: {message}", file=sys.stderr)
+    logger.info("SMS simulated", extra={'phone_number': phone_number, 'preview': message[:160]})
     return True, "SMS sent successfully"
 
 def create_email_template(category, data):
@@ -265,6 +464,191 @@ def create_email_template(category, data):
     
     return templates.get(category, templates['general'])
 
+# ════════════════════════════════════════════════════════════════════════════════
+# DIGEST MODE
+# ════════════════════════════════════════════════════════════════════════════════
+
+class DigestBuffer:
+    """Per-user holding area for notifications waiting to be sent as one digest"""
+
+    def __init__(self, window_seconds, max_items):
+        self.window_seconds = window_seconds
+        self.max_items = max_items
+        self._pending = {}  # user_id -> {'user': {...}, 'items': [...], 'due_at': monotonic}
+        self._lock = threading.Lock()
+
+    def add(self, user, item):
+        """Buffer an item; returns the pending batch if it just reached max_items"""
+        with self._lock:
+            entry = self._pending.get(item['user_id'])
+            if entry is None:
+                entry = {'user': user, 'items': [], 'due_at': time.monotonic() + self.window_seconds}
+                self._pending[item['user_id']] = entry
+            entry['items'].append(item)
+            if len(entry['items']) >= self.max_items:
+                return self._pending.pop(item['user_id'])
+            return None
+
+    def due_in(self, user_id):
+        with self._lock:
+            entry = self._pending.get(user_id)
+            return max(entry['due_at'] - time.monotonic(), 0) if entry else 0
+
+    def take(self, user_id):
+        with self._lock:
+            entry = self._pending.pop(user_id, None)
+            return entry['items'] if entry else []
+
+    def put_back(self, user, items):
+        """Return items that could not be delivered; they go out with the user's next digest"""
+        with self._lock:
+            entry = self._pending.get(items[0]['user_id'])
+            if entry is None:
+                entry = {'user': user, 'items': [], 'due_at': time.monotonic() + self.window_seconds}
+                self._pending[items[0]['user_id']] = entry
+            entry['items'][:0] = items
+
+    def take_due(self, flush_all=False):
+        now = time.monotonic()
+        with self._lock:
+            due = [user_id for user_id, entry in self._pending.items() if flush_all or entry['due_at'] <= now]
+            return [self._pending.pop(user_id) for user_id in due]
+
+DIGEST_BUFFER = DigestBuffer(DIGEST_WINDOW_SECONDS, DIGEST_MAX_ITEMS)
+_digest_flusher = {'thread': None, 'pid': None}
+_digest_flusher_lock = threading.Lock()
+
+def should_digest(data, category, delivery_method):
+    return (
+        DIGEST_ENABLED
+        and DIGEST_WINDOW_SECONDS > 0
+        and delivery_method == 'email'
+        and category not in IMMEDIATE_CATEGORIES
+        and not data.get('urgent', False)
+    )
+
+def create_digest_template(items, lead_template=None):
+    """Render buffered items as one email, optionally appended to an immediate notification"""
+    rows = ''.join(
+        f'<li><strong>{html.escape(item["title"] or item["category"].replace("_", " ").title())}</strong>'
+        f'<br>{html.escape(item["message"])}</li>'
+        for item in items
+    )
+    summary = f'<h3>Also since our last email:</h3><ul>{rows}</ul>'
+    
+    if lead_template:
+        body = lead_template['body']
+        if '</body>' in body:
+            body = body.replace('</body>', f'{summary}</body>', 1)
+        else:
+            body += summary
+        return {'subject': lead_template['subject'], 'body': body}
+    
+    return {
+        'subject': f'You have {len(items)} new update{"s" if len(items) != 1 else ""} from ShopEase',
+        'body': f'''
+            <html>
+            <body style="font-family: Arial, sans-serif;">
+                <h2>Your ShopEase updates</h2>
+                <p>Dear Customer,</p>
+                <ul>{rows}</ul>
+                <p>Thank you for shopping with ShopEase!</p>
+            </body>
+            </html>
+            '''
+    }
+
+def persist_digest_items(items, status):
+    """Insert digest items with the given status using a single multi-row INSERT"""
+    if not items:
+        return
+    db.session.execute(Notification.__table__.insert(), [
+        {
+            'user_id': item['user_id'],
+            'type': item['type'],
+            'category': item['category'],
+            'title': item['title'],
+            'message': item['message'],
+            'delivery_method': 'email',
+            'status': status,
+            'created_at': item['created_at']
+        }
+        for item in items
+    ])
+    adjust_unread_count(items[0]['user_id'], len(items))
+
+def deliver_digest(user, items):
+    """Record one digest for a user's buffered items, then send it
+
+    The rows are committed as pending before the email goes out, so nothing is
+    sent that is not also in the inbox; if the commit fails the items go back to
+    the buffer. The rows get their delivery status once the email has been sent.
+    """
+    try:
+        persist_digest_items(items, 'pending')
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        DIGEST_BUFFER.put_back(user, items)
+        logger.exception("Error saving digest", extra={'user_id': user.get('id')})
+        return
+    
+    template = create_digest_template(items)
+    success, error_message = send_email_notification(user['email'], template['subject'], template['body'])
+    status = 'sent' if success else 'failed'
+    for _ in items:
+        record_notification_outcome(status)
+    
+    # Committed pending email rows of this user at these times are the ones just written
+    try:
+        db.session.execute(
+            db.update(Notification)
+            .where(Notification.user_id == items[0]['user_id'],
+                   Notification.delivery_method == 'email',
+                   Notification.status == 'pending',
+                   Notification.created_at.in_([item['created_at'] for item in items]))
+            .values(status=status)
+        )
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Error updating digest status", extra={'user_id': user.get('id'), 'status': status})
+
+def flush_due_digests(flush_all=False):
+    for entry in DIGEST_BUFFER.take_due(flush_all=flush_all):
+        deliver_digest(entry['user'], entry['items'])
+
+def _digest_flush_loop():
+    while True:
+        time.sleep(min(1.0, max(DIGEST_WINDOW_SECONDS, 0.1)))
+        try:
+            with app.app_context():
+                flush_due_digests()
+        except Exception as e:
+            logger.exception("Digest flush failed")
+
+def ensure_digest_flusher():
+    """Start the background flusher on first use in this process"""
+    with _digest_flusher_lock:
+        thread = _digest_flusher['thread']
+        if thread is not None and thread.is_alive() and _digest_flusher['pid'] == os.getpid():
+            return
+        thread = threading.Thread(target=_digest_flush_loop, name='digest-flusher', daemon=True)
+        thread.start()
+        _digest_flusher['thread'] = thread
+        _digest_flusher['pid'] = os.getpid()
+
+@atexit.register
+def flush_digests_on_exit():
+    """Send every held digest now; run when the process exits (also gunicorn's worker_exit)"""
+    if not DIGEST_ENABLED:
+        return
+    try:
+        with app.app_context():
+            flush_due_digests(flush_all=True)
+    except Exception as e:
+        logger.exception("Digest flush on shutdown failed")
+
 # ════════════════════════════════════════════════════════════════════════════════
 # API ROUTES
 # ════════════════════════════════════════════════════════════════════════════════
@@ -272,11 +656,8 @@ def create_email_template(category, data):
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    try:
-        db.session.execute(db.text('SELECT 1'))
-        db_status = 'connected'
-    except Exception as e:
-        db_status = f'disconnected: {str(e)}'
+    # Served from the background checker's cache; see /readyz for check details
+    db_status = health.database_status()
     
     return jsonify({
         'status': 'healthy',
@@ -284,7 +665,8 @@ def health_check():
         'database': db_status,
         'db_name': DB_NAME,
         'db_host': DB_HOST,
-        'email_enabled': ENABLE_REAL_EMAIL_SENDING
+        'email_enabled': ENABLE_REAL_EMAIL_SENDING,
+        'db_pool': pool_status(db.engine)
     }), 200
 
 @app.route('/test-email', methods=['POST'])
@@ -328,7 +710,7 @@ def test_email():
             }), 500
             
     except Exception as e:
-        print(f"❌ Error in test_email: {e}", file=sys.stderr)
+        logger.exception("Error in test_email")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/notifications', methods=['POST'])
@@ -353,14 +735,43 @@ def create_notification():
         elif not user:
             return jsonify({'error': 'User not found and no email provided'}), 404
         
+        category = data.get('category', 'general')
+        delivery_method = data.get('delivery_method', 'email')
+        
+        # Non-urgent email: hold it for the user's next digest instead of sending now
+        if should_digest(data, category, delivery_method):
+            batch = DIGEST_BUFFER.add(user, {
+                'user_id': data['user_id'],
+                'type': data['type'],
+                'category': category,
+                'title': data.get('title', ''),
+                'message': data['message'],
+                'created_at': datetime.datetime.utcnow()
+            })
+            if batch:
+                deliver_digest(batch['user'], batch['items'])
+            else:
+                ensure_digest_flusher()
+            
+            return jsonify({
+                'user_id': data['user_id'],
+                'type': data['type'],
+                'category': category,
+                'status': 'sent' if batch else 'queued',
+                'delivery_method': delivery_method,
+                'delivery_status': 'sent' if batch else 'queued',
+                'delivery_message': 'Delivered in digest' if batch else 'Queued for digest',
+                'digest_due_in_seconds': round(DIGEST_BUFFER.due_in(data['user_id']), 1)
+            }), 202
+        
         # Create notification
         notification = Notification(
             user_id=data['user_id'],
             type=data['type'],
-            category=data.get('category', 'general'),
+            category=category,
             title=data.get('title', ''),
             message=data['message'],
-            delivery_method=data.get('delivery_method', 'email')
+            delivery_method=delivery_method
         )
         
         db.session.add(notification)
@@ -369,9 +780,14 @@ def create_notification():
         # Send notification
         success = False
         error_message = ""
+        pending_items = []
         
         if notification.delivery_method == 'email':
             template = create_email_template(notification.category, data)
+            # Fold anything waiting in this user's digest into the email we are sending anyway
+            pending_items = DIGEST_BUFFER.take(notification.user_id) if DIGEST_ENABLED else []
+            if pending_items:
+                template = create_digest_template(pending_items, lead_template=template)
             success, error_message = send_email_notification(
                 user['email'], 
                 template['subject'], 
@@ -388,21 +804,28 @@ def create_notification():
         
         # Update status
         notification.status = 'sent' if success else 'failed'
+        adjust_unread_count(notification.user_id, 1)
+        persist_digest_items(pending_items, notification.status)
         
         db.session.commit()
+        for _ in range(1 + len(pending_items)):
+            record_notification_outcome(notification.status)
         
         response_data = notification.to_dict()
         response_data['delivery_status'] = 'sent' if success else 'failed'
         response_data['delivery_message'] = error_message
+        if pending_items:
+            response_data['digest_items_included'] = len(pending_items)
         
         return jsonify(response_data), 201
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Error creating notification: {e}", file=sys.stderr)
+        logger.exception("Error creating notification")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/notifications/<int:notification_id>', methods=['GET'])
+@read_only
 def get_notification(notification_id):
     """Get notification details"""
     try:
@@ -412,53 +835,184 @@ def get_notification(notification_id):
         return jsonify({'error': str(e)}), 404
 
 @app.route('/api/notifications/user/<int:user_id>', methods=['GET'])
+@read_only
 def get_user_notifications(user_id):
     """Get all notifications for a user"""
     try:
-        notifications = Notification.query.filter_by(user_id=user_id).order_by(
-            Notification.created_at.desc()
+        rows = db.session.execute(
+            db.select(Notification.__table__).where(Notification.user_id == user_id).order_by(
+                Notification.created_at.desc()
+            )
         ).all()
-        return jsonify([notification.to_dict() for notification in notifications]), 200
+        return jsonify([Notification.row_to_dict(row) for row in rows]), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# The inbox and the badge are read right after a send or /read, so they stay on the primary:
+# replica lag would show notifications just marked read as unread
+@app.route('/api/notifications/user/<int:user_id>/inbox', methods=['GET'])
+def get_user_inbox(user_id):
+    """Get one page of a user's inbox, newest first
+
+    Pages are keyed on (created_at, id): pass the returned next_cursor as ?cursor=
+    to continue. ?unread_only=true restricts the page to unread notifications.
+    """
+    try:
+        limit = min(max(request.args.get('limit', INBOX_DEFAULT_LIMIT, type=int), 1), INBOX_MAX_LIMIT)
+        unread_only = request.args.get('unread_only', 'false').lower() == 'true'
+        cursor = request.args.get('cursor')
+        
+        query = db.select(Notification.__table__).where(Notification.user_id == user_id)
+        if unread_only:
+            query = query.where(Notification.read_at.is_(None))
+        if cursor:
+            try:
+                cursor_created_at, cursor_id = decode_inbox_cursor(cursor)
+            except (ValueError, UnicodeDecodeError):
+                return jsonify({'error': 'Invalid cursor'}), 400
+            query = query.where(db.or_(
+                Notification.created_at < cursor_created_at,
+                db.and_(Notification.created_at == cursor_created_at, Notification.id < cursor_id)
+            ))
+        
+        # Fetch one extra row to know whether another page exists
+        rows = db.session.execute(query.order_by(
+            Notification.created_at.desc(), Notification.id.desc()
+        ).limit(limit + 1)).all()
+        
+        has_more = len(rows) > limit
+        notifications = rows[:limit]
+        
+        return jsonify({
+            'notifications': [Notification.row_to_dict(row) for row in notifications],
+            'next_cursor': encode_inbox_cursor(notifications[-1]) if has_more else None,
+            'unread_count': get_unread_count(user_id)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/notifications/user/<int:user_id>/unread-count', methods=['GET'])
+def get_user_unread_count(user_id):
+    """Get the number of unread notifications for a user (header badge)"""
+    try:
+        return jsonify({'user_id': user_id, 'unread_count': get_unread_count(user_id)}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/notifications/user/<int:user_id>/read', methods=['POST'])
+def mark_notifications_read(user_id):
+    """Mark notifications as read in bulk
+
+    Body: {"notification_ids": [1, 2, 3]} or {"all": true}
+    """
+    try:
+        data = request.get_json() or {}
+        notification_ids = data.get('notification_ids')
+        
+        if not data.get('all'):
+            if not notification_ids:
+                return jsonify({'error': 'Provide notification_ids or all: true'}), 400
+            if not isinstance(notification_ids, list) or not all(
+                    isinstance(i, int) and not isinstance(i, bool) for i in notification_ids):
+                return jsonify({'error': 'notification_ids must be a list of integers'}), 400
+        
+        table = Notification.__table__
+        update = table.update().where(
+            table.c.user_id == user_id,
+            table.c.read_at.is_(None)
+        )
+        if not data.get('all'):
+            update = update.where(table.c.id.in_(notification_ids))
+        
+        marked = db.session.execute(update.values(read_at=datetime.datetime.utcnow())).rowcount
+        if marked:
+            adjust_unread_count(user_id, -marked)
+        
+        db.session.commit()
+        
+        return jsonify({
+            'user_id': user_id,
+            'marked_read': marked,
+            'unread_count': get_unread_count(user_id)
+        }), 200
+        
     except Exception as e:
+        db.session.rollback()
+        logger.exception("Error marking notifications read", extra={'user_id': user_id})
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/notifications', methods=['GET'])
+@read_only
 def get_all_notifications():
     """Get all notifications"""
     try:
         status = request.args.get('status')
         category = request.args.get('category')
         
-        query = Notification.query
+        query = db.select(Notification.__table__)
         if status:
-            query = query.filter_by(status=status)
+            query = query.where(Notification.status == status)
         if category:
-            query = query.filter_by(category=category)
+            query = query.where(Notification.category == category)
         
-        notifications = query.order_by(Notification.created_at.desc()).all()
+        rows = db.session.execute(query.order_by(Notification.created_at.desc())).all()
         
         return jsonify({
-            'notifications': [notification.to_dict() for notification in notifications],
-            'count': len(notifications)
+            'notifications': [Notification.row_to_dict(row) for row in rows],
+            'count': len(rows)
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/notifications/stats', methods=['GET'])
+@read_only
 def get_notification_stats():
-    """Get notification statistics"""
+    """Get notification statistics
+
+    Totals come from a single grouped aggregate cached for STATS_CACHE_TTL seconds
+    (pass ?refresh=true to bypass). The 'recent' windows are served from in-process
+    ring buffers and cover notifications delivered by this process since it started.
+    Pass ?series=true to include the per-minute breakdown for the last hour.
+    """
     try:
-        total = Notification.query.count()
-        sent = Notification.query.filter_by(status='sent').count()
-        failed = Notification.query.filter_by(status='failed').count()
+        refresh = request.args.get('refresh', 'false').lower() == 'true'
+        counts = get_cached_notification_counts(refresh=refresh)
         
-        return jsonify({
+        total = counts['total']
+        sent = counts['by_status'].get('sent', 0)
+        failed = counts['by_status'].get('failed', 0)
+        
+        now = time.time()
+        response = {
             'total_notifications': total,
             'sent_notifications': sent,
             'failed_notifications': failed,
-            'success_rate': round((sent / total * 100) if total > 0 else 0, 2)
-        }), 200
+            'success_rate': round((sent / total * 100) if total > 0 else 0, 2),
+            'by_status': counts['by_status'],
+            'by_category': counts['by_category'],
+            'by_delivery_method': counts['by_delivery_method'],
+            'computed_at': counts['computed_at'],
+            'cache_ttl_seconds': STATS_CACHE_TTL,
+            'recent': {
+                'current_minute': summarize_window(RECENT_BY_MINUTE.series(now)[-1][1]),
+                'last_hour': summarize_window(RECENT_BY_MINUTE.totals(now)),
+                'last_24_hours': summarize_window(RECENT_BY_HOUR.totals(now))
+            }
+        }
+        
+        if request.args.get('series', 'false').lower() == 'true':
+            response['recent']['per_minute'] = [
+                {
+                    'start': datetime.datetime.utcfromtimestamp(start).isoformat(),
+                    'sent': bucket.get('sent', 0),
+                    'failed': bucket.get('failed', 0)
+                }
+                for start, bucket in RECENT_BY_MINUTE.series(now)
+            ]
+        
+        return jsonify(response), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -467,37 +1021,41 @@ def get_notification_stats():
 # FRONTEND SERVING ROUTES
 # ════════════════════════════════════════════════════════════════════════════════
 
-@app.route('/frontend/<path:path>')
-def serve_frontend(path):
-    return send_from_directory('frontend', path)
-
-@app.route('/')
-def home():
-    return send_from_directory('frontend', 'index.html')
+# / and /frontend/<path> from memory, cached by the browser; see build_frontend.py
+install_static(app)
 
 # ════════════════════════════════════════════════════════════════════════════════
 # APPLICATION STARTUP
 # ════════════════════════════════════════════════════════════════════════════════
 
-if __name__ == '__main__':
-    print("="*80, file=sys.stderr)
-    print("NOTIFICATION SERVICE STARTING", file=sys.stderr)
-    print("="*80, file=sys.stderr)
-    print(f"Database: {DB_NAME}", file=sys.stderr)
-    print(f"Host:     {DB_HOST}", file=sys.stderr)
-    print(f"Port:     5005", file=sys.stderr)
-    print(f"Email:    {'ENABLED' if ENABLE_REAL_EMAIL_SENDING else 'DEMO MODE'}", file=sys.stderr)
-    print("="*80, file=sys.stderr)
-    print(f"User Service: {USER_SERVICE_URL}", file=sys.stderr)
-    print("="*80, file=sys.stderr)
+def run_startup_checks():
+    """Log the configuration and prepare the database; run once before serving"""
+    logger.info("Notification service starting", extra={
+        'db_name': DB_NAME,
+        'db_host': DB_HOST,
+        'port': int(os.getenv('PORT', 5005)),
+        'email_mode': 'enabled' if ENABLE_REAL_EMAIL_SENDING else 'demo',
+        'digest_window_seconds': DIGEST_WINDOW_SECONDS if DIGEST_ENABLED else None,
+        'user_service_url': USER_SERVICE_URL
+    })
     
     with app.app_context():
         try:
             db.session.execute(db.text('SELECT 1'))
-            print("✅ Database connection successful!", file=sys.stderr)
+            logger.info("Database connection successful")
         except Exception as e:
-            print(f"❌ Database connection failed: {e}", file=sys.stderr)
-            print("⚠️  Service will start but may not function properly", file=sys.stderr)
+            logger.error("Database connection failed; service will start but may not function properly", extra={'error': str(e)})
+        
+        try:
+            # Existing tables first (inbox columns, counters, indexes), then any missing tables
+            applied = run_migrations(db, 'notification_service')
+            logger.info("Schema migrations applied", extra={'versions': applied})
+            db.create_all()
+        except Exception as e:
+            logger.warning("Schema migration warning", extra={'error': str(e)})
+
+if __name__ == '__main__':
+    run_startup_checks()
     
     port = int(os.getenv('PORT', 5005))
     debug = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
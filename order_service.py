@@ -1,39 +1,59 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 import datetime
+import itertools
 import requests
 import os
-import sys
+import threading
+import time
+from collections import defaultdict
+from decimal import Decimal
+from types import SimpleNamespace
+from common import deadline, upstream
+from common.admission import AdmissionController
+from common.db_config import build_database_uri, database_location, engine_options, pool_status
+from common.deadline import install_deadline
+from common.events import install_change_consumer
+from common.health import install_health
+from common.logging_config import configure_logging
+from common.metrics import install_metrics
+from common.migrations import run_migrations
+from common.query_audit import install_query_audit
+from common.recommendations import install_recommendations
+from common.replica import RoutingSession, install_replica, read_only, replica_binds
+from common.responses import install_responses
+from common.static import install_static
+from common.tracing import install_tracing
+
+logger = configure_logging('order_service')
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
+install_responses(app)
 
 # ════════════════════════════════════════════════════════════════════════════════
 # DATABASE CONFIGURATION - RDS Connection
 # ════════════════════════════════════════════════════════════════════════════════
 
-# Get database credentials from environment variables with RDS defaults
-DB_HOST = os.getenv('DB_HOST', 'shopease-db.cmni2wmcozyh.us-east-1.rds.amazonaws.com')
-DB_PORT = os.getenv('DB_PORT', '3306')
-DB_USER = os.getenv('DB_USER', 'admin')
-DB_PASSWORD = os.getenv('DB_PASSWORD', 'ChangeMe123!')
-# keep the db name same for all services
-DB_NAME = os.getenv('DB_NAME', 'shopease')
-
-# Build database URI
-DATABASE_URI = f'mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
+# ORDER_SERVICE_DATABASE_URI or DATABASE_URI wins when set; otherwise it is built from DB_HOST/DB_PORT/DB_USER/DB_PASSWORD/DB_NAME
+DATABASE_URI = build_database_uri('order_service')
+DB_HOST, DB_NAME = database_location(DATABASE_URI)
 
-# Configure SQLAlchemy - DIRECTLY USE DATABASE_URI (no os.getenv wrapper!)
 app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URI
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SQLALCHEMY_ECHO'] = False
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'pool_pre_ping': True,
-    'pool_recycle': 300,
-}
+# Pool size/overflow/timeout/recycle are tunable via ORDER_SERVICE_DB_* or DB_* variables
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options('order_service', DATABASE_URI)
+# Optional read replica for @read_only GET routes: ORDER_SERVICE_REPLICA_DATABASE_URI, REPLICA_DATABASE_URI or DB_REPLICA_HOST
+app.config['SQLALCHEMY_BINDS'] = replica_binds('order_service')
 
-db = SQLAlchemy(app)
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
+install_metrics(app, db, 'order_service')
+install_query_audit(app, 'order_service')
+install_deadline(app)
+install_replica(app, db, 'order_service')
+install_tracing(app, 'order_service')
 
 # ════════════════════════════════════════════════════════════════════════════════
 # MICROSERVICES CONFIGURATION
@@ -42,12 +62,20 @@ db = SQLAlchemy(app)
 PRODUCT_SERVICE_URL = os.getenv('PRODUCT_SERVICE_URL', 'http://shopease-alb-1528125855.us-east-1.elb.amazonaws.com/api/products')
 USER_SERVICE_URL = os.getenv('USER_SERVICE_URL', 'http://shopease-alb-1528125855.us-east-1.elb.amazonaws.com/api/users')
 
+# /livez and /readyz; dependency status is refreshed in the background
+health = install_health(app, db, 'order_service', '/api/orders', {'product': PRODUCT_SERVICE_URL})
+
 # ════════════════════════════════════════════════════════════════════════════════
 # ORDER MODELS - Maps to 'orders' and 'order_items' tables in orderdb
 # ════════════════════════════════════════════════════════════════════════════════
 
 class Order(db.Model):
     __tablename__ = 'orders'  # Explicitly set table name
+    __table_args__ = (
+        # history per user and the admin status filter, both newest first
+        db.Index('ix_orders_user_created', 'user_id', 'created_at'),
+        db.Index('ix_orders_status_created', 'status', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, nullable=False)
@@ -59,19 +87,27 @@ class Order(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
     
     def to_dict(self):
+        return Order.row_to_dict(self)
+    
+    @staticmethod
+    def row_to_dict(row):
+        """Serialize an Order or a plain row selected from the orders table"""
         return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'total_amount': float(self.total_amount),  # Convert Decimal to float for JSON
-            'status': self.status,
-            'payment_status': self.payment_status,
-            'shipping_address': self.shipping_address,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'id': row.id,
+            'user_id': row.user_id,
+            'total_amount': float(row.total_amount),  # Convert Decimal to float for JSON
+            'status': row.status,
+            'payment_status': row.payment_status,
+            'shipping_address': row.shipping_address,
+            'created_at': row.created_at.isoformat() if row.created_at else None,
+            'updated_at': row.updated_at.isoformat() if row.updated_at else None
         }
 
 class OrderItem(db.Model):
     __tablename__ = 'order_items'  # Explicitly set table name
+    __table_args__ = (
+        db.Index('ix_order_items_order', 'order_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
@@ -85,37 +121,125 @@ class OrderItem(db.Model):
     order = db.relationship('Order', backref=db.backref('items', lazy=True, cascade='all, delete-orphan'))
     
     def to_dict(self):
+        return OrderItem.row_to_dict(self)
+    
+    @staticmethod
+    def row_to_dict(row):
+        """Serialize an OrderItem or a plain row selected from the order_items table"""
         return {
-            'id': self.id,
-            'order_id': self.order_id,
-            'product_id': self.product_id,
-            'product_name': self.product_name,
-            'quantity': self.quantity,
-            'price': float(self.price),  # Convert Decimal to float
-            'subtotal': float(self.subtotal)
+            'id': row.id,
+            'order_id': row.order_id,
+            'product_id': row.product_id,
+            'product_name': row.product_name,
+            'quantity': row.quantity,
+            'price': float(row.price),  # Convert Decimal to float
+            'subtotal': float(row.subtotal)
         }
 
 # ════════════════════════════════════════════════════════════════════════════════
 # HELPER FUNCTIONS
 # ════════════════════════════════════════════════════════════════════════════════
 
-def get_product_details(product_id):
-    """Fetching product details from product service"""
+# Product details by id. Entries are evicted by product_service change events; the
+# TTL bounds staleness while the change feed is unreachable. Used for display only:
+# create_order checks stock and price against a fresh lookup.
+PRODUCT_CACHE_TTL = float(os.getenv('PRODUCT_CACHE_TTL', '30'))
+_product_cache = {}
+_product_cache_lock = threading.Lock()
+# Bumped by every eviction so a fetch that raced with one is not stored
+_product_cache_version = [0]
+
+def evict_product(event):
+    """Change event handler: drop the product it names, or everything on reset"""
+    with _product_cache_lock:
+        _product_cache_version[0] += 1
+        if event['action'] == 'reset':
+            _product_cache.clear()
+        else:
+            _product_cache.pop(event['entity_id'], None)
+
+product_changes = install_change_consumer(app, 'product', PRODUCT_SERVICE_URL, evict_product)
+
+def get_product_details(product_id, fresh=False):
+    """Fetching product details from product service; fresh=True skips the cache (and refreshes it)"""
+    with _product_cache_lock:
+        cached = _product_cache.get(product_id)
+        version = _product_cache_version[0]
+    if not fresh and cached is not None and time.monotonic() - cached[1] < PRODUCT_CACHE_TTL:
+        return cached[0]
     try:
-        response = requests.get(f'{PRODUCT_SERVICE_URL}/{product_id}', timeout=5)
+        response = upstream.get('product', f'{PRODUCT_SERVICE_URL}/{product_id}', timeout=5)
         if response.status_code == 200:
-            return response.json()
+            product = response.json()
+            with _product_cache_lock:
+                if _product_cache_version[0] == version:
+                    _product_cache[product_id] = (product, time.monotonic())
+            return product
         return None
     except requests.RequestException as e:
-        print(f"⚠️  Failed to get product {product_id}: {e}", file=sys.stderr)
+        logger.warning("Failed to get product", extra={'product_id': product_id, 'error': str(e)})
         return None
 
-def validate_stock(product_id, quantity):
+# Orders per IN (...) query when loading items for list endpoints
+ITEM_BATCH_SIZE = 500
+
+def serialize_order_rows(order_rows):
+    """Order dicts with their items for read-only listings.
+
+    Works on plain rows: items for all orders are loaded with one IN query per
+    ITEM_BATCH_SIZE orders instead of one lazy load per order.
+    """
+    orders = [Order.row_to_dict(row) for row in order_rows]
+    items_by_order = defaultdict(list)
+    order_ids = [order['id'] for order in orders]
+    for start in range(0, len(order_ids), ITEM_BATCH_SIZE):
+        item_rows = db.session.execute(
+            db.select(OrderItem.__table__)
+            .where(OrderItem.order_id.in_(order_ids[start:start + ITEM_BATCH_SIZE]))
+            .order_by(OrderItem.id)
+        ).all()
+        for row in item_rows:
+            items_by_order[row.order_id].append(OrderItem.row_to_dict(row))
+    for order in orders:
+        order['items'] = items_by_order[order['id']]
+    return orders
+
+def validate_stock(product, quantity):
     """Check if product has sufficient stock"""
-    product = get_product_details(product_id)
-    if product and product.get('stock', 0) >= quantity:
-        return True
-    return False
+    return bool(product) and product.get('stock', 0) >= quantity
+
+CENTS = Decimal('0.01')
+
+def to_money(value):
+    """Decimal with two places; floats from JSON go through str() so 19.99 stays 19.99"""
+    return Decimal(str(value)).quantize(CENTS)
+
+def insert_order(user_id, shipping_address, validated_items):
+    """Write an order and its items; returns the order dict without reading anything back
+
+    The order is one INSERT and all items are one executemany (a single multi-row
+    INSERT with PyMySQL), followed by the commit. Item ids would take another
+    query to learn, so they are None in the result; GET /api/orders/<id> has them.
+    """
+    now = datetime.datetime.utcnow()
+    order_values = {
+        'user_id': user_id,
+        'total_amount': sum((item['subtotal'] for item in validated_items), Decimal('0.00')),
+        'status': 'pending',
+        'payment_status': 'pending',
+        'shipping_address': shipping_address,
+        'created_at': now,
+        'updated_at': now
+    }
+    order_id = db.session.execute(Order.__table__.insert().values(**order_values)).inserted_primary_key[0]
+
+    item_rows = [{**item, 'order_id': order_id, 'created_at': now} for item in validated_items]
+    db.session.execute(OrderItem.__table__.insert(), item_rows)
+    db.session.commit()
+
+    order_dict = Order.row_to_dict(SimpleNamespace(id=order_id, **order_values))
+    order_dict['items'] = [OrderItem.row_to_dict(SimpleNamespace(id=None, **row)) for row in item_rows]
+    return order_dict
 
 def send_order_notification(user_id, order_data):
     notification_data = {
@@ -127,13 +251,124 @@ def send_order_notification(user_id, order_data):
         'delivery_method': 'email',
         'status': 'pending'
     }
-    requests.post(
+    upstream.post(
+        'notification',
         os.getenv('NOTIFICATION_SERVICE_URL', 'http://shopease-alb-1528125855.us-east-1.elb.amazonaws.com/api/notifications'),
         headers={'Content-Type': 'application/json'},
         json=notification_data,
         timeout=10
     )
 
+# ════════════════════════════════════════════════════════════════════════════════
+# BULK STATUS TRANSITIONS
+# ════════════════════════════════════════════════════════════════════════════════
+
+# status -> statuses an order may move to with PUT /api/orders/status
+ALLOWED_TRANSITIONS = {
+    'pending': ['confirmed', 'cancelled'],
+    'confirmed': ['shipped', 'cancelled'],
+    'shipped': ['delivered'],
+    'delivered': [],
+    'cancelled': []
+}
+# Orders locked and updated per transaction
+BULK_STATUS_CHUNK_SIZE = int(os.getenv('BULK_STATUS_CHUNK_SIZE', '1000'))
+# Most orders one request may name or match
+BULK_STATUS_MAX_ORDERS = int(os.getenv('BULK_STATUS_MAX_ORDERS', '10000'))
+
+def transition_sources(target):
+    """Statuses from which an order may move to `target`"""
+    return [status for status, targets in ALLOWED_TRANSITIONS.items() if target in targets]
+
+def apply_status_chunk(order_ids, target, payment_status=None):
+    """Move one chunk of orders to `target` in one transaction; returns {order_id: result}
+
+    Two statements whatever the chunk size: the rows are read and locked with one
+    SELECT ... FOR UPDATE, then every order whose current status allows the move
+    is updated by one UPDATE that repeats the transition check in its WHERE clause.
+    """
+    table = Order.__table__
+    sources = transition_sources(target)
+    current = dict(db.session.execute(
+        db.select(table.c.id, table.c.status).where(table.c.id.in_(order_ids)).with_for_update()
+    ).all())
+
+    results, to_update = {}, []
+    for order_id in order_ids:
+        status = current.get(order_id)
+        if status is None:
+            results[order_id] = {'order_id': order_id, 'outcome': 'not_found'}
+        elif status == target:
+            results[order_id] = {'order_id': order_id, 'outcome': 'unchanged', 'status': status}
+        elif status in sources:
+            results[order_id] = {'order_id': order_id, 'outcome': 'updated', 'previous_status': status, 'status': target}
+            to_update.append(order_id)
+        else:
+            results[order_id] = {'order_id': order_id, 'outcome': 'invalid_transition', 'status': status,
+                                 'allowed': ALLOWED_TRANSITIONS.get(status, [])}
+
+    if to_update:
+        values = {'status': target, 'updated_at': datetime.datetime.utcnow()}
+        if payment_status is not None:
+            values['payment_status'] = payment_status
+        updated = db.session.execute(
+            table.update().where(table.c.id.in_(to_update), table.c.status.in_(sources)).values(**values)
+        ).rowcount
+        if updated != len(to_update):
+            # the rows are locked, so this only happens on databases that ignore FOR UPDATE
+            raise RuntimeError(f'expected to update {len(to_update)} orders, updated {updated}')
+    db.session.commit()
+    return results
+
+# ════════════════════════════════════════════════════════════════════════════════
+# CHECKOUT ADMISSION
+# ════════════════════════════════════════════════════════════════════════════════
+
+# Caps concurrent checkouts per product; overflow waits in a bounded queue (202) or gets 429
+checkout_admission = AdmissionController('checkout')
+
+def order_product_ids(data):
+    """Products an order request touches, as ints: the keys checkouts queue on
+
+    Raises ValueError for a product_id that is not an integer, so "1" and 1 share a queue
+    and a malformed id is answered 400 before it reaches the queue.
+    """
+    items = data.get('items')
+    product_ids = []
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict) or item.get('product_id') is None:
+            continue  # create_order reports incomplete items
+        product_id = item['product_id']
+        if isinstance(product_id, bool) or not isinstance(product_id, (int, str)):
+            raise ValueError(f'Invalid product_id: {product_id!r}')
+        try:
+            product_ids.append(int(product_id))
+        except ValueError:
+            raise ValueError(f'Invalid product_id: {product_id!r}') from None
+    return product_ids
+
+# ════════════════════════════════════════════════════════════════════════════════
+# RECOMMENDATIONS
+# ════════════════════════════════════════════════════════════════════════════════
+
+def order_baskets():
+    """(order_id, [product_id, ...]) for every order that was not cancelled, by order id"""
+    orders, items = Order.__table__, OrderItem.__table__
+    query = (
+        db.select(items.c.order_id, items.c.product_id)
+        .join(orders, orders.c.id == items.c.order_id)
+        .where(orders.c.status != 'cancelled')
+        .order_by(items.c.order_id)
+    )
+    # streamed: one pass over order_items without holding it in memory
+    with db.engine.connect() as connection:
+        rows = connection.execution_options(yield_per=5000).execute(query)
+        for order_id, group in itertools.groupby(rows, key=lambda row: row.order_id):
+            yield order_id, [row.product_id for row in group]
+
+# Products bought together, rebuilt in the background and updated by create_order
+bought_together = install_recommendations(app, 'bought_together', order_baskets)
+
 # ════════════════════════════════════════════════════════════════════════════════
 # API ROUTES
 # ════════════════════════════════════════════════════════════════════════════════
@@ -141,21 +376,20 @@ def send_order_notification(user_id, order_data):
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint for monitoring"""
-    try:
-        db.session.execute(db.text('SELECT 1'))
-        db_status = 'connected'
-    except Exception as e:
-        db_status = f'disconnected: {str(e)}'
+    # Served from the background checker's cache; see /readyz for check details
+    db_status = health.database_status()
     
     return jsonify({
         'status': 'healthy',
         'service': 'order_service',
         'database': db_status,
         'db_name': DB_NAME,
-        'db_host': DB_HOST
+        'db_host': DB_HOST,
+        'db_pool': pool_status(db.engine)
     }), 200
 
 @app.route('/api/orders', methods=['POST'])
+@checkout_admission.limit(order_product_ids)
 def create_order():
     """Create a new order"""
     try:
@@ -164,67 +398,74 @@ def create_order():
         if not data or not data.get('user_id') or not data.get('items'):
             return jsonify({'error': 'User ID and items are required'}), 400
         
-        # Validate all items and calculate total
-        total_amount = 0
+        # Validate all items; amounts are Decimal until the response is serialized
         validated_items = []
         
         for item in data['items']:
             if not all(k in item for k in ['product_id', 'quantity']):
                 return jsonify({'error': 'Each item must have product_id and quantity'}), 400
+            if not isinstance(item['quantity'], int) or isinstance(item['quantity'], bool) or item['quantity'] < 1:
+                return jsonify({'error': 'Quantity must be a positive integer'}), 400
             
-            product = get_product_details(item['product_id'])
+            # Stock and price come from product_service, not the cache: a cached copy may
+            # predate the last sale or price change
+            product = get_product_details(item['product_id'], fresh=True)
             if not product:
                 return jsonify({'error': f'Product {item["product_id"]} not found'}), 404
             
-            if not validate_stock(item['product_id'], item['quantity']):
+            if not validate_stock(product, item['quantity']):
                 return jsonify({'error': f'Insufficient stock for product {item["product_id"]}'}), 400
             
-            item_total = product['price'] * item['quantity']
-            total_amount += item_total
-            
+            price = to_money(product['price'])
             validated_items.append({
-                'product_id': item['product_id'],
+                'product_id': product['id'],
                 'product_name': product['name'],
                 'quantity': item['quantity'],
-                'price': product['price'],
-                'subtotal': item_total
+                'price': price,
+                'subtotal': price * item['quantity']
             })
         
-        # Create order
-        order = Order(
-            user_id=data['user_id'],
-            total_amount=total_amount,
-            shipping_address=data.get('shipping_address', '')
-        )
-        
-        db.session.add(order)
-        db.session.flush()  # Get the order ID
+        # Validation made one product lookup per item; do not write an order nobody waits for
+        deadline.check('before_commit')
+        order_dict = insert_order(data['user_id'], data.get('shipping_address', ''), validated_items)
         
-        # Create order items
-        for item_data in validated_items:
-            order_item = OrderItem(
-                order_id=order.id,
-                product_id=item_data['product_id'],
-                product_name=item_data['product_name'],
-                quantity=item_data['quantity'],
-                price=item_data['price'],
-                subtotal=item_data['subtotal']
-            )
-            db.session.add(order_item)
-        
-        db.session.commit()
-        
-        # Return order with items
-        order_dict = order.to_dict()
-        order_dict['items'] = [item.to_dict() for item in order.items]
+        # The order is committed: a failure to index it must not turn into a 500 the client retries
+        try:
+            bought_together.add_basket(order_dict['id'], [item['product_id'] for item in validated_items])
+        except Exception:
+            logger.exception("Error adding order to recommendations", extra={'order_id': order_dict['id']})
         
         return jsonify(order_dict), 201
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Error creating order: {e}", file=sys.stderr)
+        logger.exception("Error creating order")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/orders/recommendations/<int:product_id>', methods=['GET'])
+def get_recommendations(product_id):
+    """Products most often ordered together with a product, from the in-memory index"""
+    try:
+        limit = int(request.args.get('limit', bought_together.top_k))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if limit < 1:
+        return jsonify({'error': 'limit must be positive'}), 400
+    
+    related = bought_together.related(product_id, limit)
+    if related is None:
+        response = jsonify({'error': 'Recommendations are still being built'})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    
+    return jsonify({
+        'product_id': product_id,
+        'recommendations': [
+            {'product_id': entry['item'], 'orders_together': entry['count'], 'confidence': entry['confidence']}
+            for entry in related
+        ]
+    }), 200
+
 @app.route('/api/orders/<int:order_id>', methods=['GET'])
 def get_order(order_id):
     """Get order details"""
@@ -242,24 +483,21 @@ def get_order(order_id):
         
         return jsonify(order_dict), 200
     except Exception as e:
-        print(f"❌ Error getting order {order_id}: {e}", file=sys.stderr)
+        logger.exception("Error getting order", extra={'order_id': order_id})
         return jsonify({'error': str(e)}), 404
 
 @app.route('/api/orders/user/<int:user_id>', methods=['GET'])
+@read_only
 def get_user_orders(user_id):
     """Get all orders for a specific user"""
     try:
-        orders = Order.query.filter_by(user_id=user_id).order_by(Order.created_at.desc()).all()
-        result = []
+        rows = db.session.execute(
+            db.select(Order.__table__).where(Order.user_id == user_id).order_by(Order.created_at.desc())
+        ).all()
         
-        for order in orders:
-            order_dict = order.to_dict()
-            order_dict['items'] = [item.to_dict() for item in order.items]
-            result.append(order_dict)
-        
-        return jsonify(result), 200
+        return jsonify(serialize_order_rows(rows)), 200
     except Exception as e:
-        print(f"❌ Error getting user orders: {e}", file=sys.stderr)
+        logger.exception("Error getting user orders", extra={'user_id': user_id})
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/orders/<int:order_id>/status', methods=['PUT'])
@@ -290,26 +528,95 @@ def update_order_status(order_id):
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Error updating order status: {e}", file=sys.stderr)
+        logger.exception("Error updating order status", extra={'order_id': order_id})
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/orders/status', methods=['PUT'])
+def bulk_update_order_status():
+    """Move many orders to one status (fulfillment batches)
+
+    Body: {"status": "shipped", "order_ids": [...]} or {"status": "shipped",
+    "filter": {"status": "confirmed", "created_before": ..., "created_after": ...,
+    "user_id": ...}}, optionally with "payment_status". Only the moves in
+    ALLOWED_TRANSITIONS are applied; every order gets an outcome: updated,
+    unchanged, invalid_transition or not_found. Orders are processed in chunks of
+    BULK_STATUS_CHUNK_SIZE, each committed on its own. A filter matches at most
+    BULK_STATUS_MAX_ORDERS orders; `has_more` tells the caller to repeat it.
+    """
+    results = {}
+    try:
+        data = request.get_json(silent=True) or {}
+        target = data.get('status')
+        if target not in ALLOWED_TRANSITIONS:
+            return jsonify({'error': f'Status must be one of: {list(ALLOWED_TRANSITIONS)}'}), 400
+        if ('order_ids' in data) == ('filter' in data):
+            return jsonify({'error': 'Provide either order_ids or filter'}), 400
+
+        has_more = None
+        if 'order_ids' in data:
+            order_ids = data['order_ids']
+            if not isinstance(order_ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in order_ids):
+                return jsonify({'error': 'order_ids must be a list of integers'}), 400
+            order_ids = list(dict.fromkeys(order_ids))
+            if len(order_ids) > BULK_STATUS_MAX_ORDERS:
+                return jsonify({'error': f'At most {BULK_STATUS_MAX_ORDERS} orders per request'}), 400
+        else:
+            criteria = data['filter'] if isinstance(data['filter'], dict) else {}
+            if not criteria:
+                return jsonify({'error': 'filter must name at least one of: status, user_id, created_after, created_before'}), 400
+            query = db.select(Order.id)
+            try:
+                if 'status' in criteria:
+                    query = query.where(Order.status == criteria['status'])
+                if 'user_id' in criteria:
+                    query = query.where(Order.user_id == int(criteria['user_id']))
+                if 'created_after' in criteria:
+                    query = query.where(Order.created_at >= datetime.datetime.fromisoformat(criteria['created_after']))
+                if 'created_before' in criteria:
+                    query = query.where(Order.created_at < datetime.datetime.fromisoformat(criteria['created_before']))
+            except (ValueError, TypeError) as e:
+                return jsonify({'error': f'Invalid filter: {e}'}), 400
+            # oldest first, so a repeated call continues where this one stopped
+            order_ids = list(db.session.execute(
+                query.order_by(Order.created_at, Order.id).limit(BULK_STATUS_MAX_ORDERS + 1)
+            ).scalars())
+            has_more = len(order_ids) > BULK_STATUS_MAX_ORDERS
+            order_ids = order_ids[:BULK_STATUS_MAX_ORDERS]
+            db.session.commit()  # end the read transaction before locking chunks
+
+        for start in range(0, len(order_ids), BULK_STATUS_CHUNK_SIZE):
+            deadline.check('bulk_status_chunk')
+            results.update(apply_status_chunk(order_ids[start:start + BULK_STATUS_CHUNK_SIZE], target, data.get('payment_status')))
+
+        summary = defaultdict(int)
+        for result in results.values():
+            summary[result['outcome']] += 1
+        logger.info("Bulk order status update", extra={'status': target, 'orders': len(order_ids), 'summary': dict(summary)})
+
+        response = {'status': target, 'summary': dict(summary), 'results': [results[order_id] for order_id in order_ids]}
+        if has_more is not None:
+            response['has_more'] = has_more
+        return jsonify(response), 200
+
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Error in bulk order status update", extra={'committed_orders': len(results)})
+        # chunks before the failing one are committed; report them so the caller can retry the rest
+        return jsonify({'error': str(e), 'results': list(results.values())}), 500
+
 @app.route('/api/orders', methods=['GET'])
+@read_only
 def get_all_orders():
     """Get all orders (admin endpoint)"""
     try:
         status = request.args.get('status')
         
-        query = Order.query
+        query = db.select(Order.__table__)
         if status:
-            query = query.filter_by(status=status)
-        
-        orders = query.order_by(Order.created_at.desc()).all()
+            query = query.where(Order.status == status)
         
-        result = []
-        for order in orders:
-            order_dict = order.to_dict()
-            order_dict['items'] = [item.to_dict() for item in order.items]
-            result.append(order_dict)
+        rows = db.session.execute(query.order_by(Order.created_at.desc())).all()
+        result = serialize_order_rows(rows)
         
         return jsonify({
             'orders': result,
@@ -317,7 +624,7 @@ def get_all_orders():
         }), 200
         
     except Exception as e:
-        print(f"❌ Error getting all orders: {e}", file=sys.stderr)
+        logger.exception("Error getting all orders")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/orders/<int:order_id>', methods=['DELETE'])
@@ -338,44 +645,45 @@ def cancel_order(order_id):
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Error cancelling order: {e}", file=sys.stderr)
+        logger.exception("Error cancelling order", extra={'order_id': order_id})
         return jsonify({'error': str(e)}), 500
 
 # ════════════════════════════════════════════════════════════════════════════════
 # FRONTEND SERVING ROUTES
 # ════════════════════════════════════════════════════════════════════════════════
 
-@app.route('/frontend/<path:path>')
-def serve_frontend(path):
-    return send_from_directory('frontend', path)
-
-@app.route('/')
-def home():
-    return send_from_directory('frontend', 'index.html')
+# / and /frontend/<path> from memory, cached by the browser; see build_frontend.py
+install_static(app)
 
 # ════════════════════════════════════════════════════════════════════════════════
 # APPLICATION STARTUP
 # ════════════════════════════════════════════════════════════════════════════════
 
-if __name__ == '__main__':
-    print("="*80, file=sys.stderr)
-    print("ORDER SERVICE STARTING", file=sys.stderr)
-    print("="*80, file=sys.stderr)
-    print(f"Database: {DB_NAME}", file=sys.stderr)
-    print(f"Host:     {DB_HOST}", file=sys.stderr)
-    print(f"Port:     5002", file=sys.stderr)
-    print("="*80, file=sys.stderr)
-    print(f"Product Service: {PRODUCT_SERVICE_URL}", file=sys.stderr)
-    print(f"User Service:    {USER_SERVICE_URL}", file=sys.stderr)
-    print("="*80, file=sys.stderr)
+def run_startup_checks():
+    """Log the configuration and prepare the database; run once before serving"""
+    logger.info("Order service starting", extra={
+        'db_name': DB_NAME,
+        'db_host': DB_HOST,
+        'port': int(os.getenv('PORT', 5002)),
+        'product_service_url': PRODUCT_SERVICE_URL,
+        'user_service_url': USER_SERVICE_URL
+    })
     
     with app.app_context():
         try:
             db.session.execute(db.text('SELECT 1'))
-            print("✅ Database connection successful!", file=sys.stderr)
+            logger.info("Database connection successful")
         except Exception as e:
-            print(f"❌ Database connection failed: {e}", file=sys.stderr)
-            print("⚠️  Service will start but may not function properly", file=sys.stderr)
+            logger.error("Database connection failed; service will start but may not function properly", extra={'error': str(e)})
+        
+        try:
+            applied = run_migrations(db, 'order_service')
+            logger.info("Schema migrations applied", extra={'versions': applied})
+        except Exception as e:
+            logger.warning("Schema migration warning", extra={'error': str(e)})
+
+if __name__ == '__main__':
+    run_startup_checks()
     
     port = int(os.getenv('PORT', 5002))
     debug = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
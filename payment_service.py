@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 import datetime
@@ -6,36 +6,47 @@ import requests
 import uuid
 import random
 import os
-import sys
+from common import deadline, upstream
+from common.db_config import build_database_uri, database_location, engine_options, pool_status
+from common.deadline import install_deadline
+from common.health import install_health
+from common.logging_config import configure_logging
+from common.metrics import install_metrics
+from common.migrations import run_migrations
+from common.query_audit import install_query_audit
+from common.replica import RoutingSession, install_replica, read_only, replica_binds
+from common.responses import install_responses
+from common.static import install_static
+from common.tracing import install_tracing
+
+logger = configure_logging('payment_service')
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
+install_responses(app)
 
 # ════════════════════════════════════════════════════════════════════════════════
 # DATABASE CONFIGURATION - RDS Connection
 # ════════════════════════════════════════════════════════════════════════════════
 
-# Get database credentials from environment variables with RDS defaults
-DB_HOST = os.getenv('DB_HOST', 'shopease-db.cmni2wmcozyh.us-east-1.rds.amazonaws.com')
-DB_PORT = os.getenv('DB_PORT', '3306')
-DB_USER = os.getenv('DB_USER', 'admin')
-DB_PASSWORD = os.getenv('DB_PASSWORD', 'ChangeMe123!')
-# keep the db name same for all services
-DB_NAME = os.getenv('DB_NAME', 'shopease')
-
-# Build database URI
-DATABASE_URI = f'mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
+# PAYMENT_SERVICE_DATABASE_URI or DATABASE_URI wins when set; otherwise it is built from DB_HOST/DB_PORT/DB_USER/DB_PASSWORD/DB_NAME
+DATABASE_URI = build_database_uri('payment_service')
+DB_HOST, DB_NAME = database_location(DATABASE_URI)
 
-# Configure SQLAlchemy - DIRECTLY USE DATABASE_URI (no os.getenv wrapper!)
 app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URI
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SQLALCHEMY_ECHO'] = False
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'pool_pre_ping': True,
-    'pool_recycle': 300,
-}
+# Pool size/overflow/timeout/recycle are tunable via PAYMENT_SERVICE_DB_* or DB_* variables
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options('payment_service', DATABASE_URI)
+# Optional read replica for @read_only GET routes: PAYMENT_SERVICE_REPLICA_DATABASE_URI, REPLICA_DATABASE_URI or DB_REPLICA_HOST
+app.config['SQLALCHEMY_BINDS'] = replica_binds('payment_service')
 
-db = SQLAlchemy(app)
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
+install_metrics(app, db, 'payment_service')
+install_query_audit(app, 'payment_service')
+install_deadline(app)
+install_replica(app, db, 'payment_service')
+install_tracing(app, 'payment_service')
 
 # ════════════════════════════════════════════════════════════════════════════════
 # MICROSERVICES CONFIGURATION
@@ -45,12 +56,25 @@ ORDER_SERVICE_URL = os.getenv('ORDER_SERVICE_URL', 'http://shopease-alb-15281258
 NOTIFICATION_SERVICE_URL = os.getenv('NOTIFICATION_SERVICE_URL', 'http://shopease-alb-1528125855.us-east-1.elb.amazonaws.com/api/notifications')
 USER_SERVICE_URL = os.getenv('USER_SERVICE_URL', 'http://shopease-alb-1528125855.us-east-1.elb.amazonaws.com/api/users')
 
+# /livez and /readyz; dependency status is refreshed in the background
+health = install_health(app, db, 'payment_service', '/api/payments', {
+    'order': ORDER_SERVICE_URL,
+    'user': USER_SERVICE_URL,
+    'notification': NOTIFICATION_SERVICE_URL
+})
+
 # ════════════════════════════════════════════════════════════════════════════════
 # PAYMENT MODEL - Maps to 'payments' table in paymentdb
 # ════════════════════════════════════════════════════════════════════════════════
 
 class Payment(db.Model):
     __tablename__ = 'payments'  # Explicitly set table name
+    __table_args__ = (
+        db.Index('ix_payments_order', 'order_id'),
+        # per-user history and the admin status filter, both newest first
+        db.Index('ix_payments_user_created', 'user_id', 'created_at'),
+        db.Index('ix_payments_status_created', 'payment_status', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, nullable=False)
@@ -63,16 +87,21 @@ class Payment(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
     
     def to_dict(self):
+        return Payment.row_to_dict(self)
+    
+    @staticmethod
+    def row_to_dict(row):
+        """Serialize a Payment or a plain row selected from the payments table"""
         return {
-            'id': self.id,
-            'order_id': self.order_id,
-            'user_id': self.user_id,
-            'amount': float(self.amount),  # Convert Decimal to float for JSON
-            'payment_method': self.payment_method,
-            'payment_status': self.payment_status,
-            'transaction_id': self.transaction_id,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'id': row.id,
+            'order_id': row.order_id,
+            'user_id': row.user_id,
+            'amount': float(row.amount),  # Convert Decimal to float for JSON
+            'payment_method': row.payment_method,
+            'payment_status': row.payment_status,
+            'transaction_id': row.transaction_id,
+            'created_at': row.created_at.isoformat() if row.created_at else None,
+            'updated_at': row.updated_at.isoformat() if row.updated_at else None
         }
 
 # ════════════════════════════════════════════════════════════════════════════════
@@ -114,7 +143,8 @@ def simulate_payment_gateway(payment_method, amount, card_details=None):
 def update_order_status(order_id, status):
     """Update order status in order service"""
     try:
-        response = requests.put(
+        response = upstream.put(
+            'order',
             f'{ORDER_SERVICE_URL}/{order_id}/status',
             headers={'Content-Type': 'application/json'},
             json={'status': status},
@@ -122,7 +152,7 @@ def update_order_status(order_id, status):
         )
         return response.status_code == 200
     except requests.RequestException as e:
-        print(f"⚠️  Failed to update order status: {e}", file=sys.stderr)
+        logger.warning("Failed to update order status", extra={'order_id': order_id, 'error': str(e)})
         return False
 
 def send_payment_notification(user_id, payment_data, order_id):
@@ -133,13 +163,13 @@ def send_payment_notification(user_id, payment_data, order_id):
         user_name = "Customer"
         
         try:
-            user_response = requests.get(f'{USER_SERVICE_URL}/{user_id}', timeout=5)
+            user_response = upstream.get('user', f'{USER_SERVICE_URL}/{user_id}', timeout=5)
             if user_response.status_code == 200:
                 user_data = user_response.json()
                 user_email = user_data.get('email')
                 user_name = user_data.get('first_name') or user_data.get('username', 'Customer')
         except requests.RequestException:
-            print(f"⚠️  Could not get user details from user service for user_id {user_id}", file=sys.stderr)
+            logger.warning("Could not get user details from user service", extra={'user_id': user_id})
         
         notification_data = {
             'user_id': user_id,
@@ -154,22 +184,23 @@ def send_payment_notification(user_id, payment_data, order_id):
         if user_email:
             notification_data['email'] = user_email
         
-        response = requests.post(
+        response = upstream.post(
+            'notification',
             f'{NOTIFICATION_SERVICE_URL}',
             headers={'Content-Type': 'application/json'},
             json=notification_data,
             timeout=10
         )
         
-        if response.status_code in [200, 201]:
-            print(f"✅ Payment notification sent successfully", file=sys.stderr)
+        if response.status_code in [200, 201, 202]:
+            logger.info("Payment notification sent", extra={'user_id': user_id, 'order_id': order_id})
             return True
         else:
-            print(f"⚠️  Payment notification failed with status {response.status_code}", file=sys.stderr)
+            logger.warning("Payment notification failed", extra={'order_id': order_id, 'status_code': response.status_code})
             return False
             
     except requests.RequestException as e:
-        print(f"❌ Payment notification failed: {str(e)}", file=sys.stderr)
+        logger.error("Payment notification failed", extra={'order_id': order_id, 'error': str(e)})
         return False
 
 # ════════════════════════════════════════════════════════════════════════════════
@@ -179,18 +210,16 @@ def send_payment_notification(user_id, payment_data, order_id):
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint for monitoring"""
-    try:
-        db.session.execute(db.text('SELECT 1'))
-        db_status = 'connected'
-    except Exception as e:
-        db_status = f'disconnected: {str(e)}'
+    # Served from the background checker's cache; see /readyz for check details
+    db_status = health.database_status()
     
     return jsonify({
         'status': 'healthy',
         'service': 'payment_service',
         'database': db_status,
         'db_name': DB_NAME,
-        'db_host': DB_HOST
+        'db_host': DB_HOST,
+        'db_pool': pool_status(db.engine)
     }), 200
 
 @app.route('/api/payments', methods=['POST'])
@@ -204,6 +233,9 @@ def process_payment():
         if not data or not all(field in data for field in required_fields):
             return jsonify({'error': 'Missing required fields: order_id, user_id, amount, payment_method'}), 400
         
+        # Do not charge for a checkout the client has already given up on
+        deadline.check('before_charge')
+        
         # Process payment through gateway
         gateway_response = simulate_payment_gateway(
             data['payment_method'], 
@@ -211,25 +243,25 @@ def process_payment():
             data.get('card_details')
         )
         
-        # Create payment record
-        payment = Payment(
-            order_id=data['order_id'],
-            user_id=data['user_id'],
-            amount=data['amount'],
-            payment_method=data['payment_method'],
-            payment_status='completed' if gateway_response['status'] == 'success' else 'failed',
-            transaction_id=gateway_response.get('transaction_id')
-        )
-        
-        db.session.add(payment)
-        db.session.commit()
-        
-        # Update order status
-        order_status = 'confirmed' if payment.payment_status == 'completed' else 'pending'
-        update_order_status(payment.order_id, order_status)
-        
-        # Send notification
-        send_payment_notification(payment.user_id, payment.to_dict(), payment.order_id)
+        # The card has been charged: record it and confirm the order even past the deadline
+        with deadline.unbounded():
+            payment = Payment(
+                order_id=data['order_id'],
+                user_id=data['user_id'],
+                amount=data['amount'],
+                payment_method=data['payment_method'],
+                payment_status='completed' if gateway_response['status'] == 'success' else 'failed',
+                transaction_id=gateway_response.get('transaction_id')
+            )
+            db.session.add(payment)
+            db.session.commit()
+            
+            # Update order status
+            order_status = 'confirmed' if payment.payment_status == 'completed' else 'pending'
+            update_order_status(payment.order_id, order_status)
+            
+            # Send notification
+            send_payment_notification(payment.user_id, payment.to_dict(), payment.order_id)
         
         response_data = payment.to_dict()
         response_data['gateway_response'] = gateway_response
@@ -238,10 +270,11 @@ def process_payment():
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Error processing payment: {e}", file=sys.stderr)
+        logger.exception("Error processing payment")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/payments/<int:payment_id>', methods=['GET'])
+@read_only
 def get_payment(payment_id):
     """Get payment details"""
     try:
@@ -251,20 +284,26 @@ def get_payment(payment_id):
         return jsonify({'error': str(e)}), 404
 
 @app.route('/api/payments/order/<int:order_id>', methods=['GET'])
+@read_only
 def get_payments_by_order(order_id):
     """Get all payments for a specific order"""
     try:
-        payments = Payment.query.filter_by(order_id=order_id).all()
-        return jsonify([payment.to_dict() for payment in payments]), 200
+        rows = db.session.execute(
+            db.select(Payment.__table__).where(Payment.order_id == order_id)
+        ).all()
+        return jsonify([Payment.row_to_dict(row) for row in rows]), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/payments/user/<int:user_id>', methods=['GET'])
+@read_only
 def get_payments_by_user(user_id):
     """Get all payments for a specific user"""
     try:
-        payments = Payment.query.filter_by(user_id=user_id).order_by(Payment.created_at.desc()).all()
-        return jsonify([payment.to_dict() for payment in payments]), 200
+        rows = db.session.execute(
+            db.select(Payment.__table__).where(Payment.user_id == user_id).order_by(Payment.created_at.desc())
+        ).all()
+        return jsonify([Payment.row_to_dict(row) for row in rows]), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -301,30 +340,32 @@ def refund_payment(payment_id):
             
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Error processing refund: {e}", file=sys.stderr)
+        logger.exception("Error processing refund", extra={'payment_id': payment_id})
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/payments', methods=['GET'])
+@read_only
 def get_all_payments():
     """Get all payments (admin endpoint)"""
     try:
         status = request.args.get('status')
         
-        query = Payment.query
+        query = db.select(Payment.__table__)
         if status:
-            query = query.filter_by(payment_status=status)
+            query = query.where(Payment.payment_status == status)
         
-        payments = query.order_by(Payment.created_at.desc()).all()
+        rows = db.session.execute(query.order_by(Payment.created_at.desc())).all()
         
         return jsonify({
-            'payments': [payment.to_dict() for payment in payments],
-            'count': len(payments)
+            'payments': [Payment.row_to_dict(row) for row in rows],
+            'count': len(rows)
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/payments/stats', methods=['GET'])
+@read_only
 def get_payment_stats():
     """Get payment statistics"""
     try:
@@ -348,38 +389,39 @@ def get_payment_stats():
 # FRONTEND SERVING ROUTES
 # ════════════════════════════════════════════════════════════════════════════════
 
-@app.route('/frontend/<path:path>')
-def serve_frontend(path):
-    return send_from_directory('frontend', path)
-
-@app.route('/')
-def home():
-    return send_from_directory('frontend', 'index.html')
+# / and /frontend/<path> from memory, cached by the browser; see build_frontend.py
+install_static(app)
 
 # ════════════════════════════════════════════════════════════════════════════════
 # APPLICATION STARTUP
 # ════════════════════════════════════════════════════════════════════════════════
 
-if __name__ == '__main__':
-    print("="*80, file=sys.stderr)
-    print("PAYMENT SERVICE STARTING", file=sys.stderr)
-    print("="*80, file=sys.stderr)
-    print(f"Database: {DB_NAME}", file=sys.stderr)
-    print(f"Host:     {DB_HOST}", file=sys.stderr)
-    print(f"Port:     5003", file=sys.stderr)
-    print("="*80, file=sys.stderr)
-    print(f"Order Service:        {ORDER_SERVICE_URL}", file=sys.stderr)
-    print(f"User Service:         {USER_SERVICE_URL}", file=sys.stderr)
-    print(f"Notification Service: {NOTIFICATION_SERVICE_URL}", file=sys.stderr)
-    print("="*80, file=sys.stderr)
+def run_startup_checks():
+    """Log the configuration and prepare the database; run once before serving"""
+    logger.info("Payment service starting", extra={
+        'db_name': DB_NAME,
+        'db_host': DB_HOST,
+        'port': int(os.getenv('PORT', 5003)),
+        'order_service_url': ORDER_SERVICE_URL,
+        'user_service_url': USER_SERVICE_URL,
+        'notification_service_url': NOTIFICATION_SERVICE_URL
+    })
     
     with app.app_context():
         try:
             db.session.execute(db.text('SELECT 1'))
-            print("✅ Database connection successful!", file=sys.stderr)
+            logger.info("Database connection successful")
+        except Exception as e:
+            logger.error("Database connection failed; service will start but may not function properly", extra={'error': str(e)})
+        
+        try:
+            applied = run_migrations(db, 'payment_service')
+            logger.info("Schema migrations applied", extra={'versions': applied})
         except Exception as e:
-            print(f"❌ Database connection failed: {e}", file=sys.stderr)
-            print("⚠️  Service will start but may not function properly", file=sys.stderr)
+            logger.warning("Schema migration warning", extra={'error': str(e)})
+
+if __name__ == '__main__':
+    run_startup_checks()
     
     port = int(os.getenv('PORT', 5003))
     debug = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
@@ -3,30 +3,45 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 import datetime
 import os
-import sys
+from common.db_config import build_database_uri, database_location, engine_options, pool_status
+from common.deadline import install_deadline
+from common.events import ChangeLog
+from common.health import install_health
+from common.logging_config import configure_logging
+from common.metrics import install_metrics
+from common.migrations import run_migrations
+from common.query_audit import install_query_audit
+from common.replica import RoutingSession, install_replica, read_only, replica_binds
+from common.responses import install_responses
+from common.tracing import install_tracing
+
+logger = configure_logging('product_service')
 
 app = Flask(__name__)
 CORS(app)
+install_responses(app)
 
-# DB details
-DB_HOST = os.getenv('DB_HOST', 'shopease-db.cmni2wmcozyh.us-east-1.rds.amazonaws.com')
-DB_PORT = os.getenv('DB_PORT', '3306')
-DB_USER = os.getenv('DB_USER', 'admin')
-DB_PASSWORD = os.getenv('DB_PASSWORD', 'ChangeMe123!')
-# keep the db name same for all services
-DB_NAME = os.getenv('DB_NAME', 'shopease')
-
-DATABASE_URI = f'mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
+# PRODUCT_SERVICE_DATABASE_URI or DATABASE_URI wins when set; otherwise it is built from DB_HOST/DB_PORT/DB_USER/DB_PASSWORD/DB_NAME
+DATABASE_URI = build_database_uri('product_service')
+DB_HOST, DB_NAME = database_location(DATABASE_URI)
 
 app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URI
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SQLALCHEMY_ECHO'] = False
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'pool_pre_ping': True,
-    'pool_recycle': 300,
-}
+# Pool size/overflow/timeout/recycle are tunable via PRODUCT_SERVICE_DB_* or DB_* variables
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options('product_service', DATABASE_URI)
+# Optional read replica for @read_only GET routes: PRODUCT_SERVICE_REPLICA_DATABASE_URI, REPLICA_DATABASE_URI or DB_REPLICA_HOST
+app.config['SQLALCHEMY_BINDS'] = replica_binds('product_service')
 
-db = SQLAlchemy(app)
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
+install_metrics(app, db, 'product_service')
+install_query_audit(app, 'product_service')
+install_deadline(app)
+install_replica(app, db, 'product_service')
+install_tracing(app, 'product_service')
+
+# /livez and /readyz; dependency status is refreshed in the background
+health = install_health(app, db, 'product_service', '/api/products')
 
 class Product(db.Model):
     __tablename__ = 'products'
@@ -35,39 +50,58 @@ class Product(db.Model):
     description = db.Column(db.Text)
     price = db.Column(db.Float, nullable=False)
     stock = db.Column(db.Integer, default=0)
-    category = db.Column(db.String(100))
+    category = db.Column(db.String(100), index=True)
     image_url = db.Column(db.String(500))
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     
     def to_dict(self):
+        return Product.row_to_dict(self)
+    
+    @staticmethod
+    def row_to_dict(row):
+        """Serialize a Product or a plain row selected from the products table"""
         return {
-            'id': self.id,
-            'name': self.name,
-            'description': self.description,
-            'price': self.price,
-            'stock': self.stock,
-            'category': self.category,
-            'image_url': self.image_url,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'id': row.id,
+            'name': row.name,
+            'description': row.description,
+            'price': row.price,
+            'stock': row.stock,
+            'category': row.category,
+            'image_url': row.image_url,
+            'created_at': row.created_at.isoformat() if row.created_at else None
         }
 
+# Every product insert/update/delete is logged to change_events in the same transaction
+# and served at /api/products/changes for consumers that cache product data
+changes = ChangeLog(db)
+changes.track(Product, 'product')
+changes.install(app, '/api/products')
+
 @app.route('/health', methods=['GET'])
 def health_check():
-    try:
-        db.session.execute(db.text('SELECT 1'))
-        return jsonify({'status': 'healthy', 'service': 'product_service', 'database': 'connected'}), 200
-    except Exception as e:
-        return jsonify({'status': 'unhealthy', 'error': str(e)}), 500
+    # Served from the background checker's cache; see /readyz for check details
+    db_status = health.database_status()
+    if db_status != 'connected':
+        return jsonify({'status': 'unhealthy', 'error': db_status}), 500
+    return jsonify({
+        'status': 'healthy',
+        'service': 'product_service',
+        'database': db_status,
+        'db_pool': pool_status(db.engine)
+    }), 200
 
 @app.route('/api/products', methods=['GET'])
+@read_only
 def get_products():
     try:
-        products = Product.query.all()
-        return jsonify([p.to_dict() for p in products]), 200
+        # Read-only: plain rows skip ORM identity-map and instrumentation overhead
+        rows = db.session.execute(db.select(Product.__table__)).all()
+        return jsonify([Product.row_to_dict(row) for row in rows]), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/products/<int:product_id>', methods=['GET'])
+@read_only
 def get_product(product_id):
     try:
         product = Product.query.get_or_404(product_id)
@@ -210,17 +244,26 @@ def init_data():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
-if __name__ == '__main__':
-    print("PRODUCT SERVICE STARTING", file=sys.stderr)
-    print(f"DB: {DB_HOST}/{DB_NAME}", file=sys.stderr)
+def run_startup_checks():
+    """Log the configuration and prepare the database; run once before serving"""
+    logger.info("Product service starting", extra={'db_host': DB_HOST, 'db_name': DB_NAME})
     
     with app.app_context():
+        try:
+            applied = run_migrations(db, 'product_service')
+            logger.info("Schema migrations applied", extra={'versions': applied})
+        except Exception as e:
+            logger.warning("Schema migration warning", extra={'error': str(e)})
+        
         try:
             db.create_all()
-            print("Database tables created", file=sys.stderr)
+            logger.info("Database tables created")
         except Exception as e:
-            print(f"Database warning: {e}", file=sys.stderr)
+            logger.warning("Database warning", extra={'error': str(e)})
+
+if __name__ == '__main__':
+    run_startup_checks()
     
     port = int(os.getenv('PORT', 5000))
-    print(f"Starting server on port {port}", file=sys.stderr)
+    logger.info("Starting server", extra={'port': port})
     app.run(debug=False, host='0.0.0.0', port=port)
\ No newline at end of file
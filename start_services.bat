@@ -38,6 +38,11 @@ timeout /t 3 >NUL
 echo Starting Notification Service on port 5005...
 start "Notification Service" cmd /k "call venv\Scripts\activate.bat ^&^& set PORT=5005 ^&^& python notification_service.py"
 
+timeout /t 3 >NUL
+
+echo Starting Storefront Service on port 5006...
+start "Storefront Service" cmd /k "call venv\Scripts\activate.bat ^&^& set PORT=5006 ^&^& python storefront_service.py"
+
 echo.
 echo ======================================
 echo All services are starting (local mode)...
@@ -47,6 +52,7 @@ echo User Service:         http://localhost:5001
 echo Order Service:        http://localhost:5002
 echo Payment Service:      http://localhost:5003
 echo Notification Service: http://localhost:5005
+echo Storefront Service:   http://localhost:5006
 echo Frontend (Compose):   http://localhost:8081
 echo.
 echo Tip: Stop Docker Compose or change ports to avoid conflicts.
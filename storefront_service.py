@@ -0,0 +1,290 @@
+from flask import Flask, request, jsonify
+from flask_cors import CORS
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+import requests
+import os
+import threading
+import time
+from common import deadline, upstream
+from common.deadline import install_deadline
+from common.events import install_change_consumer
+from common.health import install_health
+from common.logging_config import configure_logging
+from common.metrics import install_metrics
+from common.query_audit import install_query_audit
+from common.responses import install_responses
+from common.tracing import carry_context, install_tracing
+
+logger = configure_logging('storefront_service')
+
+app = Flask(__name__)
+CORS(app)
+install_responses(app)
+install_metrics(app, None, 'storefront_service')
+install_query_audit(app, 'storefront_service')
+install_deadline(app)
+install_tracing(app, 'storefront_service')
+
+# ════════════════════════════════════════════════════════════════════════════════
+# MICROSERVICES CONFIGURATION
+# ════════════════════════════════════════════════════════════════════════════════
+
+PRODUCT_SERVICE_URL = os.getenv('PRODUCT_SERVICE_URL', 'http://shopease-alb-1528125855.us-east-1.elb.amazonaws.com/api/products')
+USER_SERVICE_URL = os.getenv('USER_SERVICE_URL', 'http://shopease-alb-1528125855.us-east-1.elb.amazonaws.com/api/users')
+ORDER_SERVICE_URL = os.getenv('ORDER_SERVICE_URL', 'http://shopease-alb-1528125855.us-east-1.elb.amazonaws.com/api/orders')
+PAYMENT_SERVICE_URL = os.getenv('PAYMENT_SERVICE_URL', 'http://shopease-alb-1528125855.us-east-1.elb.amazonaws.com/api/payments')
+NOTIFICATION_SERVICE_URL = os.getenv('NOTIFICATION_SERVICE_URL', 'http://shopease-alb-1528125855.us-east-1.elb.amazonaws.com/api/notifications')
+
+# /livez and /readyz; dependency status is refreshed in the background
+health = install_health(app, None, 'storefront_service', '/api/storefront', {
+    'product': PRODUCT_SERVICE_URL,
+    'user': USER_SERVICE_URL,
+    'order': ORDER_SERVICE_URL,
+    'payment': PAYMENT_SERVICE_URL,
+    'notification': NOTIFICATION_SERVICE_URL
+})
+
+# ════════════════════════════════════════════════════════════════════════════════
+# FAN-OUT CONFIGURATION
+# ════════════════════════════════════════════════════════════════════════════════
+
+# Seconds each source may take; override one with STOREFRONT_TIMEOUT_<SOURCE>, e.g. STOREFRONT_TIMEOUT_PRODUCTS=3
+DEFAULT_TIMEOUT = float(os.getenv('STOREFRONT_TIMEOUT', '2'))
+# A failed source falls back to a cached copy up to this old
+STALE_SECONDS = float(os.getenv('STOREFRONT_STALE_SECONDS', '300'))
+CACHE_MAX_ENTRIES = int(os.getenv('STOREFRONT_CACHE_MAX_ENTRIES', '1000'))
+FANOUT_WORKERS = int(os.getenv('STOREFRONT_WORKERS', '16'))
+
+# upstream: name used by common.upstream; url: may contain {user_id}; ttl: seconds a response is reused;
+# entity: the response is a list of these (change events evict it, see evict_on_change), else None
+Source = namedtuple('Source', ['upstream', 'url', 'ttl', 'entity'], defaults=(None,))
+
+SOURCES = {
+    'products': Source('product', PRODUCT_SERVICE_URL, 30, entity='product'),
+    'user_orders': Source('order', ORDER_SERVICE_URL + '/user/{user_id}', 5),
+    'unread_count': Source('notification', NOTIFICATION_SERVICE_URL + '/user/{user_id}/unread-count', 5),
+    'orders': Source('order', ORDER_SERVICE_URL, 5),
+    'users': Source('user', USER_SERVICE_URL, 30, entity='user'),
+    'payment_stats': Source('payment', PAYMENT_SERVICE_URL + '/stats', 15),
+}
+
+# page -> (sources always fetched, sources fetched when ?user_id= is given)
+PAGES = {
+    'home': (['products'], ['user_orders', 'unread_count']),
+    'admin': (['orders', 'users', 'payment_stats'], []),
+}
+
+FANOUT_EXECUTOR = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix='storefront-fanout')
+
+def source_timeout(name):
+    """The source's timeout, or less when the request's deadline is nearer"""
+    return max(0.0, deadline.clamp(float(os.getenv(f'STOREFRONT_TIMEOUT_{name.upper()}', DEFAULT_TIMEOUT))))
+
+# ════════════════════════════════════════════════════════════════════════════════
+# RESPONSE CACHE
+# ════════════════════════════════════════════════════════════════════════════════
+
+class ResponseCache:
+    """Thread-safe LRU of upstream responses keyed by URL.
+
+    Entries past their TTL are not served as fresh but are kept so that a failing
+    source can fall back to its last good response. Each entry carries tags, the
+    (entity, id) pairs its data contains, so a change evicts exactly the responses
+    that show it.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return (value, age_seconds) or None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            self.entries.move_to_end(key)
+            value, stored_at, _ = entry
+            return value, time.monotonic() - stored_at
+
+    def set(self, key, value, tags=frozenset()):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic(), tags)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def evict_tag(self, tag):
+        """Drop every entry tagged with `tag`; returns how many"""
+        with self.lock:
+            keys = [key for key, (_, _, tags) in self.entries.items() if tag in tags]
+            for key in keys:
+                del self.entries[key]
+            return len(keys)
+
+    def count(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'hits': self.hits, 'misses': self.misses}
+
+RESPONSE_CACHE = ResponseCache(CACHE_MAX_ENTRIES)
+
+def source_tags(source, data):
+    """Cache tags of a response: (entity, id) for each item listed, plus (entity, '*') for list membership"""
+    if source.entity is None or not isinstance(data, list):
+        return frozenset()
+    tags = {(source.entity, '*')}
+    tags.update((source.entity, item['id']) for item in data if isinstance(item, dict) and 'id' in item)
+    return frozenset(tags)
+
+def evict_on_change(entity):
+    """Change event handler factory: evict the cached responses that show the changed entity
+
+    An update or delete evicts the responses listing that id; a create, or a reset
+    (entity_id None), evicts every list of the entity. Pages are assembled from
+    these sources on each request, so they pick up the change with no page cache to clear.
+    """
+    def handler(event):
+        if event.get('entity_id') is None or event.get('action') == 'created':
+            RESPONSE_CACHE.evict_tag((entity, '*'))
+        else:
+            RESPONSE_CACHE.evict_tag((entity, event['entity_id']))
+    return handler
+
+# Sources that list products or users are refreshed as soon as an entry in them changes
+product_changes = install_change_consumer(app, 'product', PRODUCT_SERVICE_URL, evict_on_change('product'))
+user_changes = install_change_consumer(app, 'user', USER_SERVICE_URL, evict_on_change('user'))
+
+# ════════════════════════════════════════════════════════════════════════════════
+# HELPER FUNCTIONS
+# ════════════════════════════════════════════════════════════════════════════════
+
+def fetch_source(name, params):
+    """Fetch one source, from the cache while fresh; returns (data, metadata)"""
+    started = time.perf_counter()
+    source = SOURCES[name]
+    url = source.url.format(**params)
+    cached = RESPONSE_CACHE.get(url)
+
+    if cached is not None and cached[1] < source.ttl:
+        RESPONSE_CACHE.count(hit=True)
+        return cached[0], {'cached': True, 'age_seconds': round(cached[1], 1)}
+    RESPONSE_CACHE.count(hit=False)
+
+    try:
+        response = upstream.get(source.upstream, url, timeout=source_timeout(name))
+        if response.status_code != 200:
+            raise requests.HTTPError(f'{source.upstream} returned HTTP {response.status_code}')
+        data = response.json()
+    except (requests.RequestException, ValueError) as e:
+        if cached is not None and cached[1] < STALE_SECONDS:
+            logger.warning("Serving stale storefront source", extra={'source': name, 'error': str(e)})
+            return cached[0], {
+                'cached': True,
+                'stale': True,
+                'age_seconds': round(cached[1], 1),
+                'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+                'error': str(e)
+            }
+        raise
+
+    RESPONSE_CACHE.set(url, data, source_tags(source, data))
+    return data, {'cached': False, 'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)}
+
+def fetch_all(names, params):
+    """Fetch sources concurrently; each one is bounded by its own timeout"""
+    started = time.monotonic()
+    futures = {name: FANOUT_EXECUTOR.submit(carry_context(fetch_source), name, params) for name in names}
+
+    data, sources, errors = {}, {}, {}
+    for name, future in futures.items():
+        remaining = max(0.0, started + source_timeout(name) - time.monotonic())
+        try:
+            data[name], sources[name] = future.result(timeout=remaining)
+        except FuturesTimeout:
+            future.cancel()
+            data[name] = None
+            errors[name] = f'timed out after {source_timeout(name)}s'
+        except Exception as e:
+            data[name] = None
+            errors[name] = str(e)
+
+    return data, sources, errors
+
+# ════════════════════════════════════════════════════════════════════════════════
+# API ROUTES
+# ════════════════════════════════════════════════════════════════════════════════
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    """Health check endpoint for monitoring"""
+    return jsonify({
+        'status': 'healthy',
+        'service': 'storefront_service',
+        'pages': list(PAGES),
+        'cache': RESPONSE_CACHE.stats()
+    }), 200
+
+@app.route('/api/storefront/<page>', methods=['GET'])
+def get_page(page):
+    """Everything one frontend page needs in a single response
+
+    ?user_id= adds that user's sources (home: orders and unread count). Sources
+    that fail or time out are returned as null with a reason in `errors`, so a
+    slow dependency degrades the page instead of blocking it.
+    """
+    try:
+        if page not in PAGES:
+            return jsonify({'error': f'Unknown page: {page}', 'pages': list(PAGES)}), 404
+
+        always, per_user = PAGES[page]
+        names, params = list(always), {}
+        user_id = request.args.get('user_id', type=int)
+        if user_id is not None:
+            names += per_user
+            params['user_id'] = user_id
+
+        data, sources, errors = fetch_all(names, params)
+
+        if errors:
+            logger.warning("Storefront sources failed", extra={'page': page, 'errors': errors})
+
+        return jsonify({
+            'page': page,
+            'data': data,
+            'sources': sources,
+            'errors': errors
+        }), 502 if len(errors) == len(names) else 200
+
+    except Exception as e:
+        logger.exception("Error building storefront page", extra={'page': page})
+        return jsonify({'error': str(e)}), 500
+
+# ════════════════════════════════════════════════════════════════════════════════
+# APPLICATION STARTUP
+# ════════════════════════════════════════════════════════════════════════════════
+
+def run_startup_checks():
+    """Log the configuration; run once before serving"""
+    logger.info("Storefront service starting", extra={
+        'port': int(os.getenv('PORT', 5006)),
+        'default_timeout': DEFAULT_TIMEOUT,
+        'sources': {name: source.url for name, source in SOURCES.items()}
+    })
+
+if __name__ == '__main__':
+    run_startup_checks()
+
+    port = int(os.getenv('PORT', 5006))
+    debug = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
+    app.run(debug=debug, host='0.0.0.0', port=port)
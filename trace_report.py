@@ -0,0 +1,80 @@
+"""Rebuild request traces from the span file written by common/tracing.py.
+
+Usage:
+    python trace_report.py traces.jsonl                 # 10 slowest traces
+    python trace_report.py traces.jsonl --top 3
+    python trace_report.py traces.jsonl --trace <trace_id or X-Request-ID>
+"""
+import argparse
+import json
+import sys
+from collections import defaultdict
+
+
+def load_spans(paths):
+    traces = defaultdict(list)
+    for path in paths:
+        with open(path, encoding='utf-8') as handle:
+            for line in handle:
+                line = line.strip()
+                if line:
+                    span = json.loads(line)
+                    traces[span['trace_id']].append(span)
+    return traces
+
+
+def trace_duration(spans):
+    start = min(span['start_time'] for span in spans)
+    end = max(span['start_time'] + (span['duration_ms'] or 0) / 1000 for span in spans)
+    return (end - start) * 1000
+
+
+def print_trace(trace_id, spans):
+    by_parent = defaultdict(list)
+    span_ids = {span['span_id'] for span in spans}
+    for span in spans:
+        parent = span['parent_span_id'] if span['parent_span_id'] in span_ids else None
+        by_parent[parent].append(span)
+    origin = min(span['start_time'] for span in spans)
+
+    request_id = next((span['attributes'].get('request_id') for span in spans if span['attributes'].get('request_id')), trace_id)
+    print(f"\ntrace {trace_id}  request_id={request_id}  total={trace_duration(spans):.1f}ms  spans={len(spans)}")
+
+    def walk(parent, depth):
+        children = sorted(by_parent.get(parent, []), key=lambda s: s['start_time'])
+        slowest = max(children, key=lambda s: s['duration_ms'] or 0, default=None)
+        for span in children:
+            offset = (span['start_time'] - origin) * 1000
+            status = span['attributes'].get('http.status_code', '')
+            marker = '*' if span is slowest and len(children) > 1 else ' '
+            print(f"  {marker} +{offset:8.1f}ms {span['duration_ms'] or 0:9.1f}ms  "
+                  f"{'  ' * depth}[{span['service']}] {span['kind']:6} {span['name']} {status}")
+            walk(span['span_id'], depth + 1)
+
+    walk(None, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Show the slowest traces and their per-hop timings')
+    parser.add_argument('files', nargs='+', help='span files (TRACE_FILE of one or more services)')
+    parser.add_argument('--top', type=int, default=10, help='number of slowest traces to show')
+    parser.add_argument('--trace', help='show a single trace by trace id or X-Request-ID')
+    args = parser.parse_args()
+
+    traces = load_spans(args.files)
+    if args.trace:
+        selected = [(trace_id, spans) for trace_id, spans in traces.items()
+                    if trace_id == args.trace or any(s['attributes'].get('request_id') == args.trace for s in spans)]
+        if not selected:
+            print(f"No trace found for {args.trace}")
+            sys.exit(1)
+    else:
+        selected = sorted(traces.items(), key=lambda item: trace_duration(item[1]), reverse=True)[:args.top]
+
+    for trace_id, spans in selected:
+        print_trace(trace_id, spans)
+    print("\n* = slowest sibling (on the critical path when calls are sequential)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -6,10 +6,25 @@ import jwt
 import datetime
 import requests
 import os
-import sys
+from common import upstream
+from common.db_config import build_database_uri, database_location, engine_options, pool_status
+from common.deadline import install_deadline
+from common.events import ChangeLog
+from common.health import install_health
+from common.logging_config import configure_logging
+from common.metrics import install_metrics
+from common.migrations import run_migrations
+from common.query_audit import install_query_audit
+from common.replica import RoutingSession, install_replica, read_only, replica_binds
+from common.responses import install_responses
+from common.static import install_static
+from common.tracing import install_tracing
+
+logger = configure_logging('user_service')
 
 app = Flask(__name__)
 CORS(app)
+install_responses(app)
 
 # ════════════════════════════════════════════════════════════════════════════════
 # SECRET KEY & JWT CONFIGURATION
@@ -21,28 +36,24 @@ app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'shopease-secret-key-change-i
 # DATABASE CONFIGURATION - RDS Connection
 # ════════════════════════════════════════════════════════════════════════════════
 
-# DB details
-DB_HOST = os.getenv('DB_HOST', 'shopease-db.cmni2wmcozyh.us-east-1.rds.amazonaws.com')
-DB_PORT = os.getenv('DB_PORT', '3306')
-DB_USER = os.getenv('DB_USER', 'admin')
-DB_PASSWORD = os.getenv('DB_PASSWORD', 'ChangeMe123!')
-# keep the db name same for all services
-DB_NAME = os.getenv('DB_NAME', 'shopease')
-
-DATABASE_URI = f'mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
+# USER_SERVICE_DATABASE_URI or DATABASE_URI wins when set; otherwise it is built from DB_HOST/DB_PORT/DB_USER/DB_PASSWORD/DB_NAME
+DATABASE_URI = build_database_uri('user_service')
+DB_HOST, DB_NAME = database_location(DATABASE_URI)
 
-# Configure SQLAlchemy
 app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URI
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SQLALCHEMY_ECHO'] = False
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'pool_pre_ping': True,
-    'pool_recycle': 300,
-    'pool_size': 10,
-    'max_overflow': 20
-}
+# Pool size/overflow/timeout/recycle are tunable via USER_SERVICE_DB_* or DB_* variables
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options('user_service', DATABASE_URI, pool_size=10, max_overflow=20)
+# Optional read replica for @read_only GET routes: USER_SERVICE_REPLICA_DATABASE_URI, REPLICA_DATABASE_URI or DB_REPLICA_HOST
+app.config['SQLALCHEMY_BINDS'] = replica_binds('user_service', pool_size=10, max_overflow=20)
 
-db = SQLAlchemy(app)
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
+install_metrics(app, db, 'user_service')
+install_query_audit(app, 'user_service')
+install_deadline(app)
+install_replica(app, db, 'user_service')
+install_tracing(app, 'user_service')
 
 # ════════════════════════════════════════════════════════════════════════════════
 # MICROSERVICES CONFIGURATION
@@ -50,6 +61,9 @@ db = SQLAlchemy(app)
 
 NOTIFICATION_SERVICE_URL = os.getenv('NOTIFICATION_SERVICE_URL', 'http://shopease-alb-1528125855.us-east-1.elb.amazonaws.com/api/notifications')
 
+# /livez and /readyz; dependency status is refreshed in the background
+health = install_health(app, db, 'user_service', '/api/users', {'notification': NOTIFICATION_SERVICE_URL})
+
 # ════════════════════════════════════════════════════════════════════════════════
 # USER MODEL
 # ════════════════════════════════════════════════════════════════════════════════
@@ -72,22 +86,36 @@ class User(db.Model):
         return check_password_hash(self.password_hash, password)
         
     def to_dict(self):
+        return User.row_to_dict(self)
+    
+    @staticmethod
+    def row_to_dict(row):
+        """Serialize a User or a row of USER_PUBLIC_COLUMNS"""
         return {
-            'id': self.id,
-            'username': self.username,
-            'email': self.email,
-            'first_name': self.first_name,
-            'last_name': self.last_name,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'id': row.id,
+            'username': row.username,
+            'email': row.email,
+            'first_name': row.first_name,
+            'last_name': row.last_name,
+            'created_at': row.created_at.isoformat() if row.created_at else None
         }
 
+# Everything to_dict() exposes; password_hash is never read for listings
+USER_PUBLIC_COLUMNS = (User.id, User.username, User.email, User.first_name, User.last_name, User.created_at)
+
+# Every user insert/update/delete is logged to change_events in the same transaction
+# and served at /api/users/changes for consumers that cache user data
+changes = ChangeLog(db)
+changes.track(User, 'user')
+changes.install(app, '/api/users')
+
 # ════════════════════════════════════════════════════════════════════════════════
 # HELPER FUNCTIONS
 # ════════════════════════════════════════════════════════════════════════════════
 
 def send_notification(user_id, notification_type, message, email, username):
     try:
-        response = requests.post(f'{NOTIFICATION_SERVICE_URL}',     
+        response = upstream.post('notification', f'{NOTIFICATION_SERVICE_URL}',
             json={
                 'user_id': user_id,
                 'type': notification_type,
@@ -101,13 +129,13 @@ def send_notification(user_id, notification_type, message, email, username):
             timeout=5
         )
         
-        if response.status_code == 201:
-            print(f"✅ Notification sent to user {user_id}", file=sys.stderr)
+        if response.status_code in (201, 202):
+            logger.info("Notification sent", extra={'user_id': user_id})
         else:
-            print(f"⚠️  Notification failed: {response.status_code}", file=sys.stderr)
+            logger.warning("Notification failed", extra={'user_id': user_id, 'status_code': response.status_code})
             
     except requests.RequestException as e:
-        print(f"⚠️  Could not send notification: {e}", file=sys.stderr)
+        logger.warning("Could not send notification", extra={'user_id': user_id, 'error': str(e)})
 
 # ════════════════════════════════════════════════════════════════════════════════
 # API ROUTES
@@ -115,18 +143,16 @@ def send_notification(user_id, notification_type, message, email, username):
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    try:
-        db.session.execute(db.text('SELECT 1'))
-        db_status = 'connected'
-    except Exception as e:
-        db_status = f'disconnected: {str(e)}'
+    # Served from the background checker's cache; see /readyz for check details
+    db_status = health.database_status()
     
     return jsonify({
         'status': 'healthy',
         'service': 'user_service',
         'database': db_status,
         'db_name': DB_NAME,
-        'db_host': DB_HOST
+        'db_host': DB_HOST,
+        'db_pool': pool_status(db.engine)
     }), 200
 
 @app.route('/api/users/register', methods=['POST'])
@@ -201,14 +227,16 @@ def login():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/users', methods=['GET'])
+@read_only
 def get_users():
     try:
-        users = User.query.all()
-        return jsonify([user.to_dict() for user in users]), 200
+        rows = db.session.execute(db.select(*USER_PUBLIC_COLUMNS)).all()
+        return jsonify([User.row_to_dict(row) for row in rows]), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/users/<int:user_id>', methods=['GET'])
+@read_only
 def get_user(user_id):
     try:
         user = User.query.get_or_404(user_id)
@@ -236,26 +264,20 @@ def update_user(user_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
-@app.route('/frontend/<path:path>')
-def serve_frontend(path):
-    return send_from_directory('frontend', path)
-
-@app.route('/')
-def home():
-    return send_from_directory('frontend', 'index.html')
+# / and /frontend/<path> from memory, cached by the browser; see build_frontend.py
+install_static(app)
 
 # ════════════════════════════════════════════════════════════════════════════════
 # APPLICATION STARTUP
 # ════════════════════════════════════════════════════════════════════════════════
 
-if __name__ == '__main__':
-    print("="*80, file=sys.stderr)
-    print("USER SERVICE STARTING", file=sys.stderr)
-    print("="*80, file=sys.stderr)
-    print(f"Database: {DB_NAME}", file=sys.stderr)
-    print(f"Host:     {DB_HOST}", file=sys.stderr)
-    print(f"Port:     5001", file=sys.stderr)
-    print("="*80, file=sys.stderr)
+def run_startup_checks():
+    """Log the configuration and prepare the database; run once before serving"""
+    logger.info("User service starting", extra={
+        'db_name': DB_NAME,
+        'db_host': DB_HOST,
+        'port': int(os.getenv('PORT', 5001))
+    })
     
     with app.app_context():
         max_retries = 5
@@ -264,30 +286,38 @@ if __name__ == '__main__':
         while retry_count < max_retries:
             try:
                 db.session.execute(db.text('SELECT 1'))
-                print("✅ Database connection successful!", file=sys.stderr)
+                logger.info("Database connection successful")
+                
+                try:
+                    applied = run_migrations(db, 'user_service')
+                    logger.info("Schema migrations applied", extra={'versions': applied})
+                except Exception as e:
+                    logger.warning("Schema migration warning", extra={'error': str(e)})
                 
                 try:
                     db.create_all()
-                    print("✅ Database tables created/verified!", file=sys.stderr)
+                    logger.info("Database tables created/verified")
                 except Exception as e:
-                    print(f"⚠️  Table creation warning: {e}", file=sys.stderr)
+                    logger.warning("Table creation warning", extra={'error': str(e)})
                 
                 break
                 
             except Exception as e:
                 retry_count += 1
-                print(f"❌ Database connection attempt {retry_count}/{max_retries} failed: {e}", file=sys.stderr)
+                logger.error("Database connection attempt failed", extra={'attempt': retry_count, 'max_retries': max_retries, 'error': str(e)})
                 
                 if retry_count >= max_retries:
-                    print(f"❌ Could not connect to database after {max_retries} attempts", file=sys.stderr)
-                    print(f"   DB_HOST: {DB_HOST}", file=sys.stderr)
-                    print(f"   DB_PORT: {DB_PORT}", file=sys.stderr)
-                    print(f"   DB_USER: {DB_USER}", file=sys.stderr)
-                    print(f"   DB_NAME: {DB_NAME}", file=sys.stderr)
-                    print("⚠️  Service starting anyway but may not function properly", file=sys.stderr)
+                    logger.error("Could not connect to database; service starting anyway but may not function properly", extra={
+                        'attempts': max_retries,
+                        'db_host': DB_HOST,
+                        'db_name': DB_NAME
+                    })
                 else:
                     import time
                     time.sleep(2)
+
+if __name__ == '__main__':
+    run_startup_checks()
     
     port = int(os.getenv('PORT', 5001))
     debug = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
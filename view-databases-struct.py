@@ -1,154 +1,335 @@
-import pymysql
+"""ShopEase database structure and performance report.
+
+Reads all table, column and index metadata with a handful of information_schema
+queries (not several per table), reports table and index sizes, EXPLAINs the
+service query shapes listed in migrations/<service>/query_plans.sql, and flags
+full scans, missing and redundant indexes.
+
+    python view-databases-struct.py                         # readable report
+    python view-databases-struct.py --json snapshot.json    # also write a JSON snapshot to diff later
+    python view-databases-struct.py --databases shopeasedb --exact-counts --samples
+
+Connection settings come from DB_HOST / DB_PORT / DB_USER / DB_PASSWORD when set.
+"""
+import argparse
+import datetime
+import json
+import os
+import re
 import sys
+from collections import defaultdict
+
+from sqlalchemy import bindparam, create_engine, text
 from tabulate import tabulate
 
-HOST = "shopease-mysql-db.cmni2wmcozyh.us-east-1.rds.amazonaws.com"
-USER = "admin"
-PASSWORD = "Yog101619Admin"
-PORT = 3306
-
-print("\n" + "="*100)
-print(" "*35 + "SHOPEASE RDS DATABASE STRUCTURE")
-print("="*100)
-
-try:
-    conn = pymysql.connect(
-        host=HOST,
-        user=USER,
-        password=PASSWORD,
-        port=PORT,
-        charset='utf8mb4',
-        connect_timeout=30
-    )
-    
-    cursor = conn.cursor()
-    
-    databases = ['productdb', 'userdb', 'orderdb', 'paymentdb', 'notificationdb']
-    
-    for db_name in databases:
-        cursor.execute(f"USE {db_name}")
-        
+from common.migrations import MIGRATIONS_DIR, explain, load_query_plans
+
+HOST = os.getenv('DB_HOST', "shopease-mysql-db.cmni2wmcozyh.us-east-1.rds.amazonaws.com")
+USER = os.getenv('DB_USER', "admin")
+PASSWORD = os.getenv('DB_PASSWORD', "Yog101619Admin")
+PORT = int(os.getenv('DB_PORT', 3306))
+
+DATABASES = ['productdb', 'userdb', 'orderdb', 'paymentdb', 'notificationdb']
+
+# ════════════════════════════════════════════════════════════════════════════════
+# METADATA (one query per kind, for all databases at once)
+# ════════════════════════════════════════════════════════════════════════════════
+
+def fetch_metadata(conn, schemas):
+    params = {'schemas': schemas}
+    databases = {schema: {'tables': {}} for schema in schemas}
+
+    tables = conn.execute(text(
+        "SELECT table_schema, table_name, engine, table_rows, data_length, index_length "
+        "FROM information_schema.tables "
+        "WHERE table_schema IN :schemas AND table_type = 'BASE TABLE' ORDER BY table_schema, table_name"
+    ).bindparams(expanding_schemas()), params).all()
+    for row in tables:
+        databases[row.table_schema]['tables'][row.table_name] = {
+            'engine': row.engine,
+            'rows_estimate': int(row.table_rows or 0),
+            'data_bytes': int(row.data_length or 0),
+            'index_bytes': int(row.index_length or 0),
+            'columns': [],
+            'indexes': {},
+        }
+
+    columns = conn.execute(text(
+        "SELECT table_schema, table_name, column_name, column_type, is_nullable, column_key, column_default, extra "
+        "FROM information_schema.columns "
+        "WHERE table_schema IN :schemas ORDER BY table_schema, table_name, ordinal_position"
+    ).bindparams(expanding_schemas()), params).all()
+    for row in columns:
+        table = databases[row.table_schema]['tables'].get(row.table_name)
+        if table is not None:
+            table['columns'].append({
+                'name': row.column_name,
+                'type': row.column_type,
+                'nullable': row.is_nullable == 'YES',
+                'key': row.column_key or '',
+                'default': row.column_default,
+                'extra': row.extra or '',
+            })
+
+    statistics = conn.execute(text(
+        "SELECT table_schema, table_name, index_name, seq_in_index, column_name, non_unique, cardinality "
+        "FROM information_schema.statistics "
+        "WHERE table_schema IN :schemas ORDER BY table_schema, table_name, index_name, seq_in_index"
+    ).bindparams(expanding_schemas()), params).all()
+    for row in statistics:
+        table = databases[row.table_schema]['tables'].get(row.table_name)
+        if table is None:
+            continue
+        index = table['indexes'].setdefault(row.index_name, {
+            'columns': [], 'unique': not row.non_unique, 'cardinality': None, 'bytes': None
+        })
+        index['columns'].append(row.column_name)
+        index['cardinality'] = row.cardinality  # of the full prefix, i.e. the last column seen
+
+    try:
+        sizes = conn.execute(text(
+            "SELECT database_name, table_name, index_name, stat_value * @@innodb_page_size AS bytes "
+            "FROM mysql.innodb_index_stats WHERE stat_name = 'size' AND database_name IN :schemas"
+        ).bindparams(expanding_schemas()), params).all()
+    except Exception:
+        conn.rollback()
+        sizes = []  # needs SELECT on the mysql schema; table totals above still apply
+    for row in sizes:
+        table = databases.get(row.database_name, {}).get('tables', {}).get(row.table_name)
+        if table is not None and row.index_name in table['indexes']:
+            table['indexes'][row.index_name]['bytes'] = int(row.bytes)
+
+    return databases
+
+
+def expanding_schemas():
+    return bindparam('schemas', expanding=True)
+
+
+def fetch_exact_counts(conn, databases):
+    """COUNT(*) of every table in one UNION ALL statement"""
+    parts = [
+        f"SELECT '{schema}' AS table_schema, '{name}' AS table_name, COUNT(*) AS row_count FROM `{schema}`.`{name}`"
+        for schema, info in databases.items() for name in info['tables']
+    ]
+    if not parts:
+        return
+    for row in conn.execute(text(' UNION ALL '.join(parts))).all():
+        databases[row.table_schema]['tables'][row.table_name]['rows'] = int(row.row_count)
+
+# ════════════════════════════════════════════════════════════════════════════════
+# QUERY PLANS AND INDEX ADVICE
+# ════════════════════════════════════════════════════════════════════════════════
+
+def service_query_shapes():
+    """[(service, route, sql)] from every migrations/<service>/query_plans.sql"""
+    shapes = []
+    if os.path.isdir(MIGRATIONS_DIR):
+        for service in sorted(os.listdir(MIGRATIONS_DIR)):
+            for route, sql in load_query_plans(service):
+                shapes.append((service, route, sql))
+    return shapes
+
+
+def suggest_index(sql):
+    """Equality columns of the WHERE clause followed by the ORDER BY columns"""
+    where = re.search(r'\bWHERE\b(.*?)(\bORDER BY\b|\bGROUP BY\b|\bLIMIT\b|$)', sql, re.I | re.S)
+    order = re.search(r'\bORDER BY\b(.*?)(\bLIMIT\b|$)', sql, re.I | re.S)
+    columns = []
+    if where:
+        columns += [c for c in re.findall(r'(\w+)\s*(?:=|\bIN\b)', where.group(1), re.I) if c.upper() not in ('AND', 'OR')]
+    if order:
+        columns += [c.strip().split()[0] for c in order.group(1).split(',')]
+    seen = []
+    for column in columns:
+        if column not in seen:
+            seen.append(column)
+    return seen
+
+
+def run_query_plans(conn, databases):
+    for schema, info in databases.items():
+        info['query_plans'] = []
+        conn.exec_driver_sql(f'USE `{schema}`')
+        for service, route, sql in service_query_shapes():
+            tables = re.findall(r'\bFROM\s+`?(\w+)`?', sql, re.I)
+            if not tables or any(table not in info['tables'] for table in tables):
+                continue  # this service's tables live in another database
+            try:
+                plan, full_scans, notes = explain(conn, sql)
+            except Exception as e:
+                conn.rollback()
+                info['query_plans'].append({'service': service, 'route': route, 'sql': sql, 'error': str(e)})
+                continue
+            info['query_plans'].append({
+                'service': service,
+                'route': route,
+                'sql': sql,
+                'access': [{'table': row.get('table'), 'type': row.get('type'), 'key': row.get('key'),
+                            'rows': row.get('rows'), 'extra': row.get('Extra')} for row in plan],
+                'full_scans': full_scans,
+                'notes': notes,
+                'suggested_index': suggest_index(sql) if full_scans else None,
+            })
+
+
+def find_redundant_indexes(info):
+    """Non-unique indexes whose columns are a prefix of another index on the same table"""
+    findings = []
+    for table_name, table in info['tables'].items():
+        for name, index in table['indexes'].items():
+            if index['unique']:
+                continue
+            for other_name, other in table['indexes'].items():
+                if other_name != name and len(other['columns']) > len(index['columns']) \
+                        and other['columns'][:len(index['columns'])] == index['columns']:
+                    findings.append(f"{table_name}.{name} ({', '.join(index['columns'])}) "
+                                    f"is redundant with {other_name} ({', '.join(other['columns'])})")
+                    break
+    return findings
+
+
+def collect_findings(databases):
+    for info in databases.values():
+        findings = []
+        for plan in info['query_plans']:
+            if plan.get('error'):
+                findings.append(f"[{plan['service']}] {plan['route']}: EXPLAIN failed: {plan['error']}")
+            elif plan['full_scans']:
+                findings.append(f"[{plan['service']}] {plan['route']}: full scan of {', '.join(plan['full_scans'])}; "
+                                f"missing index ({', '.join(plan['suggested_index'])})")
+        findings += find_redundant_indexes(info)
+        info['findings'] = findings
+
+# ════════════════════════════════════════════════════════════════════════════════
+# OUTPUT
+# ════════════════════════════════════════════════════════════════════════════════
+
+def format_bytes(value):
+    if value is None:
+        return '-'
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if value < 1024 or unit == 'GB':
+            return f"{value:.0f} {unit}" if unit == 'B' else f"{value:.1f} {unit}"
+        value /= 1024
+
+
+def print_report(conn, databases, samples):
+    key_icons = {'PRI': '🔑', 'MUL': '🔗', 'UNI': '⭐'}
+    for schema, info in databases.items():
         print(f"\n{'='*100}")
-        print(f"📦 DATABASE: {db_name.upper()}")
+        print(f"📦 DATABASE: {schema.upper()}")
         print(f"{'='*100}")
-        
-        # Get all tables in database
-        cursor.execute("SHOW TABLES")
-        tables = cursor.fetchall()
-        
-        for table_tuple in tables:
-            table_name = table_tuple[0]
-            
+
+        for table_name, table in info['tables'].items():
             print(f"\n┌{'─'*98}┐")
             print(f"│ 📋 TABLE: {table_name:<85} │")
             print(f"└{'─'*98}┘")
-            
-            # Get table structure
-            cursor.execute(f"DESCRIBE {table_name}")
-            columns = cursor.fetchall()
-            
-            # Format column information
+
             column_data = []
-            for col in columns:
-                field = col[0]
-                col_type = col[1]
-                null = col[2]
-                key = col[3]
-                default = col[4] if col[4] is not None else 'NULL'
-                extra = col[5]
-                
-                # Truncate long types
-                if len(str(col_type)) > 30:
-                    col_type = str(col_type)[:27] + "..."
-                
-                # Add emoji for key types
-                key_icon = ""
-                if key == "PRI":
-                    key_icon = "🔑"
-                elif key == "MUL":
-                    key_icon = "🔗"
-                elif key == "UNI":
-                    key_icon = "⭐"
-                
+            for column in table['columns']:
+                col_type = column['type'] if len(column['type']) <= 30 else column['type'][:27] + "..."
                 column_data.append([
-                    key_icon,
-                    field,
+                    key_icons.get(column['key'], ''),
+                    column['name'],
                     col_type,
-                    null,
-                    default,
-                    extra
+                    'YES' if column['nullable'] else 'NO',
+                    column['default'] if column['default'] is not None else 'NULL',
+                    column['extra']
                 ])
-            
-            # Print table using tabulate
-            headers = ["Key", "Column Name", "Data Type", "Null", "Default", "Extra"]
-            print(tabulate(column_data, headers=headers, tablefmt="grid"))
-            
-            # Get row count
-            cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-            count = cursor.fetchone()[0]
-            print(f"\n   📊 Total Rows: {count}")
-            
-            # Get indexes
-            cursor.execute(f"SHOW INDEX FROM {table_name}")
-            indexes = cursor.fetchall()
-            
-            if indexes:
+            print(tabulate(column_data, headers=["Key", "Column Name", "Data Type", "Null", "Default", "Extra"], tablefmt="grid"))
+
+            rows = table.get('rows', table['rows_estimate'])
+            label = 'Total Rows' if 'rows' in table else 'Rows (estimate)'
+            print(f"\n   📊 {label}: {rows}   Data: {format_bytes(table['data_bytes'])}   Indexes: {format_bytes(table['index_bytes'])}")
+
+            if table['indexes']:
                 print(f"\n   🔍 Indexes:")
-                index_dict = {}
-                for idx in indexes:
-                    index_name = idx[2]
-                    column_name = idx[4]
-                    
-                    if index_name not in index_dict:
-                        index_dict[index_name] = []
-                    index_dict[index_name].append(column_name)
-                
-                for idx_name, cols in index_dict.items():
-                    cols_str = ", ".join(cols)
-                    if idx_name == "PRIMARY":
-                        print(f"      • PRIMARY KEY: ({cols_str})")
-                    else:
-                        print(f"      • {idx_name}: ({cols_str})")
-            
-            # Show sample data if available
-            if count > 0 and count <= 10:
+                for index_name, index in table['indexes'].items():
+                    cols_str = ", ".join(index['columns'])
+                    label = "PRIMARY KEY" if index_name == "PRIMARY" else index_name
+                    print(f"      • {label}: ({cols_str})  cardinality={index['cardinality']}  size={format_bytes(index['bytes'])}")
+
+            if samples and 0 < rows <= 10:
                 print(f"\n   📄 Sample Data:")
-                cursor.execute(f"SELECT * FROM {table_name} LIMIT 5")
-                sample_rows = cursor.fetchall()
-                
-                # Get column names
-                cursor.execute(f"DESCRIBE {table_name}")
-                col_info = cursor.fetchall()
-                col_names = [col[0] for col in col_info]
-                
-                sample_data = []
-                for row in sample_rows:
-                    row_data = []
-                    for val in row:
-                        if val is None:
-                            row_data.append("NULL")
-                        elif isinstance(val, str) and len(val) > 30:
-                            row_data.append(val[:27] + "...")
-                        else:
-                            row_data.append(str(val))
-                    sample_data.append(row_data)
-                
-                print(tabulate(sample_data, headers=col_names, tablefmt="grid"))
-    
-    print("\n" + "="*100)
-    print(" "*30 + "✅ DATABASE STRUCTURE DISPLAYED SUCCESSFULLY")
-    print("="*100 + "\n")
-    
-    conn.close()
-    
-except ImportError:
-    print("\n❌ Error: 'tabulate' module not found!")
-    print("\n📦 Install it with:")
-    print("   pip install tabulate\n")
-    sys.exit(1)
-    
-except Exception as e:
-    print(f"\n❌ Error: {e}")
-    import traceback
-    traceback.print_exc()
-    sys.exit(1)
+                result = conn.execute(text(f"SELECT * FROM `{schema}`.`{table_name}` LIMIT 5"))
+                sample_data = [
+                    ["NULL" if val is None else (val[:27] + "..." if isinstance(val, str) and len(val) > 30 else str(val))
+                     for val in row]
+                    for row in result.all()
+                ]
+                print(tabulate(sample_data, headers=list(result.keys()), tablefmt="grid"))
+
+        if info['query_plans']:
+            print(f"\n   🧭 Query plans:")
+            plan_data = []
+            for plan in info['query_plans']:
+                if plan.get('error'):
+                    plan_data.append(['❌', plan['service'], plan['route'], '', 'EXPLAIN failed'])
+                    continue
+                access = '; '.join(f"{a['table']}:{a['type']}/{a['key'] or '-'}" for a in plan['access'])
+                status = '❌' if plan['full_scans'] else ('⚠️' if plan['notes'] else '✅')
+                plan_data.append([status, plan['service'], plan['route'], access, '; '.join(plan['notes'])])
+            print(tabulate(plan_data, headers=["", "Service", "Route", "Access (table:type/key)", "Notes"], tablefmt="grid"))
+
+        if info['findings']:
+            print(f"\n   🚩 Findings:")
+            for finding in info['findings']:
+                print(f"      • {finding}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ShopEase database structure and performance report')
+    parser.add_argument('--databases', default=','.join(DATABASES), help='comma-separated schemas to inspect')
+    parser.add_argument('--json', metavar='PATH', help="write a JSON snapshot to PATH ('-' for stdout only)")
+    parser.add_argument('--exact-counts', action='store_true', help='COUNT(*) every table instead of using estimates')
+    parser.add_argument('--samples', action='store_true', help='print up to 5 rows of tables with at most 10 rows')
+    args = parser.parse_args()
+
+    schemas = [name.strip() for name in args.databases.split(',') if name.strip()]
+    engine = create_engine(f'mysql+pymysql://{USER}:{PASSWORD}@{HOST}:{PORT}/?charset=utf8mb4',
+                           connect_args={'connect_timeout': 30})
+
+    with engine.connect() as conn:
+        databases = fetch_metadata(conn, schemas)
+        if args.exact_counts:
+            fetch_exact_counts(conn, databases)
+        run_query_plans(conn, databases)
+        collect_findings(databases)
+
+        snapshot = {
+            'generated_at': datetime.datetime.utcnow().isoformat() + 'Z',
+            'host': HOST,
+            'server_version': conn.execute(text('SELECT VERSION()')).scalar(),
+            'databases': databases,
+        }
+
+        if args.json != '-':
+            print("\n" + "="*100)
+            print(" "*35 + "SHOPEASE RDS DATABASE STRUCTURE")
+            print("="*100)
+            print_report(conn, databases, args.samples)
+            total_findings = sum(len(info['findings']) for info in databases.values())
+            print("\n" + "="*100)
+            print(" "*30 + f"✅ REPORT COMPLETE — {total_findings} finding(s)")
+            print("="*100 + "\n")
+
+    if args.json:
+        output = json.dumps(snapshot, indent=2, sort_keys=True, default=str)
+        if args.json == '-':
+            print(output)
+        else:
+            with open(args.json, 'w', encoding='utf-8') as handle:
+                handle.write(output + '\n')
+            print(f"📝 JSON snapshot written to {args.json}")
+    return 1 if any(info['findings'] for info in databases.values()) else 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)